@@ -0,0 +1,87 @@
+# Copyright (c) 2015 Faculty of Engineering of the University of Porto
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+""" Benchmark of the Diff Engines on real Java file pairs.
+
+It collects pairs of modified Java files from the history of a GIT repository and compares the
+time each diff engine takes to extract the changed sequences.
+
+Usage: python benchmarks/diff_benchmark.py REPOSITORY [--pairs N]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+import git
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from schwa.parsing import DIFF_ENGINES
+
+
+def java_file_pairs(repo_path, max_pairs):
+    """ Yields (source_a, source_b) pairs of modified Java files, from the most recent commits. """
+    repo = git.Repo(repo_path)
+    pairs = 0
+    for commit in repo.iter_commits():
+        for parent in commit.parents:
+            for diff in parent.diff(commit):
+                if diff.a_blob and diff.b_blob and diff.b_blob.path.endswith(".java"):
+                    try:
+                        source_a = diff.a_blob.data_stream.read().decode("UTF-8")
+                        source_b = diff.b_blob.data_stream.read().decode("UTF-8")
+                    except UnicodeDecodeError:
+                        continue
+                    yield source_a, source_b
+                    pairs += 1
+                    if pairs == max_pairs:
+                        return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares diff engines on Java file pairs of a repository.")
+    parser.add_argument("repository", help="repository full path on local file system")
+    parser.add_argument("--pairs", help="maximum number of file pairs", default=200, type=int)
+    parser.add_argument("--repeat", help="number of repetitions", default=3, type=int)
+    args = parser.parse_args()
+
+    pairs = list(java_file_pairs(args.repository, args.pairs))
+    if not pairs:
+        print("No modified Java files found!")
+        return
+    lines = sum(source_a.count("\n") + source_b.count("\n") for source_a, source_b in pairs)
+    print("%i file pairs, %i lines" % (len(pairs), lines))
+
+    results = {}
+    for name, engine in sorted(DIFF_ENGINES.items()):
+        run = lambda: [engine.changed_sequences(source_a, source_b) for source_a, source_b in pairs]
+        seconds = min(timeit.repeat(run, number=1, repeat=args.repeat))
+        results[name] = run()
+        print("%-6s %10.3f s %12.0f lines/s" % (name, seconds, lines / seconds))
+
+    changed_lines = lambda sequences: sum(end - start + 1 for _, start, end in sequences)
+    for name, sequences in sorted(results.items()):
+        print("%-6s %10i changed lines" % (name, sum(changed_lines(s) for s in sequences)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Copyright (c) 2015 Faculty of Engineering of the University of Porto
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+
+""" Benchmark of the Java lexer on a corpus of Java files.
+
+It compares the PLY lexer of plyj, token by token, with the pre-tokenized stream used by the parser,
+and checks that both emit the same tokens.
+
+Usage: python benchmarks/lexer_benchmark.py PATH [PATH ...]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+import ply.lex as lex
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from plyj.parser import MyLexer, TokenStream
+
+
+def java_sources(paths):
+    """ Yields the sources of Java files, from files and directories. """
+    for path in paths:
+        if os.path.isdir(path):
+            files = (os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+        else:
+            files = [path]
+        for file_path in files:
+            if file_path.endswith(".java"):
+                with open(file_path, encoding="UTF-8", errors="replace") as f:
+                    yield f.read()
+
+
+def ply_tokens(lexer, code):
+    lexer.lineno = 1
+    lexer.input(code)
+    return [(t.type, t.value, t.lineno) for t in lexer]
+
+
+def stream_tokens(code):
+    return [(t.type, t.value, t.lineno) for t in TokenStream(code)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares Java lexers on a corpus of Java files.")
+    parser.add_argument("paths", help="Java files or directories", nargs="+")
+    parser.add_argument("--repeat", help="number of repetitions", default=3, type=int)
+    args = parser.parse_args()
+
+    sources = list(java_sources(args.paths))
+    if not sources:
+        print("No Java files found!")
+        return
+    lexer = lex.lex(module=MyLexer(), optimize=1, errorlog=lex.NullLogger())
+    tokens = sum(len(TokenStream(code)) for code in sources)
+    size = sum(len(code) for code in sources)
+    print("%i files, %i tokens, %.1f MB" % (len(sources), tokens, size / 1e6))
+
+    lexers = [("ply", lambda code: ply_tokens(lexer, code)), ("stream", stream_tokens)]
+    results = {}
+    for name, tokenize in lexers:
+        run = lambda: [tokenize(code) for code in sources]
+        seconds = min(timeit.repeat(run, number=1, repeat=args.repeat))
+        results[name] = run()
+        print("%-6s %10.3f s %12.0f tokens/s" % (name, seconds, tokens / seconds))
+    print("Same tokens: %s" % (results["ply"] == results["stream"]))
+
+
+if __name__ == "__main__":
+    main()
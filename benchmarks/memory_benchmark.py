@@ -0,0 +1,106 @@
+# Copyright (c) 2015 Faculty of Engineering of the University of Porto
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+
+""" Benchmark of the memory used by the analytics.
+
+It analyzes a GIT repository, or a synthetic repository with method granularity, and reports the memory
+retained by the analytics per node (repository, file, class and method analytics), with and without
+lean analytics.
+
+Usage: python benchmarks/memory_benchmark.py [REPOSITORY] [--commits N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from schwa.analysis import SchwaAnalysis
+from schwa.extraction import GitExtractor
+from schwa.repository import *
+
+
+def synthetic_repository(commits, files=50, classes=4, methods=20):
+    """ Creates a repository where each commit modifies some methods of a few files. """
+    random.seed(0)
+    history = []
+    begin_ts = 1400000000
+    diffs = []
+    for f in range(files):
+        path = "src/File%i.java" % f
+        diffs.append(DiffFile(file_b=path, added=True))
+        for c in range(classes):
+            diffs.append(DiffClass(file_name=path, class_b="Class%i" % c, added=True))
+            for m in range(methods):
+                diffs.append(DiffMethod(file_name=path, class_name="Class%i" % c, method_b="method%i" % m, added=True))
+    history.append(Commit("0", "First commit", "author0@schwa.org", begin_ts, diffs))
+    for i in range(1, commits):
+        diffs = []
+        for path in set("src/File%i.java" % random.randrange(files) for _ in range(3)):
+            diffs.append(DiffFile(file_a=path, file_b=path, modified=True))
+            class_name = "Class%i" % random.randrange(classes)
+            diffs.append(DiffClass(file_name=path, class_a=class_name, class_b=class_name, modified=True))
+            for method in set("method%i" % random.randrange(methods) for _ in range(5)):
+                diffs.append(DiffMethod(file_name=path, class_name=class_name, method_a=method, method_b=method,
+                                        modified=True))
+        message = "Fixed bug %i" % i if random.random() < 0.3 else "Feature %i" % i
+        history.append(Commit(str(i), message, "author%i@schwa.org" % random.randrange(10), begin_ts + i * 3600,
+                              diffs))
+    return Repository(history, begin_ts, begin_ts + commits * 3600)
+
+
+def count_nodes(analytics):
+    children = {}
+    for attribute in ("directories_analytics", "files_analytics", "classes_analytics", "methods_analytics",
+                      "functions_analytics"):
+        children.update(getattr(analytics, attribute, {}))
+    return 1 + sum(count_nodes(child) for child in children.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures the memory used by analytics per node.")
+    parser.add_argument("repository", help="repository full path on local file system", nargs="?")
+    parser.add_argument("--commits", help="maximum number of commits", default=2000, type=int)
+    args = parser.parse_args()
+
+    if args.repository:
+        repository = GitExtractor(args.repository).extract(max_commits=args.commits, parallel=False)
+    else:
+        repository = synthetic_repository(args.commits)
+    print("%i commits" % len(repository.commits))
+
+    for name, lean in [("default", False), ("lean", True)]:
+        tracemalloc.start()
+        analytics = SchwaAnalysis(repository, lean).analyze()
+        size, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        nodes = count_nodes(analytics)
+        print("%-8s %8i nodes %10.1f KB %8.0f bytes/node %10.1f KB peak" % (name, nodes, size / 1024, size / nodes,
+                                                                             peak / 1024))
+        del analytics
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# Copyright (c) 2015 Faculty of Engineering of the University of Porto
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+
+""" Validation of the Numeric Backends on a GIT repository.
+
+It extracts a repository once, analyzes it with every numeric backend and reports the time of each
+analysis and the maximum divergence of the defect probabilities, compared to the Decimal backend.
+
+Usage: python benchmarks/numeric_validation.py REPOSITORY [--commits N]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from schwa.analysis import SchwaAnalysis, AnalysisContext, NUMERIC_BACKENDS
+from schwa.extraction import GitExtractor
+
+
+def defect_probabilities(analytics):
+    """ Maps every component of a RepositoryAnalytics, and the repository as (), to its defect probability. """
+    probabilities = {(): analytics.defect_prob}
+    probabilities.update((component, metrics.defect_prob) for component, metrics in analytics.components())
+    return probabilities
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares numeric backends on the analysis of a repository.")
+    parser.add_argument("repository", help="repository full path on local file system")
+    parser.add_argument("--commits", help="maximum number of commits, since the last one", default=None, type=int)
+    parser.add_argument("--repeat", help="number of repetitions", default=3, type=int)
+    args = parser.parse_args()
+
+    repository = GitExtractor(args.repository).extract(max_commits=args.commits, parallel=False)
+    print("%i commits" % len(repository.commits))
+
+    results = {}
+    for name in sorted(NUMERIC_BACKENDS):
+        run = lambda: SchwaAnalysis(repository, context=AnalysisContext(name)).analyze()
+        seconds = min(timeit.repeat(run, number=1, repeat=args.repeat))
+        results[name] = defect_probabilities(run())
+        print("%-8s %10.3f s" % (name, seconds))
+
+    reference = results.pop("decimal")
+    for name, probabilities in sorted(results.items()):
+        component, divergence = max(((c, abs(float(p) - float(reference[c]))) for c, p in probabilities.items()),
+                                    key=lambda item: item[1])
+        print("%-8s max divergence %.3e in %s" % (name, divergence, "/".join(component) or "repository"))
+
+
+if __name__ == "__main__":
+    main()
@@ -23,19 +23,40 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+class SourceElementType(type):
+    '''
+    Metaclass of the SourceElements. Unless a class declares its own
+    __slots__, they are derived from the _fields it adds, so nodes are
+    allocated without a __dict__.
+    '''
+
+    def __new__(mcs, name, bases, namespace):
+        if '__slots__' not in namespace:
+            inherited = set()
+            for base in bases:
+                for cls in base.__mro__:
+                    inherited.update(getattr(cls, '__slots__', ()))
+            namespace['__slots__'] = tuple(
+                f for f in namespace.get('_fields', ()) if f not in inherited)
+        return super(SourceElementType, mcs).__new__(mcs, name, bases,
+                                                     namespace)
+
+
 # Base node
-class SourceElement(object):
+class SourceElement(object, metaclass=SourceElementType):
     '''
     A SourceElement is the base class for all elements that occur in a Java
     file parsed by plyj.
     '''
+    __slots__ = ('start_line', 'end_line', 'line_number', 'label')
+    _fields = ()
 
     def __init__(self):
         super(SourceElement, self).__init__()
-        self._fields = []
         self.start_line = None
         self.end_line = None
         self.line_number = None
+        self.label = None
 
     def __repr__(self):
         equals = ("{0}={1!r}".format(k, getattr(self, k))
@@ -44,10 +65,11 @@ class SourceElement(object):
         return "{0}({1})".format(self.__class__.__name__, args)
 
     def __eq__(self, other):
-        try:
-            return self.__dict__ == other.__dict__
-        except AttributeError:
+        if not isinstance(other, SourceElement) or \
+                self._fields != other._fields:
             return False
+        return all(getattr(self, f) == getattr(other, f)
+                   for f in self._fields + SourceElement.__slots__)
 
     def __ne__(self, other):
         return not self == other
@@ -73,12 +95,12 @@ class SourceElement(object):
 
 
 class CompilationUnit(SourceElement):
+    _fields = ('package_declaration', 'import_declarations',
+               'type_declarations')
 
     def __init__(self, package_declaration=None, import_declarations=None,
                  type_declarations=None):
         super(CompilationUnit, self).__init__()
-        self._fields = [
-            'package_declaration', 'import_declarations', 'type_declarations']
         if import_declarations is None:
             import_declarations = []
         if type_declarations is None:
@@ -88,10 +110,10 @@ class CompilationUnit(SourceElement):
         self.type_declarations = type_declarations
 
 class PackageDeclaration(SourceElement):
+    _fields = ('name', 'modifiers')
 
     def __init__(self, name, modifiers=None):
         super(PackageDeclaration, self).__init__()
-        self._fields = ['name', 'modifiers']
         if modifiers is None:
             modifiers = []
         self.name = name
@@ -99,22 +121,22 @@ class PackageDeclaration(SourceElement):
 
 
 class ImportDeclaration(SourceElement):
+    _fields = ('name', 'static', 'on_demand')
 
     def __init__(self, name, static=False, on_demand=False):
         super(ImportDeclaration, self).__init__()
-        self._fields = ['name', 'static', 'on_demand']
         self.name = name
         self.static = static
         self.on_demand = on_demand
 
 
 class ClassDeclaration(SourceElement):
+    _fields = ('name', 'body', 'modifiers', 'type_parameters', 'extends',
+               'implements')
 
     def __init__(self, name, body, modifiers=None, type_parameters=None,
                  extends=None, implements=None):
         super(ClassDeclaration, self).__init__()
-        self._fields = ['name', 'body', 'modifiers',
-                        'type_parameters', 'extends', 'implements']
         if modifiers is None:
             modifiers = []
         if type_parameters is None:
@@ -129,20 +151,20 @@ class ClassDeclaration(SourceElement):
         self.implements = implements
 
 class ClassInitializer(SourceElement):
+    _fields = ('block', 'static')
 
     def __init__(self, block, static=False):
         super(ClassInitializer, self).__init__()
-        self._fields = ['block', 'static']
         self.block = block
         self.static = static
 
 class ConstructorDeclaration(SourceElement):
+    _fields = ('name', 'block', 'modifiers', 'type_parameters', 'parameters',
+               'throws')
 
     def __init__(self, name, block, modifiers=None, type_parameters=None,
                  parameters=None, throws=None):
         super(ConstructorDeclaration, self).__init__()
-        self._fields = ['name', 'block', 'modifiers',
-                        'type_parameters', 'parameters', 'throws']
         if modifiers is None:
             modifiers = []
         if type_parameters is None:
@@ -160,10 +182,10 @@ class EmptyDeclaration(SourceElement):
     pass
 
 class FieldDeclaration(SourceElement):
+    _fields = ('type', 'variable_declarators', 'modifiers')
 
     def __init__(self, type, variable_declarators, modifiers=None):
         super(FieldDeclaration, self).__init__()
-        self._fields = ['type', 'variable_declarators', 'modifiers']
         if modifiers is None:
             modifiers = []
         self.type = type
@@ -171,14 +193,13 @@ class FieldDeclaration(SourceElement):
         self.modifiers = modifiers
 
 class MethodDeclaration(SourceElement):
+    _fields = ('name', 'modifiers', 'type_parameters', 'parameters',
+               'return_type', 'body', 'abstract', 'extended_dims', 'throws')
 
     def __init__(self, name, modifiers=None, type_parameters=None,
                  parameters=None, return_type='void', body=None, abstract=False,
                  extended_dims=0, throws=None):
         super(MethodDeclaration, self).__init__()
-        self._fields = ['name', 'modifiers', 'type_parameters', 'parameters',
-                        'return_type', 'body', 'abstract', 'extended_dims',
-                        'throws']
         if modifiers is None:
             modifiers = []
         if type_parameters is None:
@@ -196,10 +217,10 @@ class MethodDeclaration(SourceElement):
         self.throws = throws
 
 class FormalParameter(SourceElement):
+    _fields = ('variable', 'type', 'modifiers', 'vararg')
 
     def __init__(self, variable, type, modifiers=None, vararg=False):
         super(FormalParameter, self).__init__()
-        self._fields = ['variable', 'type', 'modifiers', 'vararg']
         if modifiers is None:
             modifiers = []
         self.variable = variable
@@ -209,6 +230,8 @@ class FormalParameter(SourceElement):
 
 
 class Variable(SourceElement):
+    _fields = ('name', 'dimensions')
+
     # I would like to remove this class. In theory, the dimension could be added
     # to the type but this means variable declarations have to be changed
     # somehow. Consider 'int i, j[];'. In this case there currently is only one
@@ -218,33 +241,31 @@ class Variable(SourceElement):
 
     def __init__(self, name, dimensions=0):
         super(Variable, self).__init__()
-        self._fields = ['name', 'dimensions']
         self.name = name
         self.dimensions = dimensions
 
 
 class VariableDeclarator(SourceElement):
+    _fields = ('variable', 'initializer')
 
     def __init__(self, variable, initializer=None):
         super(VariableDeclarator, self).__init__()
-        self._fields = ['variable', 'initializer']
         self.variable = variable
         self.initializer = initializer
 
 class Throws(SourceElement):
+    _fields = ('types',)
 
     def __init__(self, types):
         super(Throws, self).__init__()
-        self._fields = ['types']
         self.types = types
 
 class InterfaceDeclaration(SourceElement):
+    _fields = ('name', 'modifiers', 'extends', 'type_parameters', 'body')
 
     def __init__(self, name, modifiers=None, extends=None, type_parameters=None,
                  body=None):
         super(InterfaceDeclaration, self).__init__()
-        self._fields = [
-            'name', 'modifiers', 'extends', 'type_parameters', 'body']
         if modifiers is None:
             modifiers = []
         if extends is None:
@@ -260,12 +281,11 @@ class InterfaceDeclaration(SourceElement):
         self.body = body
 
 class EnumDeclaration(SourceElement):
+    _fields = ('name', 'implements', 'modifiers', 'type_parameters', 'body')
 
     def __init__(self, name, implements=None, modifiers=None,
                  type_parameters=None, body=None):
         super(EnumDeclaration, self).__init__()
-        self._fields = [
-            'name', 'implements', 'modifiers', 'type_parameters', 'body']
         if implements is None:
             implements = []
         if modifiers is None:
@@ -281,10 +301,10 @@ class EnumDeclaration(SourceElement):
         self.body = body
 
 class EnumConstant(SourceElement):
+    _fields = ('name', 'arguments', 'modifiers', 'body')
 
     def __init__(self, name, arguments=None, modifiers=None, body=None):
         super(EnumConstant, self).__init__()
-        self._fields = ['name', 'arguments', 'modifiers', 'body']
         if arguments is None:
             arguments = []
         if modifiers is None:
@@ -297,13 +317,12 @@ class EnumConstant(SourceElement):
         self.body = body
 
 class AnnotationDeclaration(SourceElement):
+    _fields = ('name', 'modifiers', 'type_parameters', 'extends', 'implements',
+               'body')
 
     def __init__(self, name, modifiers=None, type_parameters=None, extends=None,
                  implements=None, body=None):
         super(AnnotationDeclaration, self).__init__()
-        self._fields = [
-            'name', 'modifiers', 'type_parameters', 'extends', 'implements',
-            'body']
         if modifiers is None:
             modifiers = []
         if type_parameters is None:
@@ -320,12 +339,12 @@ class AnnotationDeclaration(SourceElement):
         self.body = body
 
 class AnnotationMethodDeclaration(SourceElement):
+    _fields = ('name', 'type', 'parameters', 'default', 'modifiers',
+               'type_parameters', 'extended_dims')
 
     def __init__(self, name, type, parameters=None, default=None,
                  modifiers=None, type_parameters=None, extended_dims=0):
         super(AnnotationMethodDeclaration, self).__init__()
-        self._fields = ['name', 'type', 'parameters', 'default',
-                        'modifiers', 'type_parameters', 'extended_dims']
         if parameters is None:
             parameters = []
         if modifiers is None:
@@ -341,10 +360,10 @@ class AnnotationMethodDeclaration(SourceElement):
         self.extended_dims = extended_dims
 
 class Annotation(SourceElement):
+    _fields = ('name', 'members', 'single_member')
 
     def __init__(self, name, members=None, single_member=None):
         super(Annotation, self).__init__()
-        self._fields = ['name', 'members', 'single_member']
         if members is None:
             members = []
         self.name = name
@@ -353,20 +372,20 @@ class Annotation(SourceElement):
 
 
 class AnnotationMember(SourceElement):
+    _fields = ('name', 'value')
 
     def __init__(self, name, value):
         super(SourceElement, self).__init__()
-        self._fields = ['name', 'value']
         self.name = name
         self.value = value
 
 
 class Type(SourceElement):
+    _fields = ('name', 'type_arguments', 'enclosed_in', 'dimensions')
 
     def __init__(self, name, type_arguments=None, enclosed_in=None,
                  dimensions=0):
         super(Type, self).__init__()
-        self._fields = ['name', 'type_arguments', 'enclosed_in', 'dimensions']
         if type_arguments is None:
             type_arguments = []
         self.name = name
@@ -376,30 +395,30 @@ class Type(SourceElement):
 
 
 class Wildcard(SourceElement):
+    _fields = ('bounds',)
 
     def __init__(self, bounds=None):
         super(Wildcard, self).__init__()
-        self._fields = ['bounds']
         if bounds is None:
             bounds = []
         self.bounds = bounds
 
 
 class WildcardBound(SourceElement):
+    _fields = ('type', 'extends', '_super')
 
     def __init__(self, type, extends=False, _super=False):
         super(WildcardBound, self).__init__()
-        self._fields = ['type', 'extends', '_super']
         self.type = type
         self.extends = extends
         self._super = _super
 
 
 class TypeParameter(SourceElement):
+    _fields = ('name', 'extends')
 
     def __init__(self, name, extends=None):
         super(TypeParameter, self).__init__()
-        self._fields = ['name', 'extends']
         if extends is None:
             extends = []
         self.name = name
@@ -407,16 +426,16 @@ class TypeParameter(SourceElement):
 
 
 class Expression(SourceElement):
+    _fields = ()
 
     def __init__(self):
         super(Expression, self).__init__()
-        self._fields = []
 
 class BinaryExpression(Expression):
+    _fields = ('operator', 'lhs', 'rhs')
 
     def __init__(self, operator, lhs, rhs):
         super(BinaryExpression, self).__init__()
-        self._fields = ['operator', 'lhs', 'rhs']
         self.operator = operator
         self.lhs = lhs
         self.rhs = rhs
@@ -426,10 +445,10 @@ class Assignment(BinaryExpression):
 
 
 class Conditional(Expression):
+    _fields = ('predicate', 'if_true', 'if_false')
 
     def __init__(self, predicate, if_true, if_false):
         super(self.__class__, self).__init__()
-        self._fields = ['predicate', 'if_true', 'if_false']
         self.predicate = predicate
         self.if_true = if_true
         self.if_false = if_false
@@ -477,19 +496,19 @@ class Multiplicative(BinaryExpression):
 
 
 class Unary(Expression):
+    _fields = ('sign', 'expression')
 
     def __init__(self, sign, expression):
         super(Unary, self).__init__()
-        self._fields = ['sign', 'expression']
         self.sign = sign
         self.expression = expression
 
 
 class Cast(Expression):
+    _fields = ('target', 'expression')
 
     def __init__(self, target, expression):
         super(Cast, self).__init__()
-        self._fields = ['target', 'expression']
         self.target = target
         self.expression = expression
 
@@ -502,10 +521,10 @@ class Empty(Statement):
 
 
 class Block(Statement):
+    _fields = ('statements',)
 
     def __init__(self, statements=None):
         super(Statement, self).__init__()
-        self._fields = ['statements']
         if statements is None:
             statements = []
         self.statements = statements
@@ -518,18 +537,20 @@ class VariableDeclaration(Statement, FieldDeclaration):
     pass
 
 class ArrayInitializer(SourceElement):
+    _fields = ('elements',)
+
     def __init__(self, elements=None):
         super(ArrayInitializer, self).__init__()
-        self._fields = ['elements']
         if elements is None:
             elements = []
         self.elements = elements
 
 
 class MethodInvocation(Expression):
+    _fields = ('name', 'arguments', 'type_arguments', 'target')
+
     def __init__(self, name, arguments=None, type_arguments=None, target=None):
         super(MethodInvocation, self).__init__()
-        self._fields = ['name', 'arguments', 'type_arguments', 'target']
         if arguments is None:
             arguments = []
         if type_arguments is None:
@@ -540,37 +561,37 @@ class MethodInvocation(Expression):
         self.target = target
 
 class IfThenElse(Statement):
+    _fields = ('predicate', 'if_true', 'if_false')
 
     def __init__(self, predicate, if_true=None, if_false=None):
         super(IfThenElse, self).__init__()
-        self._fields = ['predicate', 'if_true', 'if_false']
         self.predicate = predicate
         self.if_true = if_true
         self.if_false = if_false
 
 class While(Statement):
+    _fields = ('predicate', 'body')
 
     def __init__(self, predicate, body=None):
         super(While, self).__init__()
-        self._fields = ['predicate', 'body']
         self.predicate = predicate
         self.body = body
 
 class For(Statement):
+    _fields = ('init', 'predicate', 'update', 'body')
 
     def __init__(self, init, predicate, update, body):
         super(For, self).__init__()
-        self._fields = ['init', 'predicate', 'update', 'body']
         self.init = init
         self.predicate = predicate
         self.update = update
         self.body = body
 
 class ForEach(Statement):
+    _fields = ('type', 'variable', 'iterable', 'body', 'modifiers')
 
     def __init__(self, type, variable, iterable, body, modifiers=None):
         super(ForEach, self).__init__()
-        self._fields = ['type', 'variable', 'iterable', 'body', 'modifiers']
         if modifiers is None:
             modifiers = []
         self.type = type
@@ -581,87 +602,87 @@ class ForEach(Statement):
 
 
 class Assert(Statement):
+    _fields = ('predicate', 'message')
 
     def __init__(self, predicate, message=None):
         super(Assert, self).__init__()
-        self._fields = ['predicate', 'message']
         self.predicate = predicate
         self.message = message
 
 
 class Switch(Statement):
+    _fields = ('expression', 'switch_cases')
 
     def __init__(self, expression, switch_cases):
         super(Switch, self).__init__()
-        self._fields = ['expression', 'switch_cases']
         self.expression = expression
         self.switch_cases = switch_cases
 
 class SwitchCase(SourceElement):
+    _fields = ('cases', 'body')
 
     def __init__(self, cases, body=None):
         super(SwitchCase, self).__init__()
-        self._fields = ['cases', 'body']
         if body is None:
             body = []
         self.cases = cases
         self.body = body
 
 class DoWhile(Statement):
+    _fields = ('predicate', 'body')
 
     def __init__(self, predicate, body=None):
         super(DoWhile, self).__init__()
-        self._fields = ['predicate', 'body']
         self.predicate = predicate
         self.body = body
 
 
 class Continue(Statement):
+    _fields = ('label',)
 
     def __init__(self, label=None):
         super(Continue, self).__init__()
-        self._fields = ['label']
         self.label = label
 
 
 class Break(Statement):
+    _fields = ('label',)
 
     def __init__(self, label=None):
         super(Break, self).__init__()
-        self._fields = ['label']
         self.label = label
 
 
 class Return(Statement):
+    _fields = ('result',)
 
     def __init__(self, result=None):
         super(Return, self).__init__()
-        self._fields = ['result']
         self.result = result
 
 
 class Synchronized(Statement):
+    _fields = ('monitor', 'body')
 
     def __init__(self, monitor, body):
         super(Synchronized, self).__init__()
-        self._fields = ['monitor', 'body']
         self.monitor = monitor
         self.body = body
 
 
 class Throw(Statement):
+    _fields = ('exception',)
 
     def __init__(self, exception):
         super(Throw, self).__init__()
-        self._fields = ['exception']
         self.exception = exception
 
 
 class Try(Statement):
+    _fields = ('block', 'catches', '_finally', 'resources')
 
     def __init__(self, block, catches=None, _finally=None, resources=None):
         super(Try, self).__init__()
-        self._fields = ['block', 'catches', '_finally', 'resources']
         if catches is None:
             catches = []
         if resources is None:
@@ -682,10 +703,10 @@ class Try(Statement):
 
 
 class Catch(SourceElement):
+    _fields = ('variable', 'modifiers', 'types', 'block')
 
     def __init__(self, variable, modifiers=None, types=None, block=None):
         super(Catch, self).__init__()
-        self._fields = ['variable', 'modifiers', 'types', 'block']
         if modifiers is None:
             modifiers = []
         if types is None:
@@ -697,10 +718,10 @@ class Catch(SourceElement):
 
 
 class Resource(SourceElement):
+    _fields = ('variable', 'type', 'modifiers', 'initializer')
 
     def __init__(self, variable, type=None, modifiers=None, initializer=None):
         super(Resource, self).__init__()
-        self._fields = ['variable', 'type', 'modifiers', 'initializer']
         if modifiers is None:
             modifiers = []
         self.variable = variable
@@ -714,10 +735,11 @@ class ConstructorInvocation(Statement):
 
     This is a variant of either this() or super(), NOT a "new" expression.
     """
+    _fields = ('name', 'target', 'type_arguments', 'arguments')
+
 
     def __init__(self, name, target=None, type_arguments=None, arguments=None):
         super(ConstructorInvocation, self).__init__()
-        self._fields = ['name', 'target', 'type_arguments', 'arguments']
         if type_arguments is None:
             type_arguments = []
         if arguments is None:
@@ -729,12 +751,11 @@ class ConstructorInvocation(Statement):
 
 
 class InstanceCreation(Expression):
+    _fields = ('type', 'type_arguments', 'arguments', 'body', 'enclosed_in')
 
     def __init__(self, type, type_arguments=None, arguments=None, body=None,
                  enclosed_in=None):
         super(InstanceCreation, self).__init__()
-        self._fields = [
-            'type', 'type_arguments', 'arguments', 'body', 'enclosed_in']
         if type_arguments is None:
             type_arguments = []
         if arguments is None:
@@ -749,28 +770,28 @@ class InstanceCreation(Expression):
 
 
 class FieldAccess(Expression):
+    _fields = ('name', 'target')
 
     def __init__(self, name, target):
         super(FieldAccess, self).__init__()
-        self._fields = ['name', 'target']
         self.name = name
         self.target = target
 
 
 class ArrayAccess(Expression):
+    _fields = ('index', 'target')
 
     def __init__(self, index, target):
         super(ArrayAccess, self).__init__()
-        self._fields = ['index', 'target']
         self.index = index
         self.target = target
 
 
 class ArrayCreation(Expression):
+    _fields = ('type', 'dimensions', 'initializer')
 
     def __init__(self, type, dimensions=None, initializer=None):
         super(ArrayCreation, self).__init__()
-        self._fields = ['type', 'dimensions', 'initializer']
         if dimensions is None:
             dimensions = []
         self.type = type
@@ -779,26 +800,26 @@ class ArrayCreation(Expression):
 
 
 class Literal(SourceElement):
+    _fields = ('value',)
 
     def __init__(self, value):
         super(Literal, self).__init__()
-        self._fields = ['value']
         self.value = value
 
 
 class ClassLiteral(SourceElement):
+    _fields = ('type',)
 
     def __init__(self, type):
         super(ClassLiteral, self).__init__()
-        self._fields = ['type']
         self.type = type
 
 
 class Name(SourceElement):
+    _fields = ('value',)
 
     def __init__(self, value):
         super(Name, self).__init__()
-        self._fields = ['value']
         self.value = value
 
     def append_name(self, name):
@@ -809,9 +830,10 @@ class Name(SourceElement):
 
 
 class ExpressionStatement(Statement):
+    _fields = ('expression',)
+
     def __init__(self, expression):
         super(ExpressionStatement, self).__init__()
-        self._fields = ['expression']
         self.expression = expression
 
 
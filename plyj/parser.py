@@ -23,6 +23,9 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
+import copy
+import os
+import re
 import ply.lex as lex
 import ply.yacc as yacc
 from .model import *
@@ -64,13 +67,14 @@ class MyLexer(object):
     literals = '()+-*/=?:,.^|&~!=[]{};<>@%'
 
     t_NUM = r'\.?[0-9][0-9eE_lLdDa-fA-F.xXpP]*'
-    t_CHAR_LITERAL = r'\'([^\\\n]|(\\.))*?\''
-    t_STRING_LITERAL = r'\"([^\\\n]|(\\.))*?\"'
+    # Unrolled loops, that scan literals and comments in linear time without backtracking
+    t_CHAR_LITERAL = r'\'[^\'\\\n]*(?:\\.[^\'\\\n]*)*\''
+    t_STRING_LITERAL = r'\"[^\"\\\n]*(?:\\.[^\"\\\n]*)*\"'
 
     t_ignore_LINE_COMMENT = '//.*'
 
     def t_BLOCK_COMMENT(self, t):
-        r'/\*(.|\n)*?\*/'
+        r'/\*[^*]*\*+(?:[^/*][^*]*\*+)*/'
         t.lexer.lineno += t.value.count('\n')
 
     t_OR = r'\|\|'
@@ -116,12 +120,85 @@ class MyLexer(object):
 
     def t_newline2(self, t):
         r'(\r\n)+'
-        t.lexer.lineno += len(t.value) / 2
+        t.lexer.lineno += len(t.value) // 2
 
     def t_error(self, t):
         print("Illegal character '{}' ({}) in line {}".format(t.value[0], hex(ord(t.value[0])), t.lexer.lineno))
         t.lexer.skip(1)
 
+class TokenStream(object):
+    """ A pre-tokenized stream of Java tokens, with the interface of a PLY lexer.
+
+    The parser rules read the line number of the last token from the lexer, so it is kept while the
+    stream is consumed. A stream can be parsed again after being rewound.
+    """
+
+    # Whitespace and comments are dropped in bulk, then names, string rules (longest pattern first,
+    # as in PLY) and literals, so that the tokens are the same of MyLexer.
+    skip_re = r'(?:[ \t\f\n]|\r\n|//[^\n]*|/\*[^*]*\*+(?:[^/*][^*]*\*+)*/)+'
+    rules = sorted(((name[2:], value) for name, value in vars(MyLexer).items()
+                    if name.startswith('t_') and isinstance(value, str) and not name.startswith('t_ignore')),
+                   key=lambda rule: (-len(rule[1]), rule[0]))
+    master_re = re.compile('|'.join(['(?P<skip>{})'.format(skip_re), '(?P<NAME>{})'.format(MyLexer.t_NAME.__doc__)] +
+                                    ['(?P<{}>{})'.format(name, pattern) for name, pattern in rules] +
+                                    ['(?P<literal>[{}])'.format(re.escape(MyLexer.literals))]))
+    keywords = dict((keyword, keyword.upper()) for keyword in MyLexer.keywords)
+
+    def __init__(self, code, lineno=1):
+        self.tokens = []
+        self.index = 0
+        self.lineno = self.start_lineno = lineno
+        self.lexpos = 0
+        keywords = self.keywords
+        pos = 0
+        for match in self.master_re.finditer(code):
+            start = match.start()
+            if start != pos:
+                for char in code[pos:start]:
+                    print("Illegal character '{}' ({}) in line {}".format(char, hex(ord(char)), lineno))
+            pos = match.end()
+            kind = match.lastgroup
+            value = match.group()
+            if kind == 'skip':
+                lineno += value.count('\n')
+                continue
+            token = lex.LexToken()
+            if kind == 'NAME':
+                token.type = keywords.get(value, kind)
+            elif kind == 'literal':
+                token.type = value
+            else:
+                token.type = kind
+            token.value = value
+            token.lineno = lineno
+            token.lexpos = start
+            self.tokens.append(token)
+        for char in code[pos:]:
+            print("Illegal character '{}' ({}) in line {}".format(char, hex(ord(char)), lineno))
+        self.end_lineno = lineno
+
+    def rewind(self):
+        self.index = 0
+        self.lineno = self.start_lineno
+        self.lexpos = 0
+
+    def token(self):
+        if self.index < len(self.tokens):
+            token = self.tokens[self.index]
+            self.index += 1
+            self.lineno = token.lineno
+            self.lexpos = token.lexpos
+            return token
+        self.lineno = self.end_lineno
+        return None
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+    def __len__(self):
+        return len(self.tokens)
+
+
 class ExpressionParser(object):
 
     def p_expression(self, p):
@@ -1290,7 +1367,7 @@ class TypeParser(object):
 
     def p_array_type2(self, p):
         '''array_type : generic_type dims'''
-        p[1].dims = p[2]
+        p[1].dimensions = p[2]
         p[0] = p[1]
 
     def p_array_type3(self, p):
@@ -2287,13 +2364,35 @@ class ParsingError(NameError):
 
 class Parser(object):
 
+    # The LALR tables are loaded once per process and shared by the parsers, which only keep their own
+    # parsing state. They are cached in the user cache directory, not in the package, and PLY rebuilds
+    # them when the grammar signature changes.
+    tables = None
+    cache_dir = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+                             'plyj')
+
     def __init__(self):
-        self.lexer = lex.lex(module=MyLexer(), optimize=1, errorlog=lex.NullLogger())
-        self.parser = yacc.yacc(module=MyParser(), start='goal', optimize=1, errorlog=yacc.NullLogger())
+        if Parser.tables is None:
+            Parser.tables = Parser.build_tables()
+        self.parser = copy.copy(Parser.tables)
+
+    @staticmethod
+    def build_tables():
+        picklefile = os.path.join(Parser.cache_dir, 'parsetab.pickle')
+        try:
+            os.makedirs(Parser.cache_dir, exist_ok=True)
+            return yacc.yacc(module=MyParser(), start='goal', picklefile=picklefile, debug=False,
+                             errorlog=yacc.NullLogger())
+        except Exception:  # The cache can't be written, or is corrupt, so the next process writes it again
+            try:
+                os.remove(picklefile)
+            except OSError:
+                pass
+            return yacc.yacc(module=MyParser(), start='goal', write_tables=False, debug=False,
+                             errorlog=yacc.NullLogger())
 
     def tokenize_string(self, code):
-        self.lexer.input(code)
-        for token in self.lexer:
+        for token in TokenStream(code):
             print(token)
 
     def tokenize_file(self, _file):
@@ -2310,9 +2409,15 @@ class Parser(object):
     def parse_statement(self, code, debug=0, lineno=1):
         return self.parse_string(code, debug, lineno, prefix='* ')
 
+    def tokenize(self, code, lineno=1, prefix='++'):
+        return TokenStream(prefix + code, lineno)
+
+    def parse_tokens(self, stream, debug=0):
+        stream.rewind()
+        return self.parser.parse(lexer=stream, debug=debug)
+
     def parse_string(self, code, debug=0, lineno=1, prefix='++'):
-        self.lexer.lineno = lineno
-        return self.parser.parse(prefix + code, lexer=self.lexer, debug=debug)
+        return self.parse_tokens(self.tokenize(code, lineno, prefix), debug)
 
     def parse_file(self, _file, debug=0):
         if type(_file) == str:
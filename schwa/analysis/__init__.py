@@ -1,3 +1,12 @@
+from .numeric_backend import *
+from .analysis_context import *
+from .score_view import *
+from .time_range_sweep import *
 from .repository_analytics import *
+from .sqlite_store import *
+from .component_registry import *
+from .snapshot_comparison import *
 from .abstract_analysis import *
-from .schwa_analysis import *
\ No newline at end of file
+from .schwa_analysis import *
+from .time_travel_analysis import *
+from .analytics_writer import *
\ No newline at end of file
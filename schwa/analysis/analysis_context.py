@@ -0,0 +1,192 @@
+# Copyright (c) 2015 Faculty of Engineering of the University of Porto
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+""" Module for the context of an analysis.
+
+The parameters of the defect probability formula and the dataset of bug fixes belong to an analysis,
+instead of being process globals, so that many repositories can be analyzed in the same process.
+"""
+
+from .numeric_backend import FloatBackend, get_numeric_backend, twr_sigmoid
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+class AnalysisContext:
+    """ The parameters and the state shared by the Metrics of an analysis.
+
+    Analyses with different contexts don't share any state, so they can run in parallel threads.
+
+    Attributes:
+        REVISIONS_WEIGHT: A float with the default revisions weight for the defect probability computation.
+        FIXES_WEIGHT: A float with the default fixes weight for the defect probability computation.
+        AUTHORS_WEIGHT: A float with the default authors weight for the defect probability computation.
+        TIME_RANGE: A float with the default time range of the TWR function.
+        numeric_backend: A subclass of AbstractNumericBackend that does the arithmetic.
+        revisions_weight: A number having the revisions weight for the defect probability computation.
+        fixes_weight: A number having the fixes weight for the defect probability computation.
+        authors_weight: A number having the authors weight for the defect probability computation.
+        time_range: A number from 0 to 1 that changes the time range of the TWR function.
+        fixes_dataset: A set of (revisions_twr, fixes_twr, authors_twr) that had a bug.
+    """
+
+    REVISIONS_WEIGHT = 0.25
+    FIXES_WEIGHT = 0.5
+    AUTHORS_WEIGHT = 0.25
+    TIME_RANGE = 0.4
+
+    def __init__(self, numeric_backend=None, revisions_weight=None, fixes_weight=None, authors_weight=None,
+                 time_range=None):
+        """ Inits AnalysisContext, with the default parameters for the ones that are None.
+
+        Args:
+            numeric_backend: An optional string with the name of the numeric backend (see NUMERIC_BACKENDS).
+            revisions_weight: An optional number with the revisions weight.
+            fixes_weight: An optional number with the fixes weight.
+            authors_weight: An optional number with the authors weight.
+            time_range: An optional number from 0 to 1 with the time range.
+        """
+        self.numeric_backend = get_numeric_backend(numeric_backend)
+        self.revisions_weight = self.number(AnalysisContext.REVISIONS_WEIGHT if revisions_weight is None
+                                            else revisions_weight)
+        self.fixes_weight = self.number(AnalysisContext.FIXES_WEIGHT if fixes_weight is None else fixes_weight)
+        self.authors_weight = self.number(AnalysisContext.AUTHORS_WEIGHT if authors_weight is None
+                                          else authors_weight)
+        self.time_range = self.number(AnalysisContext.TIME_RANGE if time_range is None else time_range)
+        self.fixes_dataset = set()
+
+    def with_weights(self, revisions_weight, fixes_weight, authors_weight):
+        """ Creates a context with other features weights, the same numeric backend and an empty dataset.
+
+        Args:
+            revisions_weight: A number with the revisions weight.
+            fixes_weight: A number with the fixes weight.
+            authors_weight: A number with the authors weight.
+
+        Returns:
+            An AnalysisContext instance.
+        """
+        context = AnalysisContext.__new__(AnalysisContext)
+        context.numeric_backend = self.numeric_backend
+        context.revisions_weight = revisions_weight
+        context.fixes_weight = fixes_weight
+        context.authors_weight = authors_weight
+        context.time_range = self.time_range
+        context.fixes_dataset = set()
+        return context
+
+    def number(self, value):
+        """ Converts a value to a number of the numeric backend. """
+        return self.numeric_backend.number(value)
+
+    def twr(self, begin_ts, ts, current_ts):
+        """ Computes a Time Weighted Risk parcel.
+
+        Normalizes the timestamps and returns the TWR parcel.
+
+        Args:
+            begin_ts: An int representing the beginning timestamp.
+            ts: An int representing a specific timestamp.
+            current_ts: An int representing the most recent timestamp.
+
+        Returns:
+            A number from 0 to 0.5.
+        """
+        return self.numeric_backend.twr(begin_ts, ts, current_ts, self.time_range)
+
+    def list_twr(self, seq, begin_ts, current_ts, twr_by_ts=None):
+        """ Computes the TWR sum from a list.
+
+        By receiving a list, computes the TWR sum, by giving the begin timestamp
+        and the most current timestamp.
+
+        Args:
+            seq: A list of timestamps ints.
+            begin_ts: An int representing the beginning timestamp.
+            current_ts: An int representing the most recent timestamp.
+            twr_by_ts: An optional dict that maps timestamps to TWR already computed with the same bounds.
+
+        Returns:
+            A number representing the TWR sum.
+        """
+
+        twr_sum = 0
+        for ts in seq:
+            twr = twr_by_ts.get(ts) if twr_by_ts else None
+            twr_sum += self.twr(begin_ts, ts, current_ts) if twr is None else twr
+        return twr_sum
+
+    def snapshot_twr(self, begin_ts, revisions_timestamps, fixes_timestamps, authors_timestamps):
+        """ Computes the TWR sums of a component history, normalized to its last revision.
+
+        The normalization changes with every revision, so the sums can't be accumulated. With the float backend
+        and numpy, each sum is one vectorized pass over the timestamps.
+
+        Args:
+            begin_ts: An int representing the beginning timestamp.
+            revisions_timestamps: A non empty list of revisions timestamps ints.
+            fixes_timestamps: A list of fixes timestamps ints.
+            authors_timestamps: A list of new authors timestamps ints.
+
+        Returns:
+            A tuple of numbers (revisions_twr, fixes_twr, authors_twr).
+        """
+        last_revision_timestamp = revisions_timestamps[-1]
+        if numpy is not None and self.numeric_backend is FloatBackend:
+            diff = last_revision_timestamp - begin_ts
+            sums = []
+            for seq in (revisions_timestamps, fixes_timestamps, authors_timestamps):
+                timestamps = numpy.array(seq, dtype=numpy.float64)
+                normalized = (timestamps - begin_ts) / diff if diff else numpy.ones(len(timestamps))
+                with numpy.errstate(over="ignore"):  # Timestamps long before the beginning have a TWR of 0
+                    sums.append(float(twr_sigmoid(normalized, self.time_range, numpy.exp).sum()))
+            return tuple(sums)
+        # Fixes and authors timestamps are also revisions timestamps
+        twr_by_ts = {}
+        for ts in revisions_timestamps:
+            if ts not in twr_by_ts:
+                twr_by_ts[ts] = self.twr(begin_ts, ts, last_revision_timestamp)
+        return tuple(self.list_twr(seq, begin_ts, last_revision_timestamp, twr_by_ts)
+                     for seq in (revisions_timestamps, fixes_timestamps, authors_timestamps))
+
+    def compute_defect_probability(self, r_twr, f_twr, a_twr, r_weight=None, f_weight=None, a_weight=None):
+        """ Computes the defect probability from the TWR sums.
+
+        Args:
+            r_twr: A number with the revisions TWR.
+            f_twr: A number with the fixes TWR.
+            a_twr: A number with the authors TWR.
+            r_weight: An optional number with the revisions weight, instead of the context one.
+            f_weight: An optional number with the fixes weight, instead of the context one.
+            a_weight: An optional number with the authors weight, instead of the context one.
+
+        Returns:
+            A number from 0 to 1.
+        """
+        r_weight = self.revisions_weight if r_weight is None else r_weight
+        f_weight = self.fixes_weight if f_weight is None else f_weight
+        a_weight = self.authors_weight if a_weight is None else a_weight
+        twr = r_twr * r_weight + f_twr * f_weight + a_twr * a_weight
+        probability = 1 - self.numeric_backend.exp(- twr)
+        return probability
@@ -0,0 +1,169 @@
+# Copyright (c) 2015 Faculty of Engineering of the University of Porto
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+""" Module for writing analytics to files.
+
+The analytics are written while the tree is traversed, so a big repository is never converted
+to a whole dict in memory.
+"""
+
+import contextlib
+import csv
+import gzip
+import io
+import json
+import sys
+from .repository_analytics import MethodAnalytics, FunctionAnalytics
+
+
+FLAT_FORMATS = ("csv", "tsv", "ndjson")
+
+FLAT_COLUMNS = ("path", "class", "method", "granularity", "revisions", "fixes", "authors", "revisions_twr",
+                "fixes_twr", "authors_twr", "defect_prob")
+
+
+@contextlib.contextmanager
+def open_output(path=None, compress=False):
+    """ Opens a text stream to write analytics.
+
+    Args:
+        path: An optional string with the file path, the standard output is used when it is None.
+        compress: An optional boolean that compresses the output with gzip.
+
+    Yields:
+        A text stream.
+    """
+    if path and compress:
+        with gzip.open(path, "wt", encoding="utf-8") as stream:
+            yield stream
+    elif path:
+        with open(path, "w", encoding="utf-8") as stream:
+            yield stream
+    elif compress:
+        with gzip.GzipFile(fileobj=sys.stdout.buffer, mode="wb") as binary:
+            stream = io.TextIOWrapper(binary, encoding="utf-8")
+            yield stream
+            stream.flush()
+            stream.detach()
+    else:
+        yield sys.stdout
+
+
+def compact_metrics(metrics_dict, precision):
+    """ Converts the defect probability strings of a dict to numbers with a precision.
+
+    Args:
+        metrics_dict: A dict of Metrics.to_dict().
+        precision: An int with the number of significant digits.
+
+    Returns:
+        The dict.
+    """
+    for key in ("size", "prob"):
+        if key in metrics_dict:
+            metrics_dict[key] = float("%.*g" % (precision, float(metrics_dict[key])))
+    return metrics_dict
+
+
+def write_json(analytics, stream, precision=None, directories=False):
+    """ Writes analytics as JSON, the same of to_dict() but written while traversing.
+
+    Args:
+        analytics: A RepositoryAnalytics instance.
+        stream: A text stream.
+        precision: An optional int with the significant digits of the defect probabilities, that are
+            written as numbers. When it is None, they are written as strings with every digit.
+        directories: An optional boolean that nests the files in their directories (see to_dict()).
+    """
+    children = analytics.directory_items() if directories else None
+    write_json_node(analytics.to_dict(children=False), analytics, stream, precision, children)
+    stream.write("\n")
+
+
+def write_json_node(metrics_dict, analytics, stream, precision, children=None):
+    """ Writes the JSON object of an analytics node and its children, the child_items() when they are None. """
+    if precision is not None:
+        compact_metrics(metrics_dict, precision)
+    if isinstance(analytics, MethodAnalytics):  # Leaf
+        stream.write(json.dumps(metrics_dict))
+        return
+    stream.write(json.dumps(metrics_dict)[:-1])
+    stream.write(', "children": [' if metrics_dict else '"children": [')
+    separator = ""
+    for name, child in analytics.child_items() if children is None else children:
+        stream.write(separator)
+        write_json_node(child.to_dict(name, children=False), child, stream, precision)
+        separator = ", "
+    stream.write("]}")
+
+
+def flat_rows(analytics, precision=None, granularity=None, path_prefix=None):
+    """ Iterates over the components as flat rows, without building the analytics tree.
+
+    Args:
+        analytics: A RepositoryAnalytics instance.
+        precision: An optional int with the significant digits of the TWR and defect probabilities.
+        granularity: An optional string with the granularity of the components (see GRANULARITIES).
+        path_prefix: An optional string that the files paths must start with.
+
+    Yields:
+        Tuples with the values of FLAT_COLUMNS. Nested classes names are joined with a dot and functions
+        have an empty class. The paths of directories end with a slash.
+    """
+    number = (lambda n: n) if precision is None else (lambda n: float("%.*g" % (precision, float(n))))
+    for component, metrics in analytics.components(granularity, path_prefix):
+        if isinstance(metrics, FunctionAnalytics):
+            class_name, method_name = "", component[-1]
+        elif isinstance(metrics, MethodAnalytics):
+            class_name, method_name = ".".join(component[1:-1]), component[-1]
+        else:
+            class_name, method_name = ".".join(component[1:]), ""
+        yield (component[0], class_name, method_name, metrics.GRANULARITY, metrics.revisions, metrics.fixes,
+               len(metrics.authors), number(metrics.revisions_twr), number(metrics.fixes_twr),
+               number(metrics.authors_twr), number(metrics.defect_prob))
+
+
+def write_flat(analytics, stream, flat_format="csv", precision=None, granularity=None, path_prefix=None):
+    """ Writes one row per component, as CSV or TSV with a header or as newline delimited JSON.
+
+    Args:
+        analytics: A RepositoryAnalytics instance.
+        stream: A text stream.
+        flat_format: An optional string with the format (see FLAT_FORMATS).
+        precision: An optional int with the significant digits of the TWR and defect probabilities.
+        granularity: An optional string with the granularity of the components (see GRANULARITIES).
+        path_prefix: An optional string that the files paths must start with.
+
+    Raises:
+        ValueError: When the format or the granularity doesn't exist.
+    """
+    if flat_format not in FLAT_FORMATS:
+        raise ValueError("Unknown format %s, choose one of: %s" % (flat_format, ", ".join(FLAT_FORMATS)))
+    rows = flat_rows(analytics, precision, granularity, path_prefix)
+    if flat_format == "ndjson":
+        for row in rows:
+            # JSON doesn't have decimals, so every number is a float
+            stream.write(json.dumps(dict(zip(FLAT_COLUMNS, row)), default=float))
+            stream.write("\n")
+    else:
+        writer = csv.writer(stream, delimiter="\t" if flat_format == "tsv" else ",", lineterminator="\n")
+        writer.writerow(FLAT_COLUMNS)
+        writer.writerows(rows)
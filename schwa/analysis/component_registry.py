@@ -0,0 +1,308 @@
+# Copyright (c) 2015 Faculty of Engineering of the University of Porto
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+""" Module for the resolvers of the components analytics.
+
+The analysis resolves every diff to the analytics of its component, adding, renaming and removing components
+like the dicts of the nested analytics. ComponentResolver has these rules, and its subclasses keep the components
+in a flat registry (ComponentRegistry) or in the nested dicts of existing analytics (ComponentTree).
+"""
+
+import abc
+
+from .repository_analytics import FileAnalytics, ClassAnalytics, MethodAnalytics, FunctionAnalytics
+
+
+class ComponentResolver:
+    """ Abstract class for the resolvers of the components analytics, keyed by (path, class, method) tuples.
+
+    The keys are (path,) for files, (path, class) for classes, (path, class, method) for methods and
+    (path, "", function) for functions.
+
+    Attributes:
+        context: The AnalysisContext of the new analytics.
+        lean: A boolean that enables lean analytics (see Metrics).
+    """
+    __metaclass__ = abc.ABCMeta
+
+    def __init__(self, context=None, lean=False):
+        self.context = context
+        self.lean = lean
+
+    @abc.abstractmethod
+    def __contains__(self, key):
+        """ Checks if a component exists. """
+
+    @abc.abstractmethod
+    def get(self, key):
+        """ Gets the analytics of a component, or None if it doesn't exist. """
+
+    @abc.abstractmethod
+    def add(self, key):
+        """ Adds new analytics for a component, replacing the ones with the same key and their children.
+
+        Like a dict assignment, a replaced component keeps its position.
+
+        Args:
+            key: A tuple with the component key.
+
+        Returns:
+            The new analytics.
+        """
+
+    @abc.abstractmethod
+    def rename(self, key_a, key_b):
+        """ Re-keys a component and its children, replacing the component with the new key.
+
+        Args:
+            key_a: A tuple with the existing key of the component.
+            key_b: A tuple with the new key, with the same parent.
+
+        Returns:
+            The analytics of the component.
+        """
+
+    @abc.abstractmethod
+    def remove(self, key):
+        """ Removes a component and its children. """
+
+    @abc.abstractmethod
+    def attach(self, analytics):
+        """ Sets the resolved components as the files analytics of a RepositoryAnalytics instance. """
+
+    @staticmethod
+    def parent_key(key):
+        """ Gets the key of the parent of a component, the file of a function or () for a file. """
+        if len(key) == 3 and not key[1]:
+            return key[:1]
+        return key[:-1]
+
+    @staticmethod
+    def analytics_class(key):
+        """ Gets the Metrics subclass of a component key. """
+        if len(key) == 1:
+            return FileAnalytics
+        if len(key) == 2:
+            return ClassAnalytics
+        return MethodAnalytics if key[1] else FunctionAnalytics
+
+    def resolve(self, prefix, diff):
+        """ Gets the analytics of the component changed by a diff, updating the components like a dict of the tree.
+
+        Args:
+            prefix: A tuple with the key of the parent, or (path, "") for functions.
+            diff: A DiffFile, DiffClass or DiffMethod instance.
+
+        Returns:
+            The analytics to update, or None when the component was removed.
+        """
+        key_b = prefix + (diff.component_b(),)
+        if diff.added:
+            return self.add(key_b)
+        elif diff.modified:
+            analytics = self.get(key_b)
+            return analytics if analytics is not None else self.add(key_b)
+        elif diff.renamed:
+            key_a = prefix + (diff.component_a(),)
+            if key_a not in self:
+                return self.add(key_b)
+            return self.rename(key_a, key_b)
+        elif diff.removed:
+            key_a = prefix + (diff.component_a(),)
+            if key_a in self:
+                self.remove(key_a)
+        return None
+
+
+class ComponentRegistry(ComponentResolver):
+    """ A flat registry of the components analytics, built into nested dicts on demand (see build()).
+
+    Walking the nested dicts costs a lookup per granularity, so a new analysis keeps a flat registry. Every
+    component has a stable integer id, that is kept when the component, or its parent, is renamed.
+    A replaced component keeps its id too, and the ids of removed components aren't reused, so they can index
+    arrays of metrics.
+
+    The order of the keys is the order of the nested dicts of the analysis, e.g. a renamed component
+    goes to the end of its parent dict.
+
+    Attributes:
+        ids: A dict that maps the keys of the registered components to their ids.
+        keys: A list with the key of each id, None if the component was removed.
+        analytics: A list with the analytics of each id, None if the component was removed.
+        children: A dict that maps the keys of the components to a dict with the keys of their children.
+    """
+
+    def __init__(self, context=None, lean=False):
+        super().__init__(context, lean)
+        self.ids = {}
+        self.keys = []
+        self.analytics = []
+        self.children = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, key):
+        return key in self.ids
+
+    def get(self, key):
+        component_id = self.ids.get(key)
+        return None if component_id is None else self.analytics[component_id]
+
+    def add(self, key):
+        component_id = self.ids.get(key)
+        if component_id is None:
+            self.children.setdefault(self.parent_key(key), {})[key] = None
+            component_id = self.ids[key] = len(self.analytics)
+            self.keys.append(key)
+            self.analytics.append(None)
+        else:  # The replaced component keeps its id
+            self.remove_children(key)
+        analytics = self.analytics[component_id] = self.analytics_class(key)(self.context, self.lean)
+        return analytics
+
+    def rename(self, key_a, key_b):
+        component_id = self.ids.pop(key_a)
+        del self.children[self.parent_key(key_a)][key_a]
+        children = self.children.pop(key_a, {})
+        replaced_id = self.ids.get(key_b)
+        if replaced_id is None:
+            self.children.setdefault(self.parent_key(key_b), {})[key_b] = None
+        else:  # Like a dict assignment, the renamed component takes the position of the replaced one
+            self.remove_children(key_b)
+            self.keys[replaced_id] = None
+            self.analytics[replaced_id] = None
+        self.ids[key_b] = component_id
+        self.keys[component_id] = key_b
+        if children:
+            self.children[key_b] = {}
+        for child_key in children:
+            self.move(child_key, key_b + child_key[len(key_a):])
+        return self.analytics[component_id]
+
+    def move(self, key_a, key_b):
+        """ Re-keys a child of a renamed component and its children. """
+        component_id = self.ids.pop(key_a)
+        self.children[self.parent_key(key_b)][key_b] = None
+        self.ids[key_b] = component_id
+        self.keys[component_id] = key_b
+        children = self.children.pop(key_a, ())
+        if children:
+            self.children[key_b] = {}
+        for child_key in children:
+            self.move(child_key, key_b + child_key[len(key_a):])
+
+    def remove(self, key):
+        self.remove_children(key)
+        del self.children[self.parent_key(key)][key]
+        self.unregister(key)
+
+    def remove_children(self, key):
+        for child_key in self.children.pop(key, ()):
+            self.remove_children(child_key)
+            self.unregister(child_key)
+
+    def unregister(self, key):
+        component_id = self.ids.pop(key)
+        self.keys[component_id] = None
+        self.analytics[component_id] = None
+
+    def attach(self, analytics):
+        """ Sets the registry of the analytics, whose nested dicts are built on the first access. """
+        analytics.registry = self
+
+    def build(self, analytics):
+        """ Builds the nested dicts of the registered components, replacing the files analytics. """
+        files_analytics = {}
+        for key, component_id in self.ids.items():
+            metrics = self.analytics[component_id]
+            if len(key) == 1:
+                metrics.classes_analytics = {}
+                metrics.functions_analytics = {}
+            elif len(key) == 2:
+                metrics.methods_analytics = {}
+                metrics.classes_analytics = {}
+        for key, component_id in self.ids.items():
+            metrics = self.analytics[component_id]
+            if len(key) == 1:
+                files_analytics[key[0]] = metrics
+            elif len(key) == 2:
+                self.analytics[self.ids[key[:1]]].classes_analytics[key[1]] = metrics
+            elif key[1]:
+                self.analytics[self.ids[key[:2]]].methods_analytics[key[2]] = metrics
+            else:
+                self.analytics[self.ids[key[:1]]].functions_analytics[key[2]] = metrics
+        analytics.files_analytics = files_analytics
+
+
+class ComponentTree(ComponentResolver):
+    """ The components of existing analytics, updated in place in their nested dicts.
+
+    It resolves the components of analytics that are already built, e.g. replayed by the time travel or stored
+    in a database, where the nested dicts are a StoredDict (see SQLiteRepositoryAnalytics).
+
+    Attributes:
+        analytics: The RepositoryAnalytics instance whose components are resolved.
+    """
+
+    def __init__(self, analytics, context=None, lean=False):
+        super().__init__(context, lean)
+        self.analytics = analytics
+
+    def __contains__(self, key):
+        parent_dict = self.parent_dict(key)
+        return parent_dict is not None and key[-1] in parent_dict
+
+    def parent_dict(self, key):
+        """ Gets the dict of the parent of a component that has it, or None if the parent doesn't exist. """
+        files_analytics = self.analytics.files_analytics
+        if len(key) == 1:
+            return files_analytics
+        file_analytics = files_analytics.get(key[0])
+        if file_analytics is None:
+            return None
+        if len(key) == 2:
+            return file_analytics.classes_analytics
+        if not key[1]:
+            return file_analytics.functions_analytics
+        class_analytics = file_analytics.classes_analytics.get(key[1])
+        return None if class_analytics is None else class_analytics.methods_analytics
+
+    def get(self, key):
+        parent_dict = self.parent_dict(key)
+        return None if parent_dict is None else parent_dict.get(key[-1])
+
+    def add(self, key):
+        analytics = self.analytics_class(key)(self.context, self.lean)
+        self.parent_dict(key)[key[-1]] = analytics
+        return analytics
+
+    def rename(self, key_a, key_b):
+        parent_dict = self.parent_dict(key_a)
+        analytics = parent_dict.pop(key_a[-1])
+        parent_dict[key_b[-1]] = analytics
+        return analytics
+
+    def remove(self, key):
+        del self.parent_dict(key)[key[-1]]
+
+    def attach(self, analytics):
+        """ Does nothing, the components are already in the nested dicts. """
@@ -0,0 +1,132 @@
+# Copyright (c) 2015 Faculty of Engineering of the University of Porto
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+""" Module for the Numeric Backends of the Metrics.
+
+A numeric backend does the arithmetic of the TWR and defect probability formulas. Float is the default,
+since it runs at native speed, while Decimal is kept as a precision mode.
+"""
+
+import abc
+import math
+from decimal import Decimal
+
+
+def twr_sigmoid(normalized, time_range, exp):
+    """ Computes the Time Weighted Risk sigmoid of normalized timestamps.
+
+    It only uses arithmetic operators and exp, so it works for a number or for numpy arrays, where the
+    normalized timestamps and the time ranges broadcast.
+
+    Args:
+        normalized: A number from 0 to 1 with the normalized timestamp, or an array of them.
+        time_range: A number from 0 to 1 with the time range, or an array of them.
+        exp: A function that computes e raised to its argument, e.g. math.exp or numpy.exp.
+
+    Returns:
+        A number from 0 to 1, or an array of them.
+    """
+    return 1 / (1 + exp(-12 * normalized + 2 + (1 - time_range) * 10))
+
+
+class AbstractNumericBackend:
+    """ An abstract Numeric Backend.
+
+    It should have number(), exp() and twr() static methods.
+    """
+    __metaclass__ = abc.ABCMeta
+
+    @abc.abstractstaticmethod
+    def number(value):
+        """ Converts a value to a number of the backend """
+
+    @abc.abstractstaticmethod
+    def exp(value):
+        """ Computes e raised to a number of the backend """
+
+    @abc.abstractstaticmethod
+    def twr(begin_ts, ts, current_ts, time_range):
+        """ Computes a Time Weighted Risk parcel (see AnalysisContext.twr) """
+
+
+class FloatBackend(AbstractNumericBackend):
+    """ A Numeric Backend based on float64 math. """
+
+    number = float
+
+    @staticmethod
+    def exp(value):
+        return math.exp(value)
+
+    @staticmethod
+    def twr(begin_ts, ts, current_ts, time_range):
+        diff = current_ts - begin_ts
+        normalized = (ts - begin_ts) / diff if diff else 1
+        try:
+            return twr_sigmoid(normalized, time_range, math.exp)
+        except OverflowError:  # Timestamps long before the beginning
+            return 0.0
+
+
+class DecimalBackend(AbstractNumericBackend):
+    """ A Numeric Backend based on Decimal, that doesn't accumulate errors but is much slower. """
+
+    number = Decimal
+
+    @staticmethod
+    def exp(value):
+        return Decimal(value).exp()
+
+    @staticmethod
+    def twr(begin_ts, ts, current_ts, time_range):
+        begin_diff = ts - begin_ts
+        diff = current_ts - begin_ts
+        if diff == 0:
+            normalized = 1
+        else:
+            normalized = Decimal(begin_diff) / Decimal(diff)
+        return twr_sigmoid(normalized, Decimal(time_range), Decimal.exp)
+
+
+NUMERIC_BACKENDS = {
+    "float": FloatBackend,
+    "decimal": DecimalBackend
+}
+
+DEFAULT_NUMERIC_BACKEND = "float"
+
+
+def get_numeric_backend(name=None):
+    """ Gets a Numeric Backend by name.
+
+    Args:
+        name: An optional string with the backend name. The default backend is used when it is None.
+
+    Returns:
+        A subclass of AbstractNumericBackend.
+
+    Raises:
+        ValueError: When the backend doesn't exist.
+    """
+    try:
+        return NUMERIC_BACKENDS[name or DEFAULT_NUMERIC_BACKEND]
+    except KeyError:
+        raise ValueError("Unknown numeric backend %s, choose one of: %s" % (name, ", ".join(sorted(NUMERIC_BACKENDS))))
@@ -22,47 +22,60 @@
 
 This module is the most important to understand the Schwa API.
 Here the analytics structure is declared and the defect probability
-is computed. Science is being done here! We use Decimal from the standard library
-since results were accumulating errors.
+is computed. Science is being done here! The arithmetic is done by a numeric backend,
+float64 by default or Decimal from the standard library when precision matters (see numeric_backend).
 """
 
+import heapq
 import re
-from decimal import Decimal
+from itertools import chain
+from .analysis_context import AnalysisContext
+from .score_view import ScoreView
+
+
+GRANULARITIES = ("directory", "file", "class", "method", "function")
 
 
 class Metrics:
     """ A class for representing a set of Metrics.
 
-    In analysis, each component have their analytics represented by a Metric instance.
+    In analysis, each component have their analytics represented by a Metric instance. The parameters
+    of the formulas and the bug fixes dataset are in the context of the analysis.
 
     Attributes:
-        fixes_dataset: A set of (revisions_twr, fixes_twr, authors_twr) that had a bug.
-        FIXES_WEIGHT: A Decimal having the fixes weight for the defect probability computation.
-        AUTHORS_WEIGHT: A Decimal having the authors weight for the defect probability computation.
-        REVISIONS_WEIGHT: A Decimal having the revisions weight for the defect probability computation.
-        TIME_RANGE: A Decimal from 0 to 1 that changes the time range of the TWR function.
-        revisions_timestamps: A list that stores the timestamps of every revision.
-        fixes_timestamps: A list that stores the timestamps of every bug fixing.
-        authors_timestamps: A list that stores the timestamps of when a component had a new author.
-        revisions_twr: A Decimal that is an accumulator of revisions TWR (see TWR formula).
-        fixes_twr: A Decimal that is an accumulator of fixes TWR (see TWR formula).
-        authors_twr: A Decimal that is an accumulator of authors TWR (see TWR formula).
+        context: The AnalysisContext of the analysis.
+        revisions_timestamps: A list that stores the timestamps of every revision, None if lean.
+        fixes_timestamps: A list that stores the timestamps of every bug fixing, None if lean.
+        authors_timestamps: A list that stores the timestamps of when a component had a new author, None if lean.
+        revisions_twr: A number that is an accumulator of revisions TWR (see TWR formula).
+        fixes_twr: A number that is an accumulator of fixes TWR (see TWR formula).
+        authors_twr: A number that is an accumulator of authors TWR (see TWR formula).
         authors: A set that have all email of authors that contributed (see TWR formula).
         fixes: An int that is a counter of bug fixes.
         revisions: An int that is a counter of revisions.
-        defect_prob: A Decimal representing the defect probability.
+        defect_prob: A number representing the defect probability.
+        last_twr: A tuple (revisions_twr, fixes_twr, authors_twr) of the last bug fix or None.
+        BUG_CASES: A boolean that indicates if the bug fixes of the component are cases of the fixes dataset.
     """
 
-    fixes_dataset = set()
-    FIXES_WEIGHT = Decimal(0.5)
-    AUTHORS_WEIGHT = Decimal(0.25)
-    REVISIONS_WEIGHT = Decimal(0.25)
-    TIME_RANGE = Decimal(0.4)
+    __slots__ = ("context", "revisions_timestamps", "fixes_timestamps", "authors_timestamps", "revisions_twr",
+                 "fixes_twr", "authors_twr", "authors", "fixes", "revisions", "defect_prob", "last_twr")
+
+    BUG_CASES = True
+
+    def __init__(self, context=None, lean=False):
+        """ Inits Metrics.
 
-    def __init__(self):
-        self.revisions_timestamps = []
-        self.fixes_timestamps = []
-        self.authors_timestamps = []
+        Args:
+            context: An optional AnalysisContext, shared by the Metrics of an analysis. A new context
+                with the default parameters is created when it is None.
+            lean: An optional boolean that drops the timestamps lists, keeping only the accumulators. Lean
+                metrics use less memory, but don't take TWR snapshots since they need the history.
+        """
+        self.context = context if context else AnalysisContext()
+        self.revisions_timestamps = None if lean else []
+        self.fixes_timestamps = None if lean else []
+        self.authors_timestamps = None if lean else []
         self.revisions_twr = 0
         self.fixes_twr = 0
         self.authors_twr = 0
@@ -72,52 +85,7 @@ class Metrics:
         self.defect_prob = 0
         self.last_twr = None
 
-    @staticmethod
-    def twr(begin_ts, ts, current_ts):
-        """ Computes a Time Weighted Risk parcel.
-
-        Normalizes the timestamps and returns the TWR parcel.
-
-        Args:
-            begin_ts: An int representing the beginning timestamp.
-            ts: An int representing a specific timestamp.
-            current_ts: An int representing the most recent timestamp.
-
-        Returns:
-            A Decimal from 0 to 0.5.
-        """
-
-        begin_diff = ts - begin_ts
-        diff = current_ts - begin_ts
-        if diff == 0:
-            normalized = 1
-        else:
-            normalized = Decimal(begin_diff) / Decimal(diff)
-        twr = 1 / (1 + Decimal.exp(Decimal(-12) * normalized + Decimal(2) + ((1 - Metrics.TIME_RANGE) * 10)))
-        return twr
-
-    @staticmethod
-    def list_twr(seq, begin_ts, current_ts):
-        """ Computes the TWR sum from a list.
-
-        By receiving a list, computes the TWR sum, by giving the begin timestamp
-        and the most current timestamp.
-
-        Args:
-            seq: A list of timestamps ints.
-            begin_ts: An int representing the beginning timestamp.
-            current_ts: An int representing the most recent timestamp.
-
-        Returns:
-            A float representing the TWR sum.
-        """
-
-        twr_sum = 0
-        for ts in seq:
-            twr_sum += Metrics.twr(begin_ts, ts, current_ts)
-        return twr_sum
-
-    def update(self, begin_ts, ts, current_ts, author, is_bug_fixing):
+    def update(self, begin_ts, ts, current_ts, author, is_bug_fixing, twr=None):
         """ Updates metrics.
 
         By receiving the commit information, updates the existing metrics.
@@ -128,54 +96,100 @@ class Metrics:
             current_ts: An int representing the most recent timestamp.
             author: A string representing the author email.
             is_bug_fixing: A boolean that indicates if is a bug fixing commit
+            twr: An optional number with the TWR of the commit, if it was already computed.
         """
 
+        if twr is None:
+            twr = self.context.twr(begin_ts, ts, current_ts)
+        history = self.revisions_timestamps is not None
         # Updates fixes
         if is_bug_fixing:
             self.add_to_dataset(begin_ts)
             self.fixes += 1
-            self.fixes_timestamps.append(ts)
-            self.fixes_twr += Metrics.twr(begin_ts, ts, current_ts)
+            if history:
+                self.fixes_timestamps.append(ts)
+            self.fixes_twr += twr
         # Updates revisions
         self.revisions += 1
-        self.revisions_timestamps.append(ts)
-        self.revisions_twr += Metrics.twr(begin_ts, ts, current_ts)
+        if history:
+            self.revisions_timestamps.append(ts)
+        self.revisions_twr += twr
         # Updates authors
         if author not in self.authors:
             self.authors.add(author)
-            self.authors_timestamps.append(ts)
-            self.authors_twr += Metrics.twr(begin_ts, ts, current_ts)
+            if history:
+                self.authors_timestamps.append(ts)
+            self.authors_twr += twr
 
     def add_to_dataset(self, begin_ts):
         """ Adds a bug case to a dataset.
 
         Adds (revisions_twr, fixes_twr, authors_twr) when a bug fix happened,
         since this metrics indicate a presence of a bug. The reasoning is that
-        in the last revision, the component had a bug.
+        in the last revision, the component had a bug (see AnalysisContext.snapshot_twr).
 
         Args:
             begin_ts: An int that is timestamp of the first commit.
         """
 
-        if self.revisions_timestamps:
-            last_revision_timestamp = self.revisions_timestamps[-1]
-            revisions_twr = Metrics.list_twr(self.revisions_timestamps, begin_ts, last_revision_timestamp)
-            fixes_twr = Metrics.list_twr(self.fixes_timestamps, begin_ts, last_revision_timestamp)
-            authors_twr = Metrics.list_twr(self.authors_timestamps, begin_ts, last_revision_timestamp)
-            self.last_twr = (revisions_twr, fixes_twr, authors_twr)
-            Metrics.fixes_dataset.add((revisions_twr, fixes_twr, authors_twr))
+        if self.BUG_CASES and self.revisions_timestamps:  # Lean metrics don't have the history
+            self.last_twr = self.context.snapshot_twr(begin_ts, self.revisions_timestamps, self.fixes_timestamps,
+                                                      self.authors_timestamps)
+            self.context.fixes_dataset.add(self.last_twr)
+
+    def rebase(self, begin_ts, current_ts, twr_by_ts=None):
+        """ Recomputes the TWR accumulators from the timestamps lists, with other timestamps bounds.
+
+        Args:
+            begin_ts: An int representing the beginning timestamp.
+            current_ts: An int representing the most recent timestamp.
+            twr_by_ts: An optional dict that maps timestamps to TWR already computed with the same bounds.
+
+        Raises:
+            ValueError: When the metrics are lean, since they don't have the history.
+        """
+        if self.revisions_timestamps is None:
+            raise ValueError("Lean metrics can't be rebased, since they don't have the timestamps history")
+        self.revisions_twr = self.context.list_twr(self.revisions_timestamps, begin_ts, current_ts, twr_by_ts)
+        self.fixes_twr = self.context.list_twr(self.fixes_timestamps, begin_ts, current_ts, twr_by_ts)
+        self.authors_twr = self.context.list_twr(self.authors_timestamps, begin_ts, current_ts, twr_by_ts)
+
+    def set_context(self, context):
+        """ Sets the context of the metrics and of every child. """
+        self.context = context
+
+    def copy(self, context=None):
+        """ Copies the metrics and every child, much faster than copy.deepcopy().
+
+        Args:
+            context: An optional AnalysisContext of the copy, the same context when it is None.
+
+        Returns:
+            An instance of the same class.
+        """
+        metrics = self.__class__.__new__(self.__class__)
+        metrics.context = context if context else self.context
+        history = self.revisions_timestamps is not None
+        metrics.revisions_timestamps = list(self.revisions_timestamps) if history else None
+        metrics.fixes_timestamps = list(self.fixes_timestamps) if history else None
+        metrics.authors_timestamps = list(self.authors_timestamps) if history else None
+        metrics.revisions_twr = self.revisions_twr
+        metrics.fixes_twr = self.fixes_twr
+        metrics.authors_twr = self.authors_twr
+        metrics.authors = set(self.authors)
+        metrics.fixes = self.fixes
+        metrics.revisions = self.revisions
+        metrics.defect_prob = self.defect_prob
+        metrics.last_twr = self.last_twr
+        return metrics
 
     def defect_probability(self):
-        probability = Metrics.compute_defect_probability(self.revisions_twr, self.fixes_twr, self.authors_twr,
-                                                         Metrics.REVISIONS_WEIGHT, Metrics.FIXES_WEIGHT,
-                                                         Metrics.AUTHORS_WEIGHT)
+        probability = self.context.compute_defect_probability(self.revisions_twr, self.fixes_twr, self.authors_twr)
         return probability
 
-    @staticmethod
-    def compute_defect_probability(r_twr, f_twr, a_twr, r_weight, f_weight, a_weight):
-        twr = r_twr * r_weight + f_twr * f_weight + a_twr * a_weight
-        probability = 1 - Decimal.exp(- twr)
-        return probability
+    def child_items(self):
+        """ Gets the (name, analytics) pairs of the children, in the order of to_dict(). """
+        return ()
 
     def to_dict(self):
         metrics_dict = {
@@ -194,71 +208,302 @@ def strip_path(path):
     return name_re.search(path).group(0)
 
 
+def directory_paths(path):
+    """ Gets the paths of the directories of a file path, from the top one, e.g. ["src/", "src/api/"]. """
+    parts = path.split("/")[:-1]
+    return ["/".join(parts[:index + 1]) + "/" for index in range(len(parts))]
+
+
 class RepositoryAnalytics(Metrics):
     """ Represents the Analytics of a Repository.
 
-    It stores the files analytics using a dict.
+    It stores the files and directories analytics using dicts. The files analytics of an analysis are
+    resolved with a ComponentRegistry, and their nested dicts are built on the first access.
 
     Attributes:
         files_analytics: A dict that maps files paths to FileAnalytics instances.
+        registry: The ComponentRegistry of the files analytics until their dicts are built, otherwise None.
+        directories_analytics: A dict that maps directories paths, ending with a slash, to DirectoryAnalytics
+            instances. A directory is kept after its files are removed, but it isn't a component anymore.
+        begin_ts: An int with the beginning timestamp of the TWR, or None if unknown.
+        last_ts: An int with the most recent timestamp of the TWR, or None if unknown.
+        STORED: A boolean that indicates if the analytics are stored, so their components are updated in place.
 
     """
 
-    def __init__(self):
-        super().__init__()
+    __slots__ = ("_files_analytics", "registry", "directories_analytics", "begin_ts", "last_ts")
+
+    STORED = False
+
+    def __init__(self, context=None, lean=False):
+        super().__init__(context, lean)
         self.files_analytics = {}
+        self.directories_analytics = {}
+        self.begin_ts = None
+        self.last_ts = None
+
+    @property
+    def files_analytics(self):
+        if self.registry is not None:
+            self.registry.build(self)
+        return self._files_analytics
+
+    @files_analytics.setter
+    def files_analytics(self, files_analytics):
+        self.registry = None
+        self._files_analytics = files_analytics
 
     def is_empty(self):
         return len(self.files_analytics) == 0
 
+    def flush(self, force=False):
+        """ Persists the changed analytics, analytics in memory don't need it (see SQLiteRepositoryAnalytics). """
+
+    def components(self, granularity=None, path_prefix=None):
+        """ Iterates over the components analytics, without building intermediate dicts.
+
+        Args:
+            granularity: An optional string with the granularity of the components (see GRANULARITIES),
+                all the components when it is None.
+            path_prefix: An optional string that the files paths must start with.
+
+        Yields:
+            Tuples (component, analytics) where component is a tuple with the file path and the names
+            of the classes, methods and functions until the component, e.g. ("src/API.java", "API", "login"),
+            or with the directory path, e.g. ("src/",). Directories come first.
+
+        Raises:
+            ValueError: When the granularity doesn't exist.
+        """
+        if granularity is not None and granularity not in GRANULARITIES:
+            raise ValueError("Unknown granularity %s, choose one of: %s" % (granularity, ", ".join(GRANULARITIES)))
+        if granularity is None or granularity == "directory":
+            directories = {directory for path in self.files_analytics for directory in directory_paths(path)}
+            for path, directory_analytics in self.directories_analytics.items():
+                if path in directories and (not path_prefix or path.startswith(path_prefix)):
+                    yield (path,), directory_analytics
+        if granularity == "directory":
+            return
+        for path, file_analytics in self.files_analytics.items():
+            if not path_prefix or path.startswith(path_prefix):
+                yield from file_analytics.components((path,), granularity)
+
+    def rescore(self, weights, granularity=None, path_prefix=None):
+        """ Scores the components with other features weights, without analyzing the repository again.
+
+        Args:
+            weights: A dict with the "revisions", "fixes" and "authors" weights, like the learner solution.
+            granularity: An optional string with the granularity of the components (see GRANULARITIES).
+            path_prefix: An optional string that the files paths must start with.
+
+        Returns:
+            A ScoreView with the defect probabilities. These analytics aren't changed.
+
+        Raises:
+            ValueError: When a weight is missing or the granularity doesn't exist.
+        """
+        return ScoreView(self, weights, granularity, path_prefix)
+
+    def top(self, k, granularity="method", path_prefix=None, min_revisions=0):
+        """ Finds the components with the greatest defect probability.
+
+        It keeps a heap of k components while iterating, instead of sorting every component.
+
+        Args:
+            k: An int with the maximum number of components.
+            granularity: An optional string with the granularity of the components (see GRANULARITIES).
+            path_prefix: An optional string that the files paths must start with.
+            min_revisions: An optional int with the minimum number of revisions of the components.
+
+        Returns:
+            A list of tuples (component, analytics) sorted by decreasing defect probability (see components()).
+
+        Raises:
+            ValueError: When the granularity doesn't exist.
+        """
+        components = self.components(granularity, path_prefix)
+        if min_revisions:
+            components = (c for c in components if c[1].revisions >= min_revisions)
+        return heapq.nlargest(k, components, key=lambda c: c[1].defect_prob)
+
     def compute_defect_probability(self):
         """ Computes the defect probability for every child """
         self.defect_prob = self.defect_probability()
+        for directory_analytics in self.directories_analytics.values():
+            directory_analytics.compute_defect_probability()
+        if self.registry is not None:  # Without building the nested dicts
+            for metrics in self.registry.analytics:
+                if metrics is not None:
+                    metrics.defect_prob = metrics.defect_probability()
+            return
         for file_analytics in self.files_analytics.values():
             file_analytics.compute_defect_probability()
 
-    def to_dict(self):
+    def set_context(self, context):
+        super().set_context(context)
+        for directory_analytics in self.directories_analytics.values():
+            directory_analytics.set_context(context)
+        for file_analytics in self.files_analytics.values():
+            file_analytics.set_context(context)
+
+    def copy(self, context=None):
+        metrics = super().copy(context)
+        metrics.files_analytics = {path: f.copy(context) for path, f in self.files_analytics.items()}
+        metrics.directories_analytics = {path: d.copy(context) for path, d in self.directories_analytics.items()}
+        metrics.begin_ts = self.begin_ts
+        metrics.last_ts = self.last_ts
+        return metrics
+
+    def child_items(self):
+        return self.files_analytics.items()
+
+    def directory_items(self):
+        """ Links the directories to their subdirectories and files, in the order of the files.
+
+        Returns:
+            The (path, analytics) pairs of the top directories and of the files without a directory.
+        """
+        directories = {}
+        for path, directory_analytics in self.directories_analytics.items():
+            directory_analytics.children = {}
+            directories[path] = directory_analytics
+        top = {}
+        for path, file_analytics in self.files_analytics.items():
+            children = top
+            for directory in directory_paths(path):
+                directory_analytics = directories.get(directory)
+                if directory_analytics is None:  # Files added without an analysis
+                    directory_analytics = directories[directory] = DirectoryAnalytics(self.context)
+                children = children.setdefault(directory, directory_analytics).children
+            children[path] = file_analytics
+        return top.items()
+
+    def to_dict(self, children=True, directories=False):
         """ Converts repository analytics to a dict.
 
         It traverses child analytics to convert and adds some information useful
         for the Sunburst chart.
 
+        Args:
+            children: An optional boolean that includes the children, otherwise there isn't a children key.
+            directories: An optional boolean that nests the files in their directories, instead of a flat
+                list of files.
+
         Returns:
             A dict of all the analytics collected from the repository.
         """
 
-        children = [f_metrics.to_dict(f_path) for f_path, f_metrics in self.files_analytics.items()]
         metrics = {
-            "name": "root",
-            "children": children
+            "name": "root"
         }
+        if children:
+            items = self.directory_items() if directories else self.child_items()
+            metrics["children"] = [c_metrics.to_dict(c_path) for c_path, c_metrics in items]
         return metrics
 
 
+class DirectoryAnalytics(Metrics):
+    """ A class to represent Directory Analytics, e.g. of a Java package.
+
+    A directory is updated once by each commit that changes its files, or the files of its subdirectories.
+
+    Attributes:
+        GRANULARITY: A string with the granularity of the component (see GRANULARITIES).
+        children: A dict that maps the paths of the subdirectories and files to their analytics, linked
+            on demand (see RepositoryAnalytics.directory_items).
+    """
+
+    __slots__ = ("children",)
+
+    GRANULARITY = "directory"
+    BUG_CASES = False  # Directories are rollups of their files, which are already in the dataset
+
+    def __init__(self, context=None, lean=False):
+        super().__init__(context, lean)
+        self.children = {}
+
+    def compute_defect_probability(self):
+        self.defect_prob = self.defect_probability()
+
+    def copy(self, context=None):
+        metrics = super().copy(context)
+        metrics.children = {}
+        return metrics
+
+    def child_items(self):
+        return self.children.items()
+
+    def to_dict(self, path, children=True):
+        metrics_dict = super().to_dict()
+        metrics_dict["type"] = "directory"
+        metrics_dict["path"] = path
+        metrics_dict["name"] = path.rstrip("/").rsplit("/", 1)[-1]
+        if children:
+            metrics_dict["children"] = [c_metrics.to_dict(c_path) for c_path, c_metrics in self.child_items()]
+        return metrics_dict
+
+
 class FileAnalytics(Metrics):
     """ A class to represent File Analytics.
 
-    It stores child classes with a dict.
+    It stores child classes and functions with a dict.
 
     Attributes:
+        GRANULARITY: A string with the granularity of the component (see GRANULARITIES).
         classes_analytics: A dict that maps classes names to ClassAnalytics instances.
+        functions_analytics: A dict that maps functions names to FunctionAnalytics instances.
     """
 
-    def __init__(self):
-        super().__init__()
+    __slots__ = ("classes_analytics", "functions_analytics")
+
+    GRANULARITY = "file"
+
+    def __init__(self, context=None, lean=False):
+        super().__init__(context, lean)
         self.classes_analytics = {}
+        self.functions_analytics = {}
 
     def compute_defect_probability(self):
         self.defect_prob = self.defect_probability()
         for class_analytics in self.classes_analytics.values():
             class_analytics.compute_defect_probability()
+        for function_analytics in self.functions_analytics.values():
+            function_analytics.compute_defect_probability()
+
+    def set_context(self, context):
+        super().set_context(context)
+        for class_analytics in self.classes_analytics.values():
+            class_analytics.set_context(context)
+        for function_analytics in self.functions_analytics.values():
+            function_analytics.set_context(context)
+
+    def copy(self, context=None):
+        metrics = super().copy(context)
+        metrics.classes_analytics = {name: c.copy(context) for name, c in self.classes_analytics.items()}
+        metrics.functions_analytics = {name: f.copy(context) for name, f in self.functions_analytics.items()}
+        return metrics
 
-    def to_dict(self, path):
+    def components(self, component, granularity=None):
+        """ Iterates over this file and its children analytics (see RepositoryAnalytics.components). """
+        if granularity is None or granularity == "file":
+            yield component, self
+        if granularity in (None, "class", "method"):
+            for name, class_analytics in self.classes_analytics.items():
+                yield from class_analytics.components(component + (name,), granularity)
+        if granularity is None or granularity == "function":
+            for name, function_analytics in self.functions_analytics.items():
+                yield component + (name,), function_analytics
+
+    def child_items(self):
+        return chain(self.classes_analytics.items(), self.functions_analytics.items())
+
+    def to_dict(self, path, children=True):
         metrics_dict = super().to_dict()
         metrics_dict["type"] = "file"
         metrics_dict["path"] = path
         metrics_dict["name"] = strip_path(path)
-        metrics_dict["children"] = [c_metrics.to_dict(c_name) for c_name, c_metrics in self.classes_analytics.items()]
+        if children:
+            metrics_dict["children"] = [c_metrics.to_dict(c_name) for c_name, c_metrics in self.child_items()]
         return metrics_dict
 
 
@@ -268,12 +513,17 @@ class ClassAnalytics(Metrics):
     It stores child methods and classes with a dict.
 
     Attributes:
+        GRANULARITY: A string with the granularity of the component (see GRANULARITIES).
         methods_analytics: A dict that maps methods names to MethodAnalytics instances.
         classes_analytics: A dict that maps classes names to ClassAnalytics instances.
     """
 
-    def __init__(self):
-        super().__init__()
+    __slots__ = ("methods_analytics", "classes_analytics")
+
+    GRANULARITY = "class"
+
+    def __init__(self, context=None, lean=False):
+        super().__init__(context, lean)
         self.methods_analytics = {}
         self.classes_analytics = {}
 
@@ -282,13 +532,38 @@ class ClassAnalytics(Metrics):
         for method_analytics in self.methods_analytics.values():
             method_analytics.compute_defect_probability()
 
-    def to_dict(self, name):
+    def set_context(self, context):
+        super().set_context(context)
+        for method_analytics in self.methods_analytics.values():
+            method_analytics.set_context(context)
+        for class_analytics in self.classes_analytics.values():
+            class_analytics.set_context(context)
+
+    def copy(self, context=None):
+        metrics = super().copy(context)
+        metrics.methods_analytics = {name: m.copy(context) for name, m in self.methods_analytics.items()}
+        metrics.classes_analytics = {name: c.copy(context) for name, c in self.classes_analytics.items()}
+        return metrics
+
+    def components(self, component, granularity=None):
+        """ Iterates over this class and its children analytics (see RepositoryAnalytics.components). """
+        if granularity is None or granularity == "class":
+            yield component, self
+        if granularity is None or granularity == "method":
+            for name, method_analytics in self.methods_analytics.items():
+                yield component + (name,), method_analytics
+        for name, class_analytics in self.classes_analytics.items():
+            yield from class_analytics.components(component + (name,), granularity)
+
+    def child_items(self):
+        return chain(self.methods_analytics.items(), self.classes_analytics.items())
+
+    def to_dict(self, name, children=True):
         metrics_dict = super().to_dict()
         metrics_dict["type"] = "class"
         metrics_dict["name"] = name
-        metrics_dict["children"] = [m_metrics.to_dict(m_name) for m_name, m_metrics in self.methods_analytics.items()]
-        metrics_dict["children"].extend([c_metrics.to_dict(c_name) for c_name,
-                                                                       c_metrics in self.classes_analytics.items()])
+        if children:
+            metrics_dict["children"] = [c_metrics.to_dict(c_name) for c_name, c_metrics in self.child_items()]
         return metrics_dict
 
 
@@ -296,15 +571,39 @@ class MethodAnalytics(Metrics):
     """ A class to represent Method Analytics
 
     It the leaf of analytics.
+
+    Attributes:
+        GRANULARITY: A string with the granularity of the component (see GRANULARITIES).
     """
-    def __init__(self):
-        super().__init__()
+
+    __slots__ = ()
+
+    GRANULARITY = "method"
+
+    def __init__(self, context=None, lean=False):
+        super().__init__(context, lean)
 
     def compute_defect_probability(self):
         self.defect_prob = self.defect_probability()
 
-    def to_dict(self, name):
+    def to_dict(self, name, children=True):
         metrics_dict = super().to_dict()
         metrics_dict["type"] = "method"
         metrics_dict["name"] = name
-        return metrics_dict
\ No newline at end of file
+        return metrics_dict
+
+
+class FunctionAnalytics(MethodAnalytics):
+    """ A class to represent Function Analytics
+
+    A function doesn't belong to a class, so it is a leaf of a file.
+    """
+
+    __slots__ = ()
+
+    GRANULARITY = "function"
+
+    def to_dict(self, name, children=True):
+        metrics_dict = super().to_dict(name)
+        metrics_dict["type"] = "function"
+        return metrics_dict
@@ -20,17 +20,28 @@
 
 """ Module for the analysis algorithm. """
 
+import multiprocessing
 import re
 from schwa.analysis import *
 from schwa.repository import *
 
 
 class SchwaAnalysis(AbstractAnalysis):
-    """ Class representing the Schwa Analysis. """
-    def __init__(self, repository):
+    """ Class representing the Schwa Analysis.
+
+    Attributes:
+        lean: A boolean that enables lean analytics, without timestamps lists (see Metrics).
+        context: The AnalysisContext shared by all the analytics of this analysis.
+        store: A string with the path of a SQLite database where the analytics are stored, or None to keep
+            them in memory (see SQLiteRepositoryAnalytics).
+    """
+    def __init__(self, repository, lean=False, context=None, store=None):
         super().__init__(repository)
+        self.lean = lean
+        self.context = context if context else AnalysisContext()
+        self.store = store
 
-    def update_analytics(self, analytics, commit):
+    def update_analytics(self, analytics, commit, twr=None, is_bug_fixing=None):
         """ Updates analytics.
 
         By giving commit data, updates the component analytics.
@@ -38,83 +49,276 @@ class SchwaAnalysis(AbstractAnalysis):
         Args:
             analytics: An instance of analytics.
             commit: A commit instance.
+            twr: An optional number with the TWR of the commit, shared by all the components it touches.
+            is_bug_fixing: An optional boolean that indicates if is a bug fixing commit, if it was already known.
         """
-
+        if is_bug_fixing is None:
+            is_bug_fixing = commit.is_bug_fixing()
         analytics.update(ts=commit.timestamp, begin_ts=self.repository.begin_ts, current_ts=self.repository.last_ts,
-                         is_bug_fixing=commit.is_bug_fixing(), author=commit.author)
-    @staticmethod
-    def get_analytics_from_tree(parent_analytics_dict, diff, instance):
-        analytics = None
-
-        if diff.added:
-            analytics = instance
-            parent_analytics_dict[diff.component_b()] = analytics
-
-        elif diff.modified:
-            if diff.component_b() not in parent_analytics_dict:
-                analytics = instance
-                parent_analytics_dict[diff.component_b()] = analytics
-            else:
-                analytics = parent_analytics_dict[diff.component_b()]
-
-        elif diff.renamed:
-            if diff.component_a() not in parent_analytics_dict:
-                analytics = instance
-                parent_analytics_dict[diff.component_b()] = analytics
-            else:
-                analytics = parent_analytics_dict.pop(diff.component_a())
-                parent_analytics_dict[diff.component_b()] = analytics
-
-        elif diff.removed:
-            if diff.component_a() in parent_analytics_dict:
-                del parent_analytics_dict[diff.component_a()]
-            return False
+                         is_bug_fixing=is_bug_fixing, author=commit.author, twr=twr)
 
-        return analytics
+    def commits_twr(self):
+        """ Computes the TWR of every commit.
+
+        The TWR only depends on the commit timestamp and the repository bounds, so it is computed once
+        per commit instead of once per touched component.
+
+        Returns:
+            A list of numbers, in the same order of the repository commits.
+        """
+        return [self.context.twr(self.repository.begin_ts, commit.timestamp, self.repository.last_ts)
+                for commit in self.repository.commits]
 
-    def analyze(self):
+    def analyze(self, processes=1, start_method=None):
         """ Analyzes a repository and creates analytics.
 
         It iterates over commits to analyze all the information. The granularity order must be
         preserved because child components depend of the parents.
 
+        With many processes, the diffs are partitioned by file (see partition()), each process analyzes
+        the components of a partition and the results are merged in the order of the sequential analysis.
+        Since a file and its renames never span two partitions, the merged analytics are the same of the
+        sequential analysis.
+
+        Args:
+            processes: An optional int with the number of processes, all the CPUs when it is None.
+            start_method: An optional string with the multiprocessing start method, e.g. "spawn".
+
         Returns:
-            A RepositoryAnalytics instance.
+            A RepositoryAnalytics instance, or a SQLiteRepositoryAnalytics instance with a store.
+
+        Raises:
+            ValueError: When many processes analyze to a store, since the processes results are merged in memory.
         """
-        analytics = RepositoryAnalytics()
+        if self.store:
+            if processes != 1:
+                raise ValueError("The analysis to a store runs in a single process")
+            analytics = SQLiteRepositoryAnalytics(self.store, self.context, self.lean)
+        else:
+            analytics = RepositoryAnalytics(self.context, self.lean)
+        analytics.begin_ts = self.repository.begin_ts
+        analytics.last_ts = self.repository.last_ts
 
-        for commit in self.repository.commits:
+        # Repository and Directory Granularities, which don't depend on the components
+        for commit, twr in zip(self.repository.commits, self.commits_twr()):
+            is_bug_fixing = bool(commit.is_bug_fixing())
+            self.update_analytics(analytics, commit, twr, is_bug_fixing)
+            self.analyze_commit_directories(analytics, commit, twr, is_bug_fixing)
+
+        if processes is None:
+            try:
+                processes = multiprocessing.cpu_count()
+            except NotImplementedError:  # pragma: no cover
+                processes = 2  # pragma: no cover
 
-            # Repository Granularity
-            self.update_analytics(analytics, commit)
-
-            # File Granularity
-            parent_analytics_dict = analytics.files_analytics
-            for diff in [diff for diff in commit.diffs if isinstance(diff, DiffFile)]:
-                file_analytics = SchwaAnalysis.get_analytics_from_tree(parent_analytics_dict, diff, FileAnalytics())
-                if file_analytics:
-                    self.update_analytics(file_analytics, commit)
-
-            # Class Granularity
-            for diff in [diff for diff in commit.diffs if isinstance(diff, DiffClass)]:
-                try:  # Parent component can be already removed
-                    parent_analytics_dict = analytics.files_analytics[diff.file_name].classes_analytics
-                    class_analytics = SchwaAnalysis.get_analytics_from_tree(parent_analytics_dict, diff, ClassAnalytics())
-                    if class_analytics:
-                        self.update_analytics(class_analytics, commit)
-                except KeyError:
-                    continue
-
-            # Method Granularity
-            for diff in [diff for diff in commit.diffs if isinstance(diff, DiffMethod)]:
-                try:  # Parent component can be already removed
-                    parent_analytics_dict = analytics.files_analytics[diff.file_name].classes_analytics[diff.class_name].methods_analytics
-                    method_analytics = SchwaAnalysis.get_analytics_from_tree(parent_analytics_dict, diff, MethodAnalytics())
-                    if method_analytics:
-                        self.update_analytics(method_analytics, commit)
-                except KeyError:
-                    continue
+        if processes > 1:
+            shards = SchwaAnalysis.partition(self.repository, processes)
+            # Shards start from an empty dataset, so the one of this context isn't copied to every process
+            context = self.context.with_weights(self.context.revisions_weight, self.context.fixes_weight,
+                                                self.context.authors_weight)
+            with multiprocessing.get_context(start_method).Pool(processes=len(shards)) as pool:
+                results = pool.starmap(analyze_shard, [(shard, context, self.lean) for shard in shards])
+            files_analytics = {}
+            for shard_files_analytics, fixes_dataset in results:
+                for file_analytics in shard_files_analytics.values():
+                    file_analytics.set_context(self.context)
+                files_analytics.update(shard_files_analytics)
+                self.context.fixes_dataset.update(fixes_dataset)
+            analytics.files_analytics = {path: files_analytics[path] for path in self.files_order()}
+        else:
+            self.analyze_components(analytics)
 
         analytics.compute_defect_probability()
 
-        return analytics
\ No newline at end of file
+        return analytics
+
+    def analyze_commit_directories(self, analytics, commit, twr, is_bug_fixing):
+        """ Analyzes the directories changed by a commit, updating each one once.
+
+        Args:
+            analytics: The RepositoryAnalytics where the directories analytics are added.
+            commit: A Commit instance.
+            twr: A number with the TWR of the commit.
+            is_bug_fixing: A boolean that indicates if is a bug fixing commit.
+        """
+        directories = {}
+        for diff in commit.diffs:
+            if isinstance(diff, DiffFile) and not diff.removed:
+                directories.update(dict.fromkeys(directory_paths(diff.file_b)))
+        for directory in directories:
+            directory_analytics = analytics.directories_analytics.get(directory)
+            if directory_analytics is None:
+                directory_analytics = DirectoryAnalytics(self.context, self.lean)
+                analytics.directories_analytics[directory] = directory_analytics
+            self.update_analytics(directory_analytics, commit, twr, is_bug_fixing)
+
+    def analyze_components(self, analytics):
+        """ Analyzes the files, classes and methods changed by the repository commits.
+
+        The components of new analytics are resolved with a flat ComponentRegistry, and the nested dicts are
+        built on demand (see RepositoryAnalytics). Stored or existing analytics are updated in place (see
+        ComponentTree), flushing them after every commit (see SQLiteRepositoryAnalytics).
+
+        Args:
+            analytics: The RepositoryAnalytics where the files analytics are added.
+        """
+        if analytics.STORED or not analytics.is_empty():
+            components = ComponentTree(analytics, self.context, self.lean)
+        else:
+            components = ComponentRegistry(self.context, self.lean)
+        for commit, twr in zip(self.repository.commits, self.commits_twr()):
+            self.analyze_commit_components(components, commit, twr, bool(commit.is_bug_fixing()))
+            analytics.flush()
+        components.attach(analytics)
+
+    def analyze_commit_components(self, components, commit, twr, is_bug_fixing):
+        """ Analyzes the files, classes and methods changed by a commit.
+
+        Args:
+            components: The ComponentResolver of the components analytics (see ComponentRegistry and ComponentTree).
+            commit: A Commit instance.
+            twr: A number with the TWR of the commit.
+            is_bug_fixing: A boolean that indicates if is a bug fixing commit.
+        """
+        files_diffs, classes_diffs, methods_diffs = SchwaAnalysis.bucket_diffs(commit.diffs)
+
+        # File Granularity
+        for diff in files_diffs:
+            file_analytics = components.resolve((), diff)
+            if file_analytics:
+                self.update_analytics(file_analytics, commit, twr, is_bug_fixing)
+
+        # Class Granularity
+        for diff in classes_diffs:
+            if (diff.file_name,) in components:  # Parent component can be already removed
+                class_analytics = components.resolve((diff.file_name,), diff)
+                if class_analytics:
+                    self.update_analytics(class_analytics, commit, twr, is_bug_fixing)
+
+        # Method Granularity
+        for diff in methods_diffs:
+            if diff.class_name:
+                parent_key = prefix = (diff.file_name, diff.class_name)
+            else:  # Functions don't belong to a class
+                parent_key, prefix = (diff.file_name,), (diff.file_name, "")
+            if parent_key in components:  # Parent component can be already removed
+                method_analytics = components.resolve(prefix, diff)
+                if method_analytics:
+                    self.update_analytics(method_analytics, commit, twr, is_bug_fixing)
+
+    @staticmethod
+    def bucket_diffs(diffs):
+        """ Splits diffs by granularity in a single pass.
+
+        Args:
+            diffs: A list of Diff instances.
+
+        Returns:
+            A tuple with the lists of DiffFile, DiffClass and DiffMethod instances, in the order of the diffs.
+        """
+        files_diffs, classes_diffs, methods_diffs = [], [], []
+        for diff in diffs:
+            if isinstance(diff, DiffFile):
+                files_diffs.append(diff)
+            elif isinstance(diff, DiffClass):
+                classes_diffs.append(diff)
+            elif isinstance(diff, DiffMethod):
+                methods_diffs.append(diff)
+        return files_diffs, classes_diffs, methods_diffs
+
+    def files_order(self):
+        """ Gets the paths of the files in the order of the files analytics of the sequential analysis.
+
+        Returns:
+            A list of strings with the paths of the files that weren't removed.
+        """
+        registry = ComponentRegistry(self.context, self.lean)
+        for commit in self.repository.commits:
+            for diff in commit.diffs:
+                if isinstance(diff, DiffFile):
+                    registry.resolve((), diff)
+        return [key[0] for key in registry.ids]
+
+    @staticmethod
+    def partition(repository, shards):
+        """ Partitions the diffs of a repository by file.
+
+        Files connected by renames are in the same partition, so the history of a component is never
+        split. Partitions are balanced by number of diffs, assigning the biggest files first.
+
+        Args:
+            repository: A Repository instance.
+            shards: An int with the maximum number of partitions.
+
+        Returns:
+            A list of Repository instances, with the same timestamps bounds and only the commits that
+            have diffs in the partition.
+        """
+        # Union-find of the paths connected by renames
+        parents = {}
+
+        def find(path):
+            root = parents.setdefault(path, path)
+            while root != parents[root]:
+                root = parents[root]
+            while path != root:
+                path, parents[path] = parents[path], root
+            return root
+
+        for commit in repository.commits:
+            for diff in commit.diffs:
+                if isinstance(diff, DiffFile):
+                    paths = [path for path in (diff.file_a, diff.file_b) if path]
+                    for path in paths[1:]:
+                        parents[find(path)] = find(paths[0])
+                else:
+                    find(diff.file_name)
+
+        sizes = {}
+        for commit in repository.commits:
+            for diff in commit.diffs:
+                root = find(SchwaAnalysis.diff_path(diff))
+                sizes[root] = sizes.get(root, 0) + 1
+
+        # Biggest groups first to the least loaded shard
+        loads = [[0, shard] for shard in range(min(shards, len(sizes)) or 1)]
+        shard_by_root = {}
+        for root, size in sorted(sizes.items(), key=lambda item: (-item[1], item[0])):
+            load = min(loads)
+            shard_by_root[root] = load[1]
+            load[0] += size
+
+        commits = [[] for _ in loads]
+        for commit in repository.commits:
+            diffs = [[] for _ in loads]
+            for diff in commit.diffs:
+                diffs[shard_by_root[find(SchwaAnalysis.diff_path(diff))]].append(diff)
+            for shard, shard_diffs in enumerate(diffs):
+                if shard_diffs:
+                    commits[shard].append(Commit(commit._id, commit.message, commit.author, commit.timestamp,
+                                                 shard_diffs))
+        return [Repository(shard_commits, repository.begin_ts, repository.last_ts) for shard_commits in commits]
+
+    @staticmethod
+    def diff_path(diff):
+        """ Gets the path of the file of a diff. """
+        if isinstance(diff, DiffFile):
+            return diff.file_b or diff.file_a
+        return diff.file_name
+
+
+def analyze_shard(repository, context, lean):
+    """ Multiprocessing wrapper for analyzing the components of a partition.
+
+    Args:
+        repository: A Repository instance with a partition of the diffs.
+        context: An AnalysisContext with an empty dataset.
+        lean: A boolean that enables lean analytics.
+
+    Returns:
+        A tuple with the dict of files analytics and the fixes dataset of the partition.
+    """
+    analysis = SchwaAnalysis(repository, lean, context)
+    analytics = RepositoryAnalytics(context, lean)
+    analysis.analyze_components(analytics)
+    return analytics.files_analytics, context.fixes_dataset
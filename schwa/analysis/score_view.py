@@ -0,0 +1,157 @@
+# Copyright (c) 2015 Faculty of Engineering of the University of Porto
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+""" Module for scoring analytics with other features weights.
+
+The TWR accumulators don't depend on the features weights, so the defect probabilities of every
+component can be recomputed from them without analyzing the repository again. With the float
+numeric backend and numpy, it is a single vectorized computation.
+"""
+
+import heapq
+from .numeric_backend import FloatBackend
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+FEATURES = ("revisions", "fixes", "authors")
+
+
+class ScoreView:
+    """ The defect probabilities of analytics with other features weights.
+
+    The analytics aren't changed nor copied, the view keeps references to the components analytics.
+
+    Attributes:
+        weights: A tuple with the revisions, fixes and authors weights.
+        components: A list of tuples with the components (see RepositoryAnalytics.components()), where the
+            repository is the empty tuple.
+        analytics: A list with the analytics of the components.
+        probabilities: A list with the defect probabilities of the components.
+        indexes: A dict that maps components to their indexes, or None before the first lookup.
+    """
+
+    def __init__(self, analytics, weights, granularity=None, path_prefix=None):
+        """ Inits ScoreView, scoring the components of analytics.
+
+        Args:
+            analytics: A RepositoryAnalytics instance.
+            weights: A dict with the "revisions", "fixes" and "authors" weights, like the learner solution.
+            granularity: An optional string with the granularity of the components (see GRANULARITIES).
+            path_prefix: An optional string that the files paths must start with.
+
+        Raises:
+            ValueError: When a weight is missing or the granularity doesn't exist.
+        """
+        missing = [feature for feature in FEATURES if feature not in weights]
+        if missing:
+            raise ValueError("Missing features weights: %s" % ", ".join(missing))
+        context = analytics.context
+        self.weights = tuple(context.number(weights[feature]) for feature in FEATURES)
+        self.components = []
+        self.analytics = []
+        if granularity is None and not path_prefix:
+            self.components.append(())
+            self.analytics.append(analytics)
+        for component, metrics in analytics.components(granularity, path_prefix):
+            self.components.append(component)
+            self.analytics.append(metrics)
+        self.indexes = None
+
+        if numpy is not None and context.numeric_backend is FloatBackend:
+            twr = numpy.array([(m.revisions_twr, m.fixes_twr, m.authors_twr) for m in self.analytics],
+                              dtype=numpy.float64).reshape(-1, len(FEATURES))
+            self.probabilities = (1 - numpy.exp(-twr.dot(numpy.array(self.weights, dtype=numpy.float64)))).tolist()
+        else:
+            r_weight, f_weight, a_weight = self.weights
+            self.probabilities = [context.compute_defect_probability(m.revisions_twr, m.fixes_twr, m.authors_twr,
+                                                                     r_weight, f_weight, a_weight)
+                                  for m in self.analytics]
+
+    def __len__(self):
+        return len(self.components)
+
+    def __getitem__(self, component):
+        """ Gets the defect probability of a component.
+
+        Args:
+            component: A tuple with the component, e.g. ("src/API.java", "API", "login").
+
+        Returns:
+            A number with the defect probability.
+
+        Raises:
+            KeyError: When the component isn't in the view.
+        """
+        if self.indexes is None:
+            self.indexes = {c: index for index, c in enumerate(self.components)}
+        return self.probabilities[self.indexes[tuple(component)]]
+
+    def items(self):
+        """ Iterates over (component, defect probability) tuples. """
+        return zip(self.components, self.probabilities)
+
+    def top(self, k):
+        """ Finds the k components with the greatest defect probability.
+
+        Returns:
+            A list of tuples (component, defect probability), sorted by decreasing defect probability.
+        """
+        return heapq.nlargest(k, self.items(), key=lambda item: item[1])
+
+    def apply(self):
+        """ Sets the defect probabilities of the analytics to the ones of this view. """
+        for metrics, probability in zip(self.analytics, self.probabilities):
+            metrics.defect_prob = probability
+
+    def to_dict(self, directories=False):
+        """ Converts the analytics to a dict like RepositoryAnalytics.to_dict(), with the probabilities of this view.
+
+        Args:
+            directories: An optional boolean that nests the files in their directories.
+
+        Returns:
+            A dict of all the analytics.
+
+        Raises:
+            ValueError: When the view doesn't have every component, since it was filtered.
+        """
+        root = self.analytics[0] if self.components and self.components[0] == () else None
+        if root is None:
+            raise ValueError("Only views of every component can be converted to a dict")
+        metrics_dict = root.to_dict(directories=directories)
+        for child_dict in metrics_dict["children"]:
+            self.rescore_dict(child_dict, (child_dict["path"],))
+        return metrics_dict
+
+    def rescore_dict(self, metrics_dict, component):
+        """ Replaces the probabilities of a dict of to_dict() and its children. """
+        probability = str(self[component])
+        metrics_dict["size"] = probability
+        metrics_dict["prob"] = probability
+        for child_dict in metrics_dict.get("children", []):
+            if child_dict["type"] in ("directory", "file"):  # Their components are paths
+                self.rescore_dict(child_dict, (child_dict["path"],))
+            else:
+                self.rescore_dict(child_dict, component + (child_dict["name"],))
@@ -0,0 +1,222 @@
+# Copyright (c) 2015 Faculty of Engineering of the University of Porto
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+""" Module for comparing the analytics of two runs.
+
+The runs are stored in SQLite databases (see SQLiteRepositoryAnalytics), that are read sorted by component,
+so the comparison is a streaming merge-join and the memory doesn't depend on the number of components.
+"""
+
+import heapq
+import sqlite3
+from urllib.request import pathname2url
+from .repository_analytics import GRANULARITIES
+
+
+class ComponentDelta:
+    """ The change of the defect probability of a component between two runs.
+
+    Attributes:
+        key: A tuple (path, class, method, granularity) with empty strings for the missing names, that sorts
+            the deltas. Nested classes names are joined with a dot.
+        old_prob: A float with the defect probability of the old run, or None if the component is new.
+        new_prob: A float with the defect probability of the new run, or None if the component was removed.
+        old_rank: An int with the rank of the defect probability among the components of the same granularity
+            in the old run, 1 is the riskiest, or None if the component is new.
+        new_rank: An int with the rank in the new run, or None if the component was removed.
+    """
+
+    __slots__ = ("key", "old_prob", "new_prob", "old_rank", "new_rank")
+
+    def __init__(self, key, old_prob=None, new_prob=None, old_rank=None, new_rank=None):
+        self.key = key
+        self.old_prob = old_prob
+        self.new_prob = new_prob
+        self.old_rank = old_rank
+        self.new_rank = new_rank
+
+    @property
+    def component(self):
+        """ Gets the component tuple, like RepositoryAnalytics.components(), e.g. ("src/API.java", "API", "login"). """
+        return tuple(name for name in self.key[:3] if name)
+
+    @property
+    def granularity(self):
+        return self.key[3]
+
+    @property
+    def status(self):
+        """ Gets "new", "removed", "changed" or "unchanged". """
+        if self.old_prob is None:
+            return "new"
+        if self.new_prob is None:
+            return "removed"
+        return "changed" if self.new_prob != self.old_prob else "unchanged"
+
+    @property
+    def delta(self):
+        """ Gets the difference of the defect probabilities, new components start from 0 and removed end at 0. """
+        return (self.new_prob or 0) - (self.old_prob or 0)
+
+    @property
+    def rank_change(self):
+        """ Gets how many positions the component climbed in the ranking, or None if it isn't in both runs. """
+        if self.old_rank is None or self.new_rank is None:
+            return None
+        return self.old_rank - self.new_rank
+
+    def to_dict(self):
+        return {
+            "component": list(self.component),
+            "granularity": self.granularity,
+            "status": self.status,
+            "old_prob": self.old_prob,
+            "new_prob": self.new_prob,
+            "delta": self.delta,
+            "old_rank": self.old_rank,
+            "new_rank": self.new_rank
+        }
+
+
+class SnapshotComparison:
+    """ Compares the analytics of two runs stored in SQLite databases.
+
+    Attributes:
+        old_path: A string with the path of the database of the old run.
+        new_path: A string with the path of the database of the new run.
+        granularity: A string with the granularity of the compared components, or None for all of them.
+        path_prefix: A string that the paths of the compared components must start with, or None.
+    """
+
+    # Directories without files aren't components anymore (see RepositoryAnalytics.components). The components
+    # are ranked among every component of their granularity, before filtering the paths.
+    QUERY = """
+    SELECT path, class, method, kind, defect_prob, rank FROM (
+        SELECT c.path AS path, COALESCE(c.class, '') AS class, COALESCE(c.method, '') AS method, c.kind AS kind,
+               c.defect_prob AS defect_prob,
+               RANK() OVER (PARTITION BY c.kind ORDER BY CAST(c.defect_prob AS REAL) DESC) AS rank
+        FROM components c
+        WHERE c.parent IS NOT NULL AND %s
+        AND (c.kind != 'directory' OR EXISTS (
+            SELECT 1 FROM components f WHERE f.kind = 'file' AND f.parent IS NOT NULL
+            AND f.path >= c.path AND f.path < substr(c.path, 1, length(c.path) - 1) || '0')))
+    WHERE %s
+    ORDER BY 1, 2, 3, 4
+    """
+
+    def __init__(self, old_path, new_path, granularity=None, path_prefix=None):
+        """ Inits SnapshotComparison.
+
+        Args:
+            old_path: A string with the path of the database of the old run.
+            new_path: A string with the path of the database of the new run.
+            granularity: An optional string with the granularity of the components (see GRANULARITIES).
+            path_prefix: An optional string that the paths of the components must start with.
+
+        Raises:
+            ValueError: When the granularity doesn't exist.
+        """
+        if granularity is not None and granularity not in GRANULARITIES:
+            raise ValueError("Unknown granularity %s, choose one of: %s" % (granularity, ", ".join(GRANULARITIES)))
+        self.old_path = old_path
+        self.new_path = new_path
+        self.granularity = granularity
+        self.path_prefix = path_prefix
+
+    def rows(self, path):
+        """ Reads the components of a database, sorted by key.
+
+        Args:
+            path: A string with the path of the database.
+
+        Yields:
+            Tuples (key, probability, rank), see ComponentDelta.
+
+        Raises:
+            ValueError: When the database doesn't have analytics.
+        """
+        kind_condition, path_condition, parameters = "1", "1", []
+        if self.granularity:
+            kind_condition = "c.kind = ?"
+            parameters.append(self.granularity)
+        if self.path_prefix:  # A range instead of a LIKE
+            path_condition = "path >= ? AND path < ?"
+            parameters += [self.path_prefix, self.path_prefix[:-1] + chr(ord(self.path_prefix[-1]) + 1)]
+        connection = None
+        try:
+            connection = sqlite3.connect("file:%s?mode=ro" % pathname2url(path), uri=True)
+            cursor = connection.execute(self.QUERY % (kind_condition, path_condition), parameters)
+        except sqlite3.Error as e:
+            if connection:
+                connection.close()
+            raise ValueError("There are no analytics in %s: %s" % (path, e))
+        try:
+            for row in cursor:
+                yield row[:4], float(row[4]), row[5]
+        finally:
+            connection.close()
+
+    def deltas(self):
+        """ Merges the components of both runs, sorted by key.
+
+        Yields:
+            A ComponentDelta for each component of any run.
+
+        Raises:
+            ValueError: When a database doesn't have analytics.
+        """
+        old_rows = self.rows(self.old_path)
+        new_rows = self.rows(self.new_path)
+        old_row = next(old_rows, None)
+        new_row = next(new_rows, None)
+        while old_row is not None or new_row is not None:
+            if new_row is None or (old_row is not None and old_row[0] < new_row[0]):
+                yield ComponentDelta(old_row[0], old_prob=old_row[1], old_rank=old_row[2])
+                old_row = next(old_rows, None)
+            elif old_row is None or new_row[0] < old_row[0]:
+                yield ComponentDelta(new_row[0], new_prob=new_row[1], new_rank=new_row[2])
+                new_row = next(new_rows, None)
+            else:
+                yield ComponentDelta(old_row[0], old_row[1], new_row[1], old_row[2], new_row[2])
+                old_row = next(old_rows, None)
+                new_row = next(new_rows, None)
+
+    def riskier(self, k):
+        """ Finds the components whose defect probability increased the most, keeping a heap of k deltas.
+
+        Args:
+            k: An int with the maximum number of components.
+
+        Returns:
+            A list of ComponentDelta sorted by decreasing delta.
+        """
+        return heapq.nlargest(k, (delta for delta in self.deltas() if delta.delta > 0), key=lambda d: d.delta)
+
+    def summary(self):
+        """ Counts the components by status.
+
+        Returns:
+            A dict with the number of "new", "removed", "changed" and "unchanged" components.
+        """
+        counts = dict.fromkeys(("new", "removed", "changed", "unchanged"), 0)
+        for delta in self.deltas():
+            counts[delta.status] += 1
+        return counts
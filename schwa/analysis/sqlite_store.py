@@ -0,0 +1,512 @@
+# Copyright (c) 2015 Faculty of Engineering of the University of Porto
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+""" Module for storing the analytics in a SQLite database, instead of memory.
+
+Very large histories have millions of components, whose analytics don't fit in memory. The stored analytics
+keep every component in a row of a SQLite database, with the same read API of RepositoryAnalytics. Only
+the components changed since the last flush are in memory, and they are written in batches.
+"""
+
+import json
+import sqlite3
+from decimal import Decimal
+from .repository_analytics import RepositoryAnalytics, DirectoryAnalytics, FileAnalytics, ClassAnalytics, \
+    MethodAnalytics, FunctionAnalytics
+
+
+ANALYTICS_CLASSES = {analytics_class.GRANULARITY: analytics_class
+                     for analytics_class in (DirectoryAnalytics, FileAnalytics, ClassAnalytics, MethodAnalytics,
+                                             FunctionAnalytics)}
+
+# Granularity of the children of each dict attribute
+CHILDREN_ATTRIBUTES = {
+    "repository": (("files_analytics", "file"), ("directories_analytics", "directory")),
+    "directory": (),
+    "file": (("classes_analytics", "class"), ("functions_analytics", "function")),
+    "class": (("methods_analytics", "method"), ("classes_analytics", "class")),
+    "method": (),
+    "function": ()
+}
+
+METRICS_COLUMNS = ("revisions", "fixes", "revisions_twr", "fixes_twr", "authors_twr", "defect_prob", "authors",
+                   "revisions_timestamps", "fixes_timestamps", "authors_timestamps", "last_twr")
+
+COMPONENTS_COLUMNS = ("id", "parent", "kind", "name", "position", "path", "class", "method") + METRICS_COLUMNS
+
+INSERT_COMPONENT = "INSERT INTO components (%s) VALUES (%s)" % (", ".join(COMPONENTS_COLUMNS),
+                                                                 ", ".join("?" * len(COMPONENTS_COLUMNS)))
+
+UPDATE_METRICS = "UPDATE components SET %s WHERE id = ?" % ", ".join("%s = ?" % column for column in METRICS_COLUMNS)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS components (
+    id INTEGER PRIMARY KEY,
+    parent INTEGER REFERENCES components(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    name TEXT,
+    position INTEGER NOT NULL,
+    path TEXT,
+    class TEXT,
+    method TEXT,
+    revisions INTEGER,
+    fixes INTEGER,
+    revisions_twr,
+    fixes_twr,
+    authors_twr,
+    defect_prob,
+    authors TEXT,
+    revisions_timestamps TEXT,
+    fixes_timestamps TEXT,
+    authors_timestamps TEXT,
+    last_twr TEXT
+);
+CREATE INDEX IF NOT EXISTS components_children ON components(parent, kind, name);
+CREATE INDEX IF NOT EXISTS components_path ON components(path, class, method);
+CREATE TABLE IF NOT EXISTS bounds (begin_ts, last_ts, lean INTEGER);
+"""
+
+
+class SQLiteStore:
+    """ A SQLite database of components analytics, with a cache of the loaded ones.
+
+    The database uses write-ahead logging, so readers, like the web server, don't block the analysis. The
+    changed analytics are written back in batches with executemany(), and the transaction is committed
+    every batch_size flushes.
+
+    Attributes:
+        CACHE_SIZE: An int with the default maximum number of analytics in memory after a flush.
+        BATCH_SIZE: An int with the default number of flushes of a transaction.
+        ROOT_ID: An int with the row id of the repository analytics.
+        path: A string with the path of the database.
+        connection: The sqlite3 Connection.
+        context: The AnalysisContext of the loaded analytics.
+        lean: A boolean that enables lean analytics (see Metrics).
+        cache_size: An int with the maximum number of analytics in memory after a flush.
+        batch_size: An int with the number of flushes of a transaction.
+        cache: A dict that maps row ids to the loaded analytics.
+        row_ids: A dict that maps the id() of the loaded analytics to their row ids.
+        next_id: An int with the next row id, which also orders the children like a dict.
+        flushes: An int with the number of flushes of the current transaction.
+    """
+
+    CACHE_SIZE = 10000
+    BATCH_SIZE = 100
+    ROOT_ID = 0
+
+    def __init__(self, path, context, lean=False, cache_size=None, batch_size=None):
+        """ Inits SQLiteStore, creating the database if it doesn't exist.
+
+        Args:
+            path: A string with the path of the database, or ":memory:".
+            context: The AnalysisContext of the analytics.
+            lean: An optional boolean that enables lean analytics (see Metrics).
+            cache_size: An optional int with the maximum number of analytics in memory after a flush.
+            batch_size: An optional int with the number of flushes of a transaction.
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)  # The web server reads in other threads
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self.connection.executescript(SCHEMA)
+        self.context = context
+        self.lean = lean
+        self.cache_size = cache_size if cache_size is not None else self.CACHE_SIZE
+        self.batch_size = batch_size if batch_size is not None else self.BATCH_SIZE
+        self.cache = {}
+        self.row_ids = {}
+        row = self.connection.execute("SELECT MAX(id) FROM components").fetchone()
+        self.next_id = row[0] + 1 if row[0] is not None else self.ROOT_ID
+        self.flushes = 0
+
+    def clear(self):
+        """ Deletes every stored analytics. """
+        self.cache = {}
+        self.row_ids = {}
+        self.connection.execute("DELETE FROM components")
+        self.connection.execute("DELETE FROM bounds")
+        self.connection.commit()
+        self.next_id = self.ROOT_ID
+
+    def allocate_id(self):
+        row_id = self.next_id
+        self.next_id += 1
+        return row_id
+
+    def to_db(self, value):
+        """ Converts a number to a SQLite value, Decimal numbers are stored as text to keep their precision. """
+        return str(value) if isinstance(value, Decimal) else value
+
+    def from_db(self, value):
+        return self.context.number(value) if isinstance(value, str) else value
+
+    def encode(self, values):
+        return None if values is None else json.dumps([self.to_db(value) for value in values])
+
+    def decode(self, text):
+        return None if text is None else [self.from_db(value) for value in json.loads(text)]
+
+    def metrics_row(self, metrics):
+        """ Converts the metrics of an analytics to the values of METRICS_COLUMNS. """
+        last_twr = self.encode(metrics.last_twr)
+        return (metrics.revisions, metrics.fixes, self.to_db(metrics.revisions_twr), self.to_db(metrics.fixes_twr),
+                self.to_db(metrics.authors_twr), self.to_db(metrics.defect_prob), json.dumps(sorted(metrics.authors)),
+                self.encode(metrics.revisions_timestamps), self.encode(metrics.fixes_timestamps),
+                self.encode(metrics.authors_timestamps), last_twr)
+
+    def set_metrics(self, metrics, row):
+        """ Sets the metrics of an analytics from the values of METRICS_COLUMNS. """
+        metrics.context = self.context
+        metrics.revisions, metrics.fixes = row[0], row[1]
+        metrics.revisions_twr, metrics.fixes_twr, metrics.authors_twr, metrics.defect_prob = \
+            [self.from_db(value) for value in row[2:6]]
+        metrics.authors = set(json.loads(row[6]))
+        metrics.revisions_timestamps = self.decode(row[7])
+        metrics.fixes_timestamps = self.decode(row[8])
+        metrics.authors_timestamps = self.decode(row[9])
+        metrics.last_twr = None if row[10] is None else tuple(self.decode(row[10]))
+
+    def attach(self, metrics, row_id, kind):
+        """ Replaces the children dicts of an analytics by StoredDict instances. """
+        if kind == "directory":  # Its children are linked on demand
+            metrics.children = {}
+        for attribute, child_kind in CHILDREN_ATTRIBUTES[kind]:
+            setattr(metrics, attribute, StoredDict(self, row_id, child_kind))
+
+    def load(self, row_id, kind, row, cache=True):
+        """ Creates the analytics of a row, or gets the loaded one.
+
+        Args:
+            row_id: An int with the row id.
+            kind: A string with the granularity of the component.
+            row: A sequence with the values of METRICS_COLUMNS.
+            cache: An optional boolean that keeps the analytics in memory until the next flush, so that its
+                changes are written back. Read-only iterations don't cache.
+
+        Returns:
+            A FileAnalytics, ClassAnalytics, MethodAnalytics or FunctionAnalytics instance.
+        """
+        if row_id in self.cache:
+            return self.cache[row_id]
+        analytics_class = ANALYTICS_CLASSES[kind]
+        metrics = analytics_class.__new__(analytics_class)
+        self.set_metrics(metrics, row)
+        self.attach(metrics, row_id, kind)
+        if cache:
+            self.cache[row_id] = metrics
+            self.row_ids[id(metrics)] = row_id
+        return metrics
+
+    def component(self, row_id):
+        """ Gets the (path, class, method) columns of a row. """
+        return self.connection.execute("SELECT path, class, method FROM components WHERE id = ?",
+                                       (row_id,)).fetchone()
+
+    @staticmethod
+    def child_component(parent_component, kind, name):
+        """ Computes the (path, class, method) columns of a child, the names of nested classes are joined by dots. """
+        if kind in ("directory", "file"):
+            return name, None, None
+        path, class_name, _ = parent_component
+        if kind == "class":
+            return path, "%s.%s" % (class_name, name) if class_name else name, None
+        return path, class_name, name
+
+    def insert(self, metrics, parent, kind, name, component=None, position=None):
+        """ Inserts an analytics that wasn't stored and its children.
+
+        Args:
+            metrics: The analytics, whose children dicts are replaced by StoredDict instances.
+            parent: An int with the row id of the parent.
+            kind: A string with the granularity of the component.
+            name: A string with the name of the component in the parent dict.
+            component: An optional tuple with the (path, class, method) columns of the parent.
+            position: An optional int with the position in the parent dict, the last one when it is None.
+        """
+        row_id = self.allocate_id()
+        component = self.child_component(component or self.component(parent), kind, name)
+        self.connection.execute(INSERT_COMPONENT, (row_id, parent, kind, name,
+                                                   row_id if position is None else position) + component +
+                                self.metrics_row(metrics))
+        children = [(child_kind, getattr(metrics, attribute)) for attribute, child_kind in CHILDREN_ATTRIBUTES[kind]]
+        self.attach(metrics, row_id, kind)
+        metrics.context = self.context
+        self.cache[row_id] = metrics
+        self.row_ids[id(metrics)] = row_id
+        for child_kind, children_dict in children:
+            for child_name, child in children_dict.items():
+                self.insert(child, row_id, child_kind, child_name, component)
+
+    def move(self, row_id, parent, name, position=None):
+        """ Moves a stored analytics to another parent or name, like a rename, to a position or the last one. """
+        self.connection.execute("UPDATE components SET parent = ?, name = ?, position = ? WHERE id = ?",
+                                (parent, name, self.allocate_id() if position is None else position, row_id))
+        kind = self.connection.execute("SELECT kind FROM components WHERE id = ?", (row_id,)).fetchone()[0]
+        self.relocate(row_id, kind, self.child_component(self.component(parent), kind, name))
+
+    def relocate(self, row_id, kind, component):
+        """ Updates the (path, class, method) columns of a row and its children. """
+        self.connection.execute("UPDATE components SET path = ?, class = ?, method = ? WHERE id = ?",
+                                component + (row_id,))
+        children = self.connection.execute("SELECT id, kind, name FROM components WHERE parent = ?",
+                                           (row_id,)).fetchall()
+        for child_id, child_kind, child_name in children:
+            self.relocate(child_id, child_kind, self.child_component(component, child_kind, child_name))
+
+    def detach(self, row_id):
+        """ Removes a row from its parent, keeping it until the next flush in case it is moved (see StoredDict.pop). """
+        self.connection.execute("UPDATE components SET parent = NULL WHERE id = ?", (row_id,))
+
+    def delete(self, row_id):
+        """ Deletes a row and its children. """
+        rows = self.connection.execute("WITH RECURSIVE subtree(id) AS (SELECT ? UNION ALL SELECT c.id FROM "
+                                       "components c JOIN subtree s ON c.parent = s.id) SELECT id FROM subtree",
+                                       (row_id,))
+        for (child_id,) in rows.fetchall():
+            metrics = self.cache.pop(child_id, None)
+            if metrics is not None:
+                del self.row_ids[id(metrics)]
+        self.connection.execute("DELETE FROM components WHERE id = ?", (row_id,))
+
+    def write_back(self):
+        """ Writes the loaded analytics in a batch and unloads them. """
+        self.connection.executemany(UPDATE_METRICS, [self.metrics_row(metrics) + (row_id,)
+                                                     for row_id, metrics in self.cache.items()])
+        self.cache = {}
+        self.row_ids = {}
+
+    def flush(self, force=False):
+        """ Writes back the loaded analytics when there are too many, and commits every batch_size flushes.
+
+        It must be called when nobody else holds the loaded analytics, e.g. between commits of the analysis.
+
+        Args:
+            force: An optional boolean that writes back and commits anyway.
+        """
+        detached = self.connection.execute("SELECT id FROM components WHERE parent IS NULL AND id != ?",
+                                           (self.ROOT_ID,)).fetchall()
+        for (row_id,) in detached:
+            self.delete(row_id)
+        if force or len(self.cache) > self.cache_size:
+            self.write_back()
+        self.flushes += 1
+        if force or self.flushes >= self.batch_size:
+            self.connection.commit()
+            self.flushes = 0
+
+    def close(self):
+        self.flush(force=True)
+        self.connection.close()
+
+
+class StoredDict:
+    """ A dict of children analytics stored in a SQLiteStore, ordered like a dict.
+
+    Attributes:
+        store: The SQLiteStore.
+        parent: An int with the row id of the parent analytics.
+        kind: A string with the granularity of the children.
+    """
+
+    __slots__ = ("store", "parent", "kind")
+
+    def __init__(self, store, parent, kind):
+        self.store = store
+        self.parent = parent
+        self.kind = kind
+
+    def row_id(self, name):
+        row = self.store.connection.execute("SELECT id FROM components WHERE parent = ? AND kind = ? AND name = ?",
+                                            (self.parent, self.kind, name)).fetchone()
+        return row[0] if row else None
+
+    def __contains__(self, name):
+        return self.row_id(name) is not None
+
+    def __getitem__(self, name):
+        row = self.store.connection.execute("SELECT id, %s FROM components WHERE parent = ? AND kind = ? AND name = ?"
+                                            % ", ".join(METRICS_COLUMNS), (self.parent, self.kind, name)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        return self.store.load(row[0], self.kind, row[1:])
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def __setitem__(self, name, metrics):
+        row_id = self.store.row_ids.get(id(metrics))
+        row = self.store.connection.execute("SELECT id, position FROM components WHERE parent = ? AND kind = ? "
+                                            "AND name = ?", (self.parent, self.kind, name)).fetchone()
+        position = None
+        if row is not None:
+            if row[0] == row_id:
+                return
+            position = row[1]  # Like a dict, a replaced name keeps its position
+            self.store.delete(row[0])
+        if row_id is None:
+            self.store.insert(metrics, self.parent, self.kind, name, position=position)
+        else:
+            self.store.move(row_id, self.parent, name, position)
+
+    def __delitem__(self, name):
+        row_id = self.row_id(name)
+        if row_id is None:
+            raise KeyError(name)
+        self.store.delete(row_id)
+
+    def pop(self, name):
+        metrics = self[name]
+        self.store.detach(self.store.row_ids[id(metrics)])
+        return metrics
+
+    def __len__(self):
+        return self.store.connection.execute("SELECT COUNT(*) FROM components WHERE parent = ? AND kind = ?",
+                                             (self.parent, self.kind)).fetchone()[0]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self):
+        return [name for name, in self.store.connection.execute(
+            "SELECT name FROM components WHERE parent = ? AND kind = ? ORDER BY position", (self.parent, self.kind))]
+
+    def items(self):
+        """ Iterates over the (name, analytics) pairs, loading the analytics without caching them. """
+        rows = self.store.connection.execute("SELECT id, name, %s FROM components WHERE parent = ? AND kind = ? "
+                                             "ORDER BY position" % ", ".join(METRICS_COLUMNS), (self.parent, self.kind))
+        for row in rows:
+            yield row[1], self.store.load(row[0], self.kind, row[2:], cache=False)
+
+    def values(self):
+        return (metrics for _, metrics in self.items())
+
+
+class SQLiteRepositoryAnalytics(RepositoryAnalytics):
+    """ Represents the Analytics of a Repository, stored in a SQLite database (see SQLiteStore).
+
+    It has the same read API of RepositoryAnalytics, e.g. to_dict(), components() and top(), but the files
+    analytics are a StoredDict. The analytics yielded by the iterations are loaded from the database, so
+    changing them has no effect.
+
+    Attributes:
+        store: The SQLiteStore.
+    """
+
+    __slots__ = ("store",)
+
+    BATCH_SIZE = 1000
+    STORED = True
+
+    def __init__(self, path, context=None, lean=False, cache_size=None, batch_size=None):
+        """ Inits SQLiteRepositoryAnalytics, replacing the analytics stored in the database.
+
+        Args:
+            path: A string with the path of the database.
+            context: An optional AnalysisContext.
+            lean: An optional boolean that enables lean analytics (see Metrics).
+            cache_size: An optional int with the maximum number of analytics in memory after a flush.
+            batch_size: An optional int with the number of flushes of a transaction.
+        """
+        super().__init__(context, lean)
+        self.store = SQLiteStore(path, self.context, lean, cache_size, batch_size)
+        self.store.clear()
+        root_id = self.store.allocate_id()
+        self.store.connection.execute(INSERT_COMPONENT, (root_id, None, "repository", None, root_id, None, None, None) +
+                                      self.store.metrics_row(self))
+        self.store.attach(self, SQLiteStore.ROOT_ID, "repository")
+
+    @classmethod
+    def open(cls, path, context=None):
+        """ Opens the analytics stored in a database, without loading the components.
+
+        Args:
+            path: A string with the path of the database.
+            context: An optional AnalysisContext, that must have the numeric backend of the analysis.
+
+        Returns:
+            A SQLiteRepositoryAnalytics instance.
+
+        Raises:
+            ValueError: When the database doesn't have analytics.
+        """
+        analytics = cls.__new__(cls)
+        RepositoryAnalytics.__init__(analytics, context)
+        store = SQLiteStore(path, analytics.context)
+        row = store.connection.execute("SELECT %s FROM components WHERE id = ?" % ", ".join(METRICS_COLUMNS),
+                                       (SQLiteStore.ROOT_ID,)).fetchone()
+        if row is None:
+            store.connection.close()
+            raise ValueError("There are no analytics in %s" % path)
+        store.set_metrics(analytics, row)
+        bounds = store.connection.execute("SELECT begin_ts, last_ts, lean FROM bounds").fetchone()
+        if bounds:
+            analytics.begin_ts, analytics.last_ts, store.lean = bounds[0], bounds[1], bool(bounds[2])
+        analytics.store = store
+        store.attach(analytics, SQLiteStore.ROOT_ID, "repository")
+        return analytics
+
+    def flush(self, force=False):
+        self.store.flush(force)
+
+    def save(self):
+        """ Writes the repository analytics and commits every pending change. """
+        self.store.connection.execute(UPDATE_METRICS, self.store.metrics_row(self) + (SQLiteStore.ROOT_ID,))
+        self.store.connection.execute("DELETE FROM bounds")
+        self.store.connection.execute("INSERT INTO bounds VALUES (?, ?, ?)",
+                                      (self.begin_ts, self.last_ts, int(self.store.lean)))
+        self.flush(force=True)
+
+    def compute_defect_probability(self):
+        """ Computes the defect probability for every stored component, in batches of rows. """
+        self.flush(force=True)
+        store = self.store
+        self.defect_prob = self.defect_probability()
+        last_id = SQLiteStore.ROOT_ID
+        while True:
+            rows = store.connection.execute("SELECT id, revisions_twr, fixes_twr, authors_twr FROM components "
+                                            "WHERE id > ? ORDER BY id LIMIT ?", (last_id, self.BATCH_SIZE)).fetchall()
+            if not rows:
+                break
+            store.connection.executemany(
+                "UPDATE components SET defect_prob = ? WHERE id = ?",
+                [(store.to_db(self.context.compute_defect_probability(*[store.from_db(value) for value in row[1:]])),
+                  row[0]) for row in rows])
+            last_id = rows[-1][0]
+        self.save()
+
+    def set_context(self, context):
+        self.context = context
+        self.store.context = context
+
+    def copy(self, context=None):
+        raise ValueError("Stored analytics can't be copied, open the database again instead")
+
+    def rebase(self, begin_ts, current_ts, twr_by_ts=None):
+        raise ValueError("Stored analytics can't be rebased, since the loaded components aren't kept")
+
+    def close(self):
+        """ Saves the analytics and closes the database. """
+        self.save()
+        self.store.connection.close()
@@ -0,0 +1,163 @@
+# Copyright (c) 2015 Faculty of Engineering of the University of Porto
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+""" Module for sweeping the time range of the TWR function.
+
+The time range enters the TWR sigmoid non-linearly, so the accumulators of an analysis can't be rescored
+with another one (see ScoreView). Instead, the normalized timestamps of the components are kept in compact
+arrays, and the TWR sums of a grid of time ranges are computed at once with numpy.
+"""
+
+from .numeric_backend import twr_sigmoid
+from .score_view import FEATURES
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+class TimeRangeSweep:
+    """ Evaluates the defect probabilities of components for a grid of time ranges and features weights.
+
+    Every distinct commit timestamp is normalized once. For each feature, the timestamps of all the components
+    are stored as one array of indexes to the normalized timestamps, where each component is a segment.
+
+    Attributes:
+        components: A list of tuples with the components (see RepositoryAnalytics.components()).
+        normalized: A numpy array with the normalized distinct timestamps.
+        indexes: A dict that maps features to numpy arrays with the indexes of the components timestamps.
+        bounds: A dict that maps features to numpy arrays with the end of the segment of each component.
+        baseline: A tuple (time_range, weights) of the analysis, as floats.
+    """
+
+    def __init__(self, analytics, granularity="file", path_prefix=None):
+        """ Inits TimeRangeSweep with the timestamps of the components.
+
+        Args:
+            analytics: A RepositoryAnalytics instance, that isn't lean.
+            granularity: An optional string with the granularity of the components (see GRANULARITIES).
+            path_prefix: An optional string that the files paths must start with.
+
+        Raises:
+            ImportError: When numpy isn't installed (see the "numpy" extra of the package).
+            ValueError: When the analytics are lean or don't have the timestamps bounds.
+        """
+        if numpy is None:
+            raise ImportError("The time range sweep needs numpy")
+        if analytics.begin_ts is None or analytics.last_ts is None:
+            raise ValueError("The analytics don't have the timestamps bounds")
+        self.components = []
+        positions = {}
+        indexes = {feature: [] for feature in FEATURES}
+        lengths = {feature: [] for feature in FEATURES}
+        for component, metrics in analytics.components(granularity, path_prefix):
+            if metrics.revisions_timestamps is None:
+                raise ValueError("Lean analytics don't have the timestamps history")
+            self.components.append(component)
+            for feature, timestamps in zip(FEATURES, (metrics.revisions_timestamps, metrics.fixes_timestamps,
+                                                      metrics.authors_timestamps)):
+                indexes[feature].extend(positions.setdefault(ts, len(positions)) for ts in timestamps)
+                lengths[feature].append(len(timestamps))
+
+        diff = analytics.last_ts - analytics.begin_ts
+        timestamps = numpy.array(list(positions), dtype=numpy.float64)
+        self.normalized = (timestamps - analytics.begin_ts) / diff if diff else numpy.ones(len(timestamps))
+        self.indexes = {feature: numpy.array(indexes[feature], dtype=numpy.int64) for feature in FEATURES}
+        self.bounds = {feature: numpy.cumsum(lengths[feature], dtype=numpy.int64) for feature in FEATURES}
+        context = analytics.context
+        self.baseline = (float(context.time_range), (float(context.revisions_weight), float(context.fixes_weight),
+                                                     float(context.authors_weight)))
+
+    def twr_sums(self, time_ranges):
+        """ Computes the TWR sums of every component for many time ranges.
+
+        Args:
+            time_ranges: A list of numbers from 0 to 1.
+
+        Returns:
+            A numpy array with shape (time ranges, components, features).
+        """
+        time_ranges = numpy.asarray(time_ranges, dtype=numpy.float64).reshape(-1, 1)
+        with numpy.errstate(over="ignore"):  # Timestamps long before the beginning have a TWR of 0
+            twr = twr_sigmoid(self.normalized, time_ranges, numpy.exp)
+        sums = numpy.empty((len(time_ranges), len(self.components), len(FEATURES)))
+        for f, feature in enumerate(FEATURES):
+            # Segment sums from the cumulative sums, where empty segments are 0
+            cumulative = numpy.zeros((len(time_ranges), len(self.indexes[feature]) + 1))
+            numpy.cumsum(twr[:, self.indexes[feature]], axis=1, out=cumulative[:, 1:])
+            ends = cumulative[:, self.bounds[feature]]
+            sums[:, :, f] = ends - numpy.concatenate((numpy.zeros((len(time_ranges), 1)), ends[:, :-1]), axis=1)
+        return sums
+
+    def probabilities(self, time_ranges, weights_sets):
+        """ Computes the defect probabilities of every component for a grid of time ranges and weights.
+
+        Args:
+            time_ranges: A list of numbers from 0 to 1.
+            weights_sets: A list of (revisions, fixes, authors) weights.
+
+        Returns:
+            A numpy array with shape (time ranges, weights sets, components).
+        """
+        weights = numpy.asarray(weights_sets, dtype=numpy.float64).reshape(-1, len(FEATURES))
+        twr = self.twr_sums(time_ranges).dot(weights.T)
+        return -numpy.expm1(-twr).transpose(0, 2, 1)
+
+    def report(self, time_ranges, weights_sets=None, k=10):
+        """ Reports how the rankings of the components change across a grid, compared to the analysis.
+
+        The rankings are compared with the Spearman correlation of the ranks, where ties have consecutive
+        ranks, and with the fraction of the k riskiest components of the analysis that stay in the top k.
+
+        Args:
+            time_ranges: A list of numbers from 0 to 1.
+            weights_sets: An optional list of (revisions, fixes, authors) weights, the ones of the analysis
+                when it is None.
+            k: An optional int with the number of riskiest components compared.
+
+        Returns:
+            A list of dicts with the "time_range", "weights", "spearman", "top_overlap" and "top" component,
+            for each point of the grid.
+        """
+        baseline_time_range, baseline_weights = self.baseline
+        weights_sets = weights_sets if weights_sets else [baseline_weights]
+        baseline = self.probabilities([baseline_time_range], [baseline_weights])[0, 0]
+        grid = self.probabilities(time_ranges, weights_sets)
+        k = min(k, len(self.components))
+        baseline_ranks = numpy.argsort(numpy.argsort(-baseline, kind="stable"), kind="stable")
+        baseline_top = set(numpy.argsort(-baseline, kind="stable")[:k].tolist())
+
+        report = []
+        for t, time_range in enumerate(time_ranges):
+            for w, weights in enumerate(weights_sets):
+                probabilities = grid[t, w]
+                order = numpy.argsort(-probabilities, kind="stable")
+                ranks = numpy.argsort(order, kind="stable")
+                spearman = float(numpy.corrcoef(ranks, baseline_ranks)[0, 1]) if len(ranks) > 1 else 1.0
+                report.append({
+                    "time_range": float(time_range),
+                    "weights": tuple(float(weight) for weight in weights),
+                    "spearman": spearman,
+                    "top_overlap": len(baseline_top.intersection(order[:k].tolist())) / k if k else 1.0,
+                    "top": self.components[order[0]] if len(order) else None
+                })
+        return report
@@ -0,0 +1,179 @@
+# Copyright (c) 2015 Faculty of Engineering of the University of Porto
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+""" Module for the time travel analysis, that rebuilds the analytics as of past commits. """
+
+from .schwa_analysis import SchwaAnalysis
+from .repository_analytics import RepositoryAnalytics
+from .component_registry import ComponentTree
+
+
+class TimeTravelAnalysis(SchwaAnalysis):
+    """ An analysis that answers what Schwa would have said at any past commit.
+
+    The commits are the log of the components updates. While analyzing, a copy of the analytics is stored
+    as a checkpoint every checkpoint_interval commits. The analytics as of a commit are rebuilt from the nearest
+    checkpoint, replaying at most checkpoint_interval commits, and then rebased to the bounds of that time, i.e.
+    the TWR is computed from the beginning of the repository to the commit timestamp. Queries of many commits
+    are sorted, so the replay of one continues from the previous one.
+
+    Time travel needs the timestamps history, so lean analytics aren't supported.
+
+    Attributes:
+        CHECKPOINT_INTERVAL: An int with the default number of commits between checkpoints.
+        checkpoint_interval: An int with the number of commits between checkpoints.
+        checkpoints: A dict that maps a number of analyzed commits to a copy of the RepositoryAnalytics.
+        commits_indexes: A dict that maps commits ids to their indexes in the repository.
+        twrs: A list with the TWR of every commit, or None before the analysis.
+    """
+
+    CHECKPOINT_INTERVAL = 100
+
+    def __init__(self, repository, checkpoint_interval=None, context=None):
+        super().__init__(repository, False, context)
+        self.checkpoint_interval = checkpoint_interval if checkpoint_interval else \
+            TimeTravelAnalysis.CHECKPOINT_INTERVAL
+        self.checkpoints = {}
+        self.commits_indexes = {commit._id: index for index, commit in enumerate(repository.commits)}
+        self.twrs = None
+
+    def analyze(self):
+        """ Analyzes a repository, storing checkpoints of the analytics.
+
+        Returns:
+            A RepositoryAnalytics instance, the same of SchwaAnalysis.
+        """
+        analytics = RepositoryAnalytics(self.context)
+        analytics.begin_ts = self.repository.begin_ts
+        analytics.last_ts = self.repository.last_ts
+        self.twrs = self.commits_twr()
+        self.checkpoints = {0: analytics.copy()}
+        for index, (commit, twr) in enumerate(zip(self.repository.commits, self.twrs)):
+            self.replay_commit(self, analytics, commit, twr)
+            if (index + 1) % self.checkpoint_interval == 0:
+                self.checkpoints[index + 1] = analytics.copy()
+        analytics.compute_defect_probability()
+        return analytics
+
+    def analytics_at(self, commit_id):
+        """ Rebuilds the analytics as of a commit.
+
+        Args:
+            commit_id: A string with the id of a commit of the repository.
+
+        Returns:
+            A RepositoryAnalytics instance, as if the repository ended in that commit.
+
+        Raises:
+            KeyError: When the commit isn't in the repository.
+        """
+        return self.history([commit_id])[0]
+
+    def history(self, commits_ids):
+        """ Rebuilds the analytics as of many commits.
+
+        Args:
+            commits_ids: A list of strings with ids of commits of the repository.
+
+        Returns:
+            A list of RepositoryAnalytics instances, in the same order of the commits ids.
+
+        Raises:
+            KeyError: When a commit isn't in the repository.
+        """
+        if self.twrs is None:
+            self.analyze()
+        indexes = [self.commits_indexes[commit_id] for commit_id in commits_ids]
+
+        # Replays use their own context, so the fixes dataset of the analysis isn't changed
+        context = self.context.with_weights(self.context.revisions_weight, self.context.fixes_weight,
+                                            self.context.authors_weight)
+        replay = SchwaAnalysis(self.repository, False, context)
+        results = {}
+        analytics = None
+        position = 0
+        sorted_indexes = sorted(set(indexes))
+        checkpoints = [self.nearest_checkpoint(index) for index in sorted_indexes] + [None]
+        for i, index in enumerate(sorted_indexes):
+            if analytics is None or position < checkpoints[i]:
+                analytics = self.checkpoints[checkpoints[i]].copy(context)
+                position = checkpoints[i]
+            for commit, twr in zip(self.repository.commits[position:index + 1], self.twrs[position:index + 1]):
+                self.replay_commit(replay, analytics, commit, twr)
+            position = index + 1
+            if checkpoints[i + 1] is not None and position >= checkpoints[i + 1]:
+                results[index] = self.rebase(analytics.copy(), index)
+            else:  # The next query starts from a checkpoint, so this replay isn't needed anymore
+                results[index] = self.rebase(analytics, index)
+                analytics = None
+        return [results[index] for index in indexes]
+
+    def nearest_checkpoint(self, index):
+        """ Gets the number of analyzed commits of the nearest checkpoint before a commit, inclusive. """
+        return (index + 1) // self.checkpoint_interval * self.checkpoint_interval
+
+    @staticmethod
+    def replay_commit(analysis, analytics, commit, twr):
+        """ Updates the analytics with a commit.
+
+        Args:
+            analysis: The SchwaAnalysis whose context is used for the new components.
+            analytics: A RepositoryAnalytics instance.
+            commit: A Commit instance.
+            twr: A number with the TWR of the commit.
+        """
+        is_bug_fixing = bool(commit.is_bug_fixing())
+        analysis.update_analytics(analytics, commit, twr, is_bug_fixing)
+        analysis.analyze_commit_directories(analytics, commit, twr, is_bug_fixing)
+        components = ComponentTree(analytics, analysis.context, analysis.lean)
+        analysis.analyze_commit_components(components, commit, twr, is_bug_fixing)
+
+    def rebase(self, analytics, index):
+        """ Recomputes the TWR and defect probabilities of analytics, as if the repository ended in a commit.
+
+        Args:
+            analytics: The RepositoryAnalytics instance as of the commit.
+            index: An int with the index of the commit.
+
+        Returns:
+            The RepositoryAnalytics instance.
+
+        Raises:
+            ValueError: When the analytics are lean or stored in a database, before changing them.
+        """
+        begin_ts = self.repository.begin_ts
+        current_ts = self.repository.commits[index].timestamp
+        context = analytics.context
+        # Timestamps are always commits timestamps
+        twr_by_ts = {}
+        for commit in self.repository.commits[:index + 1]:
+            if commit.timestamp not in twr_by_ts:
+                twr_by_ts[commit.timestamp] = context.twr(begin_ts, commit.timestamp, current_ts)
+        analytics.rebase(begin_ts, current_ts, twr_by_ts)
+        analytics.last_ts = current_ts
+        for metrics in analytics.directories_analytics.values():  # Even the ones without files, like the analysis
+            metrics.rebase(begin_ts, current_ts, twr_by_ts)
+        for path, file_analytics in analytics.files_analytics.items():
+            for _, metrics in file_analytics.components((path,)):
+                metrics.rebase(begin_ts, current_ts, twr_by_ts)
+        analytics.compute_defect_probability()
+        return analytics
+
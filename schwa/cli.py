@@ -22,11 +22,16 @@
 
 import os
 import argparse
+import json
+import multiprocessing
 import signal
 import sys
 from schwa.web import Server
 from schwa import Schwa, SchwaConfigurationException
 from schwa.extraction import RepositoryExtractionException
+from schwa.parsing import DIFF_ENGINES, DEFAULT_DIFF_ENGINE
+from schwa.analysis import NUMERIC_BACKENDS, DEFAULT_NUMERIC_BACKEND, GRANULARITIES, FLAT_FORMATS, FEATURES, Metrics, \
+    TimeRangeSweep, SnapshotComparison, open_output, write_json, write_flat
 
 
 def main():
@@ -53,23 +58,75 @@ class CLI:
 
     def config(self):
         parser = argparse.ArgumentParser(description='Predicts defects from GIT repositories.')
-        parser.add_argument('repository', help="repository full path on local file system")
+        parser.add_argument('repository', help="repository full path on local file system", nargs="?")
         parser.add_argument('--commits', help="maximum number of commits, since the last one, to be analyzed",
                             default=None, type=int)
         parser.add_argument('-s', '--single', action='store_true', help="Runs in a single process instead of parallel")
+        parser.add_argument('-t', '--threads', action='store_true',
+                            help="Runs in parallel threads instead of processes")
+        parser.add_argument('--start-method', help="Start method of the parallel processes", default=None,
+                            choices=multiprocessing.get_all_start_methods())
         parser.add_argument('-j', '--json', action='store_true', help="Outputs results as JSON")
+        parser.add_argument('--flat', help="Outputs results as one row per component", default=None,
+                            choices=FLAT_FORMATS)
+        parser.add_argument('-o', '--output', help="Writes the JSON or flat results to a file instead of the standard "
+                                                   "output", default=None)
+        parser.add_argument('--gzip', action='store_true', help="Compresses the JSON or flat results with gzip")
+        parser.add_argument('--directories', action='store_true', help="Nests the JSON results files in their "
+                                                                        "directories")
+        parser.add_argument('--precision', help="Significant digits of the JSON or flat results numbers",
+                            default=None, type=int)
         parser.add_argument('-l', '--learn', action='store_true', help="Learn features weight")
         parser.add_argument('--bits', help="Features weight learning bits precision", default=None, type=int)
         parser.add_argument('--generations', help="Features weight learning bits generations", default=None, type=int)
+        parser.add_argument('--diff-engine', help="Engine used to find changed lines", default=DEFAULT_DIFF_ENGINE,
+                            choices=sorted(DIFF_ENGINES))
+        parser.add_argument('--numeric-backend', help="Arithmetic of the metrics, decimal is precise but slower",
+                            default=DEFAULT_NUMERIC_BACKEND, choices=sorted(NUMERIC_BACKENDS))
+        parser.add_argument('--lean', action='store_true', help="Uses less memory, by not storing timestamps")
+        parser.add_argument('--weights', help="Rescores the results with these features weights", default=None,
+                            type=float, nargs=3, metavar=("REVISIONS", "FIXES", "AUTHORS"))
+        parser.add_argument('--store', help="Stores the analytics in this SQLite database instead of memory",
+                            default=None)
+        parser.add_argument('--analysis-processes', help="Number of processes of the analysis, partitioned by file",
+                            default=1, type=int)
+        parser.add_argument('--top', help="Outputs the TOP components with the greatest defect probability",
+                            default=None, type=int)
+        parser.add_argument('--granularity', help="Granularity of the top or compared components", default="method",
+                            choices=GRANULARITIES)
+        parser.add_argument('--path-prefix', help="Only top or compared components with this path prefix", default=None)
+        parser.add_argument('--min-revisions', help="Only top components with at least this number of revisions",
+                            default=0, type=int)
+        parser.add_argument('--sweep', help="Reports how the TOP components change with these time ranges",
+                            default=None, type=float, nargs="+", metavar="TIME_RANGE")
+        parser.add_argument('--compare', help="Compares the components of two runs stored with --store, instead of "
+                                              "analyzing a repository", default=None, nargs=2,
+                            metavar=("OLD_STORE", "NEW_STORE"))
         parser.add_argument('--version', action='version', version='%(prog)s ' + self.version)
         self.args = parser.parse_args()
+        if not self.args.repository and not self.args.compare:
+            parser.error("the following arguments are required: repository")
+        if self.args.store and self.args.analysis_processes != 1:
+            parser.error("argument --analysis-processes: must be 1 with --store")
 
     def routes(self):
         signal.signal(signal.SIGINT, Controller.exit)
 
-        if not os.path.exists(self.args.repository):
+        if self.args.compare:
+            Controller.run_compare(self.args)
+
+        elif not os.path.exists(self.args.repository):
             Controller.invalid_repo(self.args)
 
+        elif self.args.sweep:
+            Controller.run_sweep(self.args)
+
+        elif self.args.top:
+            Controller.run_top(self.args)
+
+        elif self.args.flat:
+            Controller.run_flat(self.args)
+
         elif self.args.json:
             Controller.run_json(self.args)
 
@@ -92,18 +149,64 @@ class Controller:
     def run(args):
         Views.wait()
         try:
-            s = Schwa(args.repository)
-            analytics = s.analyze(max_commits=args.commits, parallel=not args.single)
+            analytics = Controller.analyze(args)
             Views.results(analytics)
         except (RepositoryExtractionException, SchwaConfigurationException) as e:
             Views.failed(e)
             sys.exit(1)
 
     @staticmethod
-    def run_json(args):
+    def analyze(args):
         s = Schwa(args.repository)
-        analytics = s.analyze(max_commits=args.commits, parallel=not args.single)
-        Views.results_json(analytics)
+        analytics = s.analyze(max_commits=args.commits, parallel=not args.single, diff_engine=args.diff_engine,
+                              threads=args.threads, start_method=args.start_method,
+                              numeric_backend=args.numeric_backend, lean=args.lean,
+                              analysis_processes=args.analysis_processes, store=args.store)
+        if args.weights and not args.sweep:
+            if args.store:  # Stored components aren't changed by a view, so they are computed again
+                context = analytics.context
+                context.revisions_weight, context.fixes_weight, context.authors_weight = \
+                    [context.number(weight) for weight in args.weights]
+                analytics.compute_defect_probability()
+            else:
+                analytics.rescore(dict(zip(FEATURES, args.weights))).apply()
+        return analytics
+
+    @staticmethod
+    def run_json(args):
+        analytics = Controller.analyze(args)
+        Views.results_json(analytics, args.output, args.gzip, args.precision, args.directories)
+
+    @staticmethod
+    def run_flat(args):
+        analytics = Controller.analyze(args)
+        Views.results_flat(analytics, args.flat, args.output, args.gzip, args.precision)
+
+    @staticmethod
+    def run_top(args):
+        analytics = Controller.analyze(args)
+        hotspots = analytics.top(args.top, args.granularity, args.path_prefix, args.min_revisions)
+        Views.top(hotspots, args.json)
+
+    @staticmethod
+    def run_sweep(args):
+        analytics = Controller.analyze(args)
+        sweep = TimeRangeSweep(analytics, args.granularity, args.path_prefix)
+        report = sweep.report(args.sweep, [args.weights] if args.weights else None, args.top or 10)
+        Views.sweep(report, sweep.baseline)
+
+    @staticmethod
+    def run_compare(args):
+        comparison = SnapshotComparison(args.compare[0], args.compare[1], args.granularity, args.path_prefix)
+        try:
+            if args.top:
+                deltas = comparison.riskier(args.top)
+            else:
+                deltas = (delta for delta in comparison.deltas() if delta.status != "unchanged")
+            Views.compare(deltas, args.json)
+        except ValueError as e:
+            Views.failed(e)
+            sys.exit(1)
 
     @staticmethod
     def invalid_repo(args):
@@ -120,7 +223,8 @@ class Controller:
         try:
             s = Schwa(args.repository)
             solution = s.learn(max_commits=args.commits, parallel=not args.single, bits=args.bits,
-                               generations=args.generations)
+                               generations=args.generations, diff_engine=args.diff_engine, threads=args.threads,
+                               start_method=args.start_method, numeric_backend=args.numeric_backend)
             Views.learn(solution, args.repository, args.commits)
         except (RepositoryExtractionException, SchwaConfigurationException) as e:
             Views.failed(e)
@@ -141,9 +245,47 @@ class Views:
             Server.run(analytics)
 
     @staticmethod
-    def results_json(analytics):
+    def results_json(analytics, output=None, compress=False, precision=None, directories=False):
         if not analytics.is_empty():
-            print(analytics.to_dict())
+            with open_output(output, compress) as stream:
+                write_json(analytics, stream, precision, directories)
+
+    @staticmethod
+    def results_flat(analytics, flat_format, output=None, compress=False, precision=None):
+        with open_output(output, compress) as stream:
+            write_flat(analytics, stream, flat_format, precision)
+
+    @staticmethod
+    def top(hotspots, as_dict=False):
+        for component, analytics in hotspots:
+            if as_dict:
+                metrics_dict = Metrics.to_dict(analytics)
+                metrics_dict["component"] = list(component)
+                print(json.dumps(metrics_dict))
+            else:
+                print("%.4f  %5i revisions  %4i fixes  %s" % (analytics.defect_prob, analytics.revisions,
+                                                             analytics.fixes, "::".join(component)))
+
+    @staticmethod
+    def sweep(report, baseline):
+        print("Compared to time range %s and weights %s" % baseline)
+        print("time_range  weights             spearman  top_overlap  top")
+        for point in report:
+            weights = ",".join("%.2f" % weight for weight in point["weights"])
+            print("%10.3f  %-18s  %8.4f  %11.2f  %s" % (point["time_range"], weights, point["spearman"],
+                                                       point["top_overlap"], "::".join(point["top"] or ())))
+
+    @staticmethod
+    def compare(deltas, as_dict=False):
+        number = lambda value, pattern: "-" if value is None else pattern % value
+        for delta in deltas:
+            if as_dict:
+                print(json.dumps(delta.to_dict()))
+            else:
+                print("%+.4f  %6s -> %6s  rank %6s -> %6s  %-9s %s" % (
+                    delta.delta, number(delta.old_prob, "%.4f"), number(delta.new_prob, "%.4f"),
+                    number(delta.old_rank, "%i"), number(delta.new_rank, "%i"), delta.status,
+                    "::".join(delta.component)))
 
     @staticmethod
     def failed(msg):
@@ -169,4 +311,5 @@ class Views:
         print("commits", ":", commits if commits else "all")
         print_param("bits")
         print_param("generations")
+        print_param("cache_hit_rate")
         print("-----------------------------------")
@@ -25,6 +25,7 @@ it should start here.
 """
 import abc
 import re
+from schwa.parsing import get_file_parser
 
 
 class AbstractExtractor:
@@ -45,14 +46,16 @@ class AbstractExtractor:
         """ Extracts all the Java commits"""
 
 
+CODE_FILE_RE = re.compile(r".+\.(java|php|py|cpp|c|js|html|css|rb|h|scala|sbt|sh|sql|cs)$")
+
+
 def is_code_file(path):
-    result = re.search(".+\.(java|php|py|cpp|c|js|html|css|rb|h|scala|sbt|sh|sql|cs)$", path)
+    result = CODE_FILE_RE.search(path)
     return result
 
 
 def can_parse_file(path):
-    result = re.search(".+\.(java)$", path)
-    return result
+    return get_file_parser(path) is not None
 
 class RepositoryExtractionException(Exception):
     pass
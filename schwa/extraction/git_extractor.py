@@ -20,17 +20,37 @@
 
 """ Module for the Git Extractor. """
 
+import concurrent.futures
 import multiprocessing
-import os
+import threading
 import git
 from .abstract_extractor import *
 from schwa.repository import *
-from schwa.parsing import JavaParser, ParsingError
+from schwa.parsing import JavaParser, ParsingError, ParseCache, get_file_parser
 
 
 current_repo = None  # Curent repository wrapper
 
 
+def init_worker(path, ignore_regex, method_granularity, diff_engine):
+    """ Multiprocessing initializer of a worker.
+
+    Each worker opens its own repository handle, instead of sharing the GIT processes of the parent, and is
+    warmed up before extracting commits. It doesn't rely on inherited state, so it works with the spawn
+    and forkserver start methods.
+
+    Args:
+        path: A string with the repository local path.
+        ignore_regex: A string that is a regex pattern to ignore unnecessary files.
+        method_granularity: A boolean that enables extraction until the method granularity.
+        diff_engine: A string with the name of the diff engine or None.
+    """
+    global current_repo
+    current_repo = GitExtractor(path)
+    current_repo.configure(ignore_regex, method_granularity, diff_engine)
+    JavaParser.get_parser()
+
+
 def extract_commit_wrapper(hexsha):
     """ Multiprocessing wrapper for extracting a commit"""
     return current_repo.extract_commit(hexsha)
@@ -40,13 +60,28 @@ class GitExtractor(AbstractExtractor):
     """ A Git Extractor.
 
     This class relies on GitPython library to extract data from a local repository.
+
+    Attributes:
+        handles: A thread local storage of GitPython Repo instances, since they aren't thread safe.
+        parse_cache: A ParseCache of parsed files, by blob hexsha.
     """
 
     def __init__(self, path):
         super().__init__(path)
-        self.repo = git.Repo(path, odbt=git.GitCmdObjectDB)
+        self.handles = threading.local()
+        self.handles.repo = git.Repo(path, odbt=git.GitCmdObjectDB)
+        self.parse_cache = ParseCache()
+
+    @property
+    def repo(self):
+        """ The GitPython Repo of the current thread. """
+        repo = getattr(self.handles, "repo", None)
+        if not repo:
+            repo = self.handles.repo = git.Repo(self.path, odbt=git.GitCmdObjectDB)
+        return repo
 
-    def extract(self, ignore_regex="^$", max_commits=None, method_granularity=False, parallel=True):
+    def extract(self, ignore_regex="^$", max_commits=None, method_granularity=False, parallel=True,
+                diff_engine=None, threads=False, start_method=None):
         """ Extract a repository.
 
         It extracts commits from a repository that are important to the analysis. Therefore, only commits
@@ -58,29 +93,36 @@ class GitExtractor(AbstractExtractor):
             max_commits: An optional int that is the maximum number of commits to extract since the last one.
             method_granularity: An optional boolean that enables extraction until the method granularity.
             parallel: An optional boolean that enables multiprocessing extraction.
+            diff_engine: An optional string with the name of the diff engine used to find changed lines.
+            threads: An optional boolean that enables parallel extraction with threads instead of processes,
+                sharing the parse cache and avoiding pickling commits.
+            start_method: An optional string with the multiprocessing start method, e.g. "fork", "spawn" or
+                "forkserver". The platform default is used when it is None.
 
         Returns:
             A Repository instance.
         """
 
         # Multiprocessing setup
-        global current_repo
-        current_repo = self
         try:
             cpus = multiprocessing.cpu_count()
         except NotImplementedError:  # pragma: no cover
             cpus = 2   # pragma: no cover
-        self.ignore_regex = ignore_regex
-        self.method_granularity = method_granularity
+        self.configure(ignore_regex, method_granularity, diff_engine)
 
         # Extract commits
         iter_commits = self.repo.iter_commits(max_count=max_commits) if max_commits else self.repo.iter_commits()
         commits = [commit.hexsha for commit in iter_commits]
-        pool = multiprocessing.Pool(processes=cpus)
-        if parallel and os.name != "nt":
-            commits = pool.map(extract_commit_wrapper, commits)
+        if parallel and threads:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=cpus) as executor:
+                commits = list(executor.map(self.extract_commit, commits))
+        elif parallel:
+            context = multiprocessing.get_context(start_method)
+            with context.Pool(processes=cpus, initializer=init_worker,
+                              initargs=(self.path, ignore_regex, method_granularity, diff_engine)) as pool:
+                commits = pool.map(extract_commit_wrapper, commits)
         else:
-            commits = map(extract_commit_wrapper, commits)
+            commits = map(self.extract_commit, commits)
         commits = list(reversed([commit for commit in commits if commit]))
 
         # Timestamps
@@ -94,6 +136,18 @@ class GitExtractor(AbstractExtractor):
         repo = Repository(commits, begin_ts, last_ts)
         return repo
 
+    def configure(self, ignore_regex="^$", method_granularity=False, diff_engine=None):
+        """ Configures the extraction of commits.
+
+        Args:
+            ignore_regex: An optional string that is a regex pattern to ignore unnecessary files.
+            method_granularity: An optional boolean that enables extraction until the method granularity.
+            diff_engine: An optional string with the name of the diff engine used to find changed lines.
+        """
+        self.ignore_regex = re.compile(ignore_regex)
+        self.method_granularity = method_granularity
+        self.diff_engine = diff_engine
+
     def extract_commit(self, hexsha):
         """ Extract a commit.
 
@@ -146,8 +200,7 @@ class GitExtractor(AbstractExtractor):
     def get_new_file_diffs(self, blob):
         diffs_list = [DiffFile(file_b=blob.path, added=True)]
         if can_parse_file(blob.path) and self.method_granularity:
-            source = GitExtractor.get_source(blob)
-            file_parsed = GitExtractor.parse(blob.path, source)
+            file_parsed = self.parse_blob(blob)
             if file_parsed:
                 classes_set = file_parsed.get_classes_set()
                 methods_set = file_parsed.get_functions_set()
@@ -159,28 +212,53 @@ class GitExtractor(AbstractExtractor):
 
     def get_modified_file_diffs(self, blob_a, blob_b):
         diffs_list = [DiffFile(file_a=blob_a.path, file_b=blob_b.path, modified=True)]
-        try:
-            if can_parse_file(blob_a.path) and can_parse_file(blob_b.path) and self.method_granularity:
-                source_a = GitExtractor.get_source(blob_a)
-                source_b = GitExtractor.get_source(blob_b)
-                diffs_list.extend(GitExtractor.diff((blob_a.path, source_a), (blob_b.path, source_b)))
-        except ParsingError:
-            pass
+        diffs_list.extend(self.get_components_diffs(blob_a, blob_b))
         return diffs_list
 
     def get_renamed_file_diffs(self, blob_a, blob_b):
         diffs_list = [DiffFile(file_a=blob_a.path, file_b=blob_b.path, renamed=True)]
+        diffs_list.extend(self.get_components_diffs(blob_a, blob_b))
+        return diffs_list
+
+    def get_components_diffs(self, blob_a, blob_b):
+        """ Gets the diffs of classes and methods between two versions of a file. """
         try:
             if can_parse_file(blob_a.path) and can_parse_file(blob_b.path) and self.method_granularity:
                 source_a = GitExtractor.get_source(blob_a)
                 source_b = GitExtractor.get_source(blob_b)
-                diffs_list.extend(GitExtractor.diff((blob_a.path, source_a), (blob_b.path, source_b)))
+                file_parsed_a = self.parse_blob(blob_a, source_a)
+                base = (file_parsed_a, source_a) if get_file_parser(blob_a.path) is get_file_parser(blob_b.path) \
+                    else None
+                file_parsed_b = self.parse_blob(blob_b, source_b, base)
+                if file_parsed_a and file_parsed_b:
+                    return GitExtractor.diff((blob_a.path, source_a), (blob_b.path, source_b), self.diff_engine,
+                                             file_parsed_a, file_parsed_b)
         except ParsingError:
             pass
-        return diffs_list
+        return []
+
+    def parse_blob(self, blob, source=None, base=None):
+        """ Parses a blob, using the parse cache.
+
+        Args:
+            blob: A GitPython Blob instance.
+            source: An optional string with the blob source, if it was already read.
+            base: An optional tuple with (File, Source Code) of a previous version of the blob, so that
+                it is parsed incrementally.
+
+        Returns:
+            A File instance or False when it couldn't be parsed.
+        """
+        file_parsed = self.parse_cache.get(blob.hexsha)
+        if file_parsed is None:
+            if source is None:
+                source = GitExtractor.get_source(blob)
+            file_parsed = GitExtractor.parse(blob.path, source, base, self.diff_engine)
+            self.parse_cache.put(blob.hexsha, file_parsed)
+        return file_parsed
 
     def is_good_blob(self, blob):
-        return blob and is_code_file(blob.path) and not re.search(self.ignore_regex, blob.path)
+        return blob and is_code_file(blob.path) and not self.ignore_regex.search(blob.path)
 
     @staticmethod
     def get_source(blob):
@@ -192,20 +270,25 @@ class GitExtractor(AbstractExtractor):
         return source
 
     @staticmethod
-    def parse(path, source):
+    def parse(path, source, base=None, diff_engine=None):
         try:
-            if "java" in path:
-                components = JavaParser.parse(source)
+            parser = get_file_parser(path)
+            if parser and base and base[0]:
+                components = parser.parse_incremental(base[0], base[1], source, diff_engine)
+                return components
+            if parser:
+                components = parser.parse(source)
                 return components
         except ParsingError:
             pass
         return False
 
     @staticmethod
-    def diff(file_a, file_b):
+    def diff(file_a, file_b, diff_engine=None, parsed_file_a=None, parsed_file_b=None):
         try:
-            if "java" in file_a[0]:
-                components_diff = JavaParser.diff(file_a, file_b)
+            parser = get_file_parser(file_a[0])
+            if parser and parser is get_file_parser(file_b[0]):
+                components_diff = parser.diff(file_a, file_b, diff_engine, parsed_file_a, parsed_file_b)
                 return components_diff
         except ParsingError:
             pass
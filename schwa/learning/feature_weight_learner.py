@@ -21,11 +21,15 @@
 """ Module for the Feature Weight Learner """
 
 import random
-from decimal import Decimal
 from deap import base, creator, tools, algorithms
 from schwa.analysis import *
 from schwa.repository import *
 
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
 
 class FeatureWeightLearner:
     """ Learns features weights.
@@ -42,30 +46,46 @@ class FeatureWeightLearner:
         GENERATIONS: An int with the default value for the number of generations.
         FEATURES: An int with the number of features.
         repo: An instance of Repository.
+        context: An instance of AnalysisContext with the numeric backend and the time range.
         deap_toolbox: An instance of DEAP toolbox to use GA.
         constraints: A list of constraints individuals must respect.
         bits: An int with the bits precision.
         generations: An int with the number of generations.
         population: An int with the initial population.
+        fitness_cache: A dict that maps decoded (revisions_weight, fixes_weight, authors_weight) to their fitness.
+        cache_hits: An int with the number of fitness evaluations found in the cache, since learn() started.
+        cache_misses: An int with the number of fitness evaluations that were computed, since learn() started.
+        triples: A list with the distinct last TWR triples of the replay, or None before it (see replay()).
+        fixes: A list with a tuple for each bug fixing commit, with the lists of the indexes of the triples of
+            the involved and not involved files.
+        arrays: A tuple with the numpy array of the triples and the (indexes, counts) numpy arrays of the
+            involved and not involved triples of every bug fixing commit, concatenated. None without numpy.
     """
 
     BITS_PRECISION = 3
     FEATURES = 3
     GENERATIONS = 40
 
-    def __init__(self, repo, bits=None, generations=None):
+    def __init__(self, repo, bits=None, generations=None, context=None):
         self.repo = repo
+        self.context = context if context else AnalysisContext()
         self.deap_toolbox = base.Toolbox()
         self.constraints = []
         self.bits = bits if bits else FeatureWeightLearner.BITS_PRECISION
         self.generations = generations if generations else FeatureWeightLearner.GENERATIONS
         self.population = round(1.5 * 2 ** (FeatureWeightLearner.FEATURES * self.bits))
+        self.fitness_cache = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.triples = None
+        self.fixes = None
+        self.arrays = None
         self.setup_deap()
 
     def setup_deap(self):
         """ Setups configuration for the DEAP library. """
         # Single-objective maximization (1.0)
-        creator.create("FitnessMax", base.Fitness, weights=(Decimal(1.0),))
+        creator.create("FitnessMax", base.Fitness, weights=(self.context.number(1.0),))
 
         # Individual
         creator.create("Individual", list, fitness=creator.FitnessMax)
@@ -85,13 +105,37 @@ class FeatureWeightLearner:
         non_zero = lambda r, f, a: r * f * a > 0
         self.constraints.extend([sum_is_one, non_zero])
 
-    def update_analytics(self, analytics, commit):
+    def update_analytics(self, analytics, commit, twr=None, is_bug_fixing=None):
+        if is_bug_fixing is None:
+            is_bug_fixing = commit.is_bug_fixing()
         analytics.update(ts=commit.timestamp, begin_ts=self.repo.begin_ts, current_ts=self.repo.last_ts,
-                         is_bug_fixing=commit.is_bug_fixing(), author=commit.author)
+                         is_bug_fixing=is_bug_fixing, author=commit.author, twr=twr)
 
     def fitness_wrapper(self, individual):
-        revisions_weight, fixes_weight, authors_weight = self.decode_individual(individual)
-        return self.fitness(revisions_weight, fixes_weight, authors_weight),
+        """ Evaluates an individual, memoized by its decoded weights since the GA finds the same ones many times. """
+        return self.evaluate_population([individual])[0]
+
+    def evaluate_population(self, individuals):
+        """ Evaluates many individuals, computing the ones that aren't in the cache at once (see fitnesses()).
+
+        Args:
+            individuals: A list of individuals.
+
+        Returns:
+            A list with a fitness tuple for each individual.
+        """
+        weights = [tuple(self.decode_individual(individual)) for individual in individuals]
+        missing = list(dict.fromkeys(w for w in weights if w not in self.fitness_cache))
+        self.cache_misses += len(missing)
+        self.cache_hits += len(weights) - len(missing)
+        if missing:
+            self.fitness_cache.update(zip(missing, self.fitnesses(missing)))
+        return [(self.fitness_cache[w],) for w in weights]
+
+    def cache_hit_rate(self):
+        """ Gets the fraction of the fitness evaluations found in the cache, from 0 to 1. """
+        evaluations = self.cache_hits + self.cache_misses
+        return self.cache_hits / evaluations if evaluations else 0
 
     def fitness(self, revisions_weight, fixes_weight, authors_weight):
         """ Computes fitness for a decoded individual.
@@ -100,83 +144,117 @@ class FeatureWeightLearner:
         in terms of defect probability.
 
         Args:
-            revisions_weight: A Decimal with the revisions weight.
-            fixes_weight: A Decimal with the fixes weight.
-            authors_weight: A Decimal with the authors weight.
+            revisions_weight: A number with the revisions weight.
+            fixes_weight: A number with the fixes weight.
+            authors_weight: A number with the authors weight.
 
         Returns:
-            A Decimal with the sum of the distances.
+            A number with the sum of the distances.
         """
+        return self.fitnesses([(revisions_weight, fixes_weight, authors_weight)])[0]
+
+    def fitnesses(self, weights):
+        """ Computes the fitness of many decoded individuals at once.
+
+        The history is replayed only once (see replay()). With the float backend and numpy, the defect
+        probabilities of every TWR triple and individual are a single vectorized computation.
 
-        for constraint in self.constraints:
-            if not constraint(revisions_weight, fixes_weight, authors_weight):
-                return Decimal('-Infinity')
+        Args:
+            weights: A list of (revisions_weight, fixes_weight, authors_weight) tuples.
 
+        Returns:
+            A list of numbers with the sum of the distances of each individual, minus infinity when an
+            individual doesn't respect the constraints.
+        """
+        if self.triples is None:
+            self.replay()
+        fitnesses = [self.context.number('-Infinity')] * len(weights)
+        valid = [index for index, (r, f, a) in enumerate(weights)
+                 if all(constraint(r, f, a) for constraint in self.constraints)]
+        if not valid:
+            return fitnesses
+
+        if numpy is not None and self.context.numeric_backend is FloatBackend:
+            triples, involved, not_involved = self.arrays
+            valid_weights = numpy.array([weights[index] for index in valid], dtype=numpy.float64)
+            probabilities = 1 - numpy.exp(-triples.dot(valid_weights.T))
+            distances = numpy.zeros(len(valid))
+            for sign, (indexes, counts) in ((1, involved), (-1, not_involved)):
+                if len(indexes):  # Sums of each commit with components, averaged by their counts
+                    starts = numpy.cumsum(counts) - counts
+                    non_empty = counts > 0
+                    sums = numpy.add.reduceat(probabilities[indexes], starts[non_empty], axis=0)
+                    distances += sign * (sums / counts[non_empty][:, None]).sum(axis=0)
+            for index, distance in zip(valid, distances.tolist()):
+                fitnesses[index] = distance
+            return fitnesses
+
+        for index in valid:
+            r_weight, f_weight, a_weight = weights[index]
+            probabilities = [self.context.compute_defect_probability(r, f, a, r_weight, f_weight, a_weight)
+                             for r, f, a in self.triples]
+            distance = 0
+            for involved, not_involved in self.fixes:
+                distance += FeatureWeightLearner.average(probabilities, involved) - \
+                    FeatureWeightLearner.average(probabilities, not_involved)
+            fitnesses[index] = distance
+        return fitnesses
+
+    def replay(self):
+        """ Replays the history once, since the TWR of the components doesn't depend on the weights.
+
+        For each bug fixing commit, it stores the last TWR triples of the files it changed (involved) and of
+        the other files (not involved), when they had a bug fix. Triples shared by many commits are stored once.
+        """
+        # The replay has its own context, so the bug fixes dataset of the learner doesn't grow
+        context = self.context.with_weights(self.context.revisions_weight, self.context.fixes_weight,
+                                            self.context.authors_weight)
+        registry = ComponentRegistry(context)
+        indexes = {}
         all_components = set()
-        distance = 0
-        distances = []
-        analytics = RepositoryAnalytics()
+        self.fixes = []
 
-        for commit in self.repo.commits:
-            involved_components = set()
+        def triples_indexes(components):
+            triples = (registry.get((component,)).last_twr for component in components)
+            return [indexes.setdefault(triple, len(indexes)) for triple in triples if triple]
 
-            # Repository Granularity
-            self.update_analytics(analytics, commit)
+        for commit, twr in zip(self.repo.commits, SchwaAnalysis(self.repo, context=context).commits_twr()):
+            involved_components = set()
+            is_bug_fixing = bool(commit.is_bug_fixing())
 
             # File Granularity
-            parent_analytics_dict = analytics.files_analytics
-            files_diffs = [diff for diff in commit.diffs if isinstance(diff, DiffFile)]
-            for diff in files_diffs:
-
-                file_analytics = SchwaAnalysis.get_analytics_from_tree(parent_analytics_dict, diff, FileAnalytics())
+            for diff in [diff for diff in commit.diffs if isinstance(diff, DiffFile)]:
+                file_analytics = registry.resolve((), diff)
                 if diff.renamed or diff.removed:
                     all_components.discard(diff.file_a)
                 if file_analytics:
                     involved_components.add(diff.file_b)
                     all_components.add(diff.file_b)
-                    self.update_analytics(file_analytics, commit)
+                    self.update_analytics(file_analytics, commit, twr, is_bug_fixing)
 
-            # Compute distance
-            if commit.is_bug_fixing():
-                not_involved_components = all_components - involved_components
-                distance_commit = FeatureWeightLearner.distance(analytics, involved_components, not_involved_components,
-                                                                revisions_weight, fixes_weight, authors_weight)
-                distance += distance_commit
-                distances.append(distance_commit)
+            if is_bug_fixing:
+                self.fixes.append((triples_indexes(involved_components),
+                                   triples_indexes(all_components - involved_components)))
 
-        return distance
-
-    @staticmethod
-    def distance(analytics, involved_components, not_involved_components, revisions_weight, fixes_weight,
-                 authors_weight):
-        schwa_avg_involved = FeatureWeightLearner.average_schwa(involved_components, analytics,
-                                                                revisions_weight, fixes_weight, authors_weight)
-        schwa_avg_not_involved = FeatureWeightLearner.average_schwa(not_involved_components, analytics,
-                                                                    revisions_weight, fixes_weight, authors_weight)
-        return schwa_avg_involved - schwa_avg_not_involved
+        self.triples = list(indexes)
+        if numpy is not None:
+            triples = numpy.array(self.triples, dtype=numpy.float64).reshape(-1, FeatureWeightLearner.FEATURES)
+            self.arrays = (triples,) + tuple(
+                (numpy.array([index for fix in self.fixes for index in fix[side]], dtype=numpy.intp),
+                 numpy.array([len(fix[side]) for fix in self.fixes], dtype=numpy.intp)) for side in (0, 1))
 
     @staticmethod
-    def average_schwa(components, analytics, revisions_weight, fixes_weight, authors_weight):
-        schwa_sum = 0
-        n = 0
-        for component in components:
-            a = analytics.files_analytics[component]
-            if a.last_twr:
-                revisions, fixes, authors = a.last_twr
-                schwa_prob = Metrics.compute_defect_probability(revisions, fixes, authors,
-                                                                revisions_weight, fixes_weight, authors_weight)
-                n += 1
-                schwa_sum += schwa_prob
-        if n > 0:
-            return schwa_sum / n
-        else:
-            return 0
+    def average(probabilities, indexes):
+        """ Averages the probabilities of some triples, 0 when there aren't any. """
+        if indexes:
+            return sum(probabilities[index] for index in indexes) / len(indexes)
+        return 0
 
     def decode_individual(self, individual):
         ind = list(zip(*(iter(map(str, individual)),) * self.bits))
         ind = list(map(lambda t: int("".join(t), 2), ind))
         max_encoded = int("1" * self.bits, 2)
-        weights = list(map(lambda w: Decimal(w) / Decimal(max_encoded), ind))
+        weights = list(map(lambda w: self.context.number(w) / self.context.number(max_encoded), ind))
         return weights
 
     def learn(self):
@@ -188,6 +266,8 @@ class FeatureWeightLearner:
             A dict with the features weight and others params.
         """
         solution = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
 
         # Generate Population
         population = self.deap_toolbox.population(n=self.population)
@@ -195,7 +275,7 @@ class FeatureWeightLearner:
         # Evolve
         for gen in range(self.generations):
             offspring = algorithms.varAnd(population, self.deap_toolbox, cxpb=0.5, mutpb=0.1)
-            fits = self.deap_toolbox.map(self.deap_toolbox.evaluate, offspring)
+            fits = self.evaluate_population(offspring)
             for fit, ind in zip(fits, offspring):
                 ind.fitness.values = fit
             population = self.deap_toolbox.select(offspring, k=len(population))
@@ -211,5 +291,6 @@ class FeatureWeightLearner:
         solution["fitness"] = best_fitness
         solution["bits"] = self.bits
         solution["generations"] = self.generations
+        solution["cache_hit_rate"] = self.cache_hit_rate()
 
         return solution
\ No newline at end of file
@@ -1,2 +1,6 @@
 from .java_parser import *
-from .abstract_parser import *
\ No newline at end of file
+from .python_parser import *
+from .abstract_parser import *
+from .diff_engine import *
+from .parse_cache import *
+from .registry import *
\ No newline at end of file
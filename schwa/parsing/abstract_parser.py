@@ -21,12 +21,16 @@
 """ Module for Abstract Parsers """
 
 import abc
+from plyj.parser import ParsingError
+from schwa.repository import *
+from .diff_engine import get_diff_engine
 
 
 class AbstractParser:
     """ An Abstract Parser.
 
-    It should have parse() and diff() static methods.
+    It should have a parse() static method that returns a File. Diffs between versions are computed
+    from the parsed files and the changed lines, so they are the same for every language.
     """
     __metaclass__ = abc.ABCMeta
 
@@ -34,6 +38,108 @@ class AbstractParser:
     def parse(source):
         """ Parses all the components till method"""
 
-    @abc.abstractstaticmethod
-    def diff(source_a, source_b):
-        """ Parses differences till method"""
\ No newline at end of file
+    @classmethod
+    def parse_incremental(cls, parsed_file_a, source_a, source_b, diff_engine=None):
+        """ Parses version B of a file, given the parsed version A.
+
+        Parsers that can reuse the components of version A should override it. By default it parses
+        the whole source of version B.
+
+        Args:
+            parsed_file_a: A File instance of version A.
+            source_a: A string with the source of version A.
+            source_b: A string with the source of version B.
+            diff_engine: An optional string with the name of the diff engine (see DIFF_ENGINES).
+
+        Returns:
+            A File instance of version B.
+
+        Raises:
+            ParsingError: When the source code of version B is not valid.
+        """
+        return cls.parse(source_b)
+
+    @staticmethod
+    def extract_changed_sequences(source_a, source_b, diff_engine=None):
+        """ Extracts sequences of changes.
+
+        It returns a list of sequences changed between source A and source B.
+        For example: [["-", 1, 10], ["+", 15, 35], ["-", 100, 110]]
+
+        Args:
+            source_a: A string representing the source of version A.
+            source_b: A string representing the source of version B.
+            diff_engine: An optional string with the name of the diff engine (see DIFF_ENGINES).
+
+        Returns:
+            A list of lists with changed sequences.
+        """
+        return get_diff_engine(diff_engine).changed_sequences(source_a, source_b)
+
+    @classmethod
+    def diff(cls, file_a, file_b, diff_engine=None, parsed_file_a=None, parsed_file_b=None):
+        """ Computes diffs between 2 version of a file.
+
+        By giving files paths and source code, outputs Diffs instances.
+
+        Args:
+            file_a: A tuple with (File Path, Source Code) of version A.
+            file_b: A tuple with (File Path, Source Code) of version B.
+            diff_engine: An optional string with the name of the diff engine.
+            parsed_file_a: An optional File instance of version A, if it was already parsed.
+            parsed_file_b: An optional File instance of version B, if it was already parsed.
+
+        Returns:
+            A list of Diff instances.
+        """
+        diffs = []
+        path_a, source_a = file_a
+        path_b, source_b = file_b
+        try:
+            parsed_file_a = parsed_file_a or cls.parse(source_a)
+            parsed_file_b = parsed_file_b or cls.parse(source_b)
+        except ParsingError:
+            return diffs
+        changed_a = set()
+        changed_b = set()
+        changed_sequences = AbstractParser.extract_changed_sequences(source_a, source_b, diff_engine)
+
+        # Obtain changed components of each version
+        for operation, start_line, end_line in changed_sequences:
+            if operation == "-":
+                changed_a = changed_a | parsed_file_a.get_components_hit(start_line, end_line)
+            if operation == "+":
+                changed_b = changed_b | parsed_file_b.get_components_hit(start_line, end_line)
+
+
+        # Method granularity differences
+        methods_changed_a = set(c for c in changed_a if isinstance(c, tuple))
+        methods_changed_b = set(c for c in changed_b if isinstance(c, tuple))
+        methods_a = parsed_file_a.get_functions_set()
+        methods_b = parsed_file_b.get_functions_set()
+        methods_added = methods_b - methods_a
+        methods_removed = methods_a - methods_b
+        methods_modified = (methods_changed_a | methods_changed_b) - (methods_added | methods_removed)
+        for c, m in methods_added:
+            diffs.append(DiffMethod(file_name=path_b, class_name=c, method_b=m, added=True))
+        for c, m in methods_removed:
+            diffs.append(DiffMethod(file_name=path_b, class_name=c, method_a=m, removed=True))
+        for c, m in methods_modified:
+            diffs.append(DiffMethod(file_name=path_b, class_name=c, method_a=m, method_b=m, modified=True))
+
+        # Class granularity differences
+        classes_changed_a = set(c for c in changed_a if isinstance(c, str))
+        classes_changed_b = set(c for c in changed_b if isinstance(c, str))
+        classes_a = parsed_file_a.get_classes_set()
+        classes_b = parsed_file_b.get_classes_set()
+        classes_added = classes_b - classes_a
+        classes_removed = classes_a - classes_b
+        classes_modified = (classes_changed_a | classes_changed_b) - (classes_added | classes_removed)
+        for c in classes_added:
+            diffs.append(DiffClass(file_name=path_b, class_b=c, added=True))
+        for c in classes_removed:
+            diffs.append(DiffClass(file_name=path_b, class_a=c, removed=True))
+        for c in classes_modified:
+            diffs.append(DiffClass(file_name=path_b, class_a=c, class_b=c, modified=True))
+
+        return diffs
\ No newline at end of file
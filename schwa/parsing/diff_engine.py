@@ -0,0 +1,266 @@
+# Copyright (c) 2015 Faculty of Engineering of the University of Porto
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+""" Module for the line Diff Engines.
+
+A diff engine compares two versions of a source file and outputs line range opcodes, in the same
+format as difflib.SequenceMatcher.get_opcodes(): (tag, i1, i2, j1, j2) where tag is one of "equal",
+"delete", "insert" or "replace" and the ranges are zero based and half open.
+"""
+
+import abc
+import difflib
+import math
+
+
+class AbstractDiffEngine:
+    """ An abstract Diff Engine.
+
+    It should have a get_opcodes() static method. The changed sequences are derived from the opcodes.
+    """
+    __metaclass__ = abc.ABCMeta
+
+    @abc.abstractstaticmethod
+    def get_opcodes(lines_a, lines_b):
+        """ Computes the opcodes that transform lines A into lines B """
+
+    @classmethod
+    def changed_sequences(cls, source_a, source_b):
+        """ Extracts sequences of changes.
+
+        It returns a list of sequences changed between source A and source B, with one based
+        and inclusive line numbers. For example: [["-", 1, 10], ["+", 15, 35], ["-", 100, 110]]
+
+        Args:
+            source_a: A string representing the source of version A.
+            source_b: A string representing the source of version B.
+
+        Returns:
+            A list of lists with changed sequences.
+        """
+        changed_sequences = []
+        for tag, i1, i2, j1, j2 in cls.get_opcodes(source_a.split("\n"), source_b.split("\n")):
+            if tag == "delete" or tag == "replace":
+                changed_sequences.append(["-", i1 + 1, i2])
+            if tag == "insert" or tag == "replace":
+                changed_sequences.append(["+", j1 + 1, j2])
+        return changed_sequences
+
+
+class NdiffEngine(AbstractDiffEngine):
+    """ A Diff Engine based on difflib.ndiff.
+
+    It was the original engine of Schwa. It is kept for comparison, since ndiff also computes
+    intraline hints that are discarded and is slow on files with many similar lines.
+    """
+
+    @staticmethod
+    def get_opcodes(lines_a, lines_b):
+        kinds = {"-": "delete", "+": "insert", " ": "equal"}
+        opcodes = []
+        kind = None
+        i = j = start_i = start_j = 0
+
+        for line in difflib.ndiff(lines_a, lines_b):
+            code = line[0]
+            # Intraline hints close the current sequence
+            if code == "?" or kinds[code] != kind:
+                if kind:
+                    opcodes.append((kind, start_i, i, start_j, j))
+                kind = kinds.get(code)
+                start_i, start_j = i, j
+            if code == "-" or code == " ":
+                i += 1
+            if code == "+" or code == " ":
+                j += 1
+
+        if kind:
+            opcodes.append((kind, start_i, i, start_j, j))
+        return opcodes
+
+
+class MyersEngine(AbstractDiffEngine):
+    """ A Diff Engine using the linear space variant of the Myers O(ND) algorithm.
+
+    Lines are interned to integers and common prefixes and suffixes are trimmed before searching
+    for the middle snake, so the cost is proportional to the size of the changes and not to the
+    similarity of the lines. Like GIT, the search is abandoned after MIN_COST edits (or the square root
+    of the number of lines, if greater) and the furthest reaching path is used, so that completely
+    rewritten files have a bounded cost at the expense of a non minimal diff.
+
+    Attributes:
+        MIN_COST: An int with the minimum number of edits explored before using the heuristic.
+    """
+
+    MIN_COST = 256
+
+    @staticmethod
+    def get_opcodes(lines_a, lines_b):
+        ids = {}
+        a = [ids.setdefault(line, len(ids)) for line in lines_a]
+        b = [ids.setdefault(line, len(ids)) for line in lines_b]
+        blocks = []
+        MyersEngine.matching_blocks(a, b, 0, len(a), 0, len(b), blocks)
+        blocks.append((len(a), len(b), 0))
+        return MyersEngine.blocks_to_opcodes(blocks)
+
+    @staticmethod
+    def matching_blocks(a, b, a_lo, a_hi, b_lo, b_hi, blocks):
+        """ Appends to blocks the (i, j, size) matching blocks between a[a_lo:a_hi] and b[b_lo:b_hi]. """
+        # Common prefix
+        prefix = 0
+        while a_lo + prefix < a_hi and b_lo + prefix < b_hi and a[a_lo + prefix] == b[b_lo + prefix]:
+            prefix += 1
+        if prefix:
+            MyersEngine.add_block(blocks, a_lo, b_lo, prefix)
+            a_lo += prefix
+            b_lo += prefix
+
+        # Common suffix
+        suffix = 0
+        while a_lo < a_hi - suffix and b_lo < b_hi - suffix and a[a_hi - suffix - 1] == b[b_hi - suffix - 1]:
+            suffix += 1
+        a_hi -= suffix
+        b_hi -= suffix
+
+        if a_lo < a_hi and b_lo < b_hi:
+            x, y, u, v = MyersEngine.middle_snake(a, b, a_lo, a_hi, b_lo, b_hi)
+            MyersEngine.matching_blocks(a, b, a_lo, x, b_lo, y, blocks)
+            if u > x:
+                MyersEngine.add_block(blocks, x, y, u - x)
+            MyersEngine.matching_blocks(a, b, u, a_hi, v, b_hi, blocks)
+
+        if suffix:
+            MyersEngine.add_block(blocks, a_hi, b_hi, suffix)
+
+    @staticmethod
+    def add_block(blocks, i, j, size):
+        """ Appends a matching block, merging it with the previous one when they are adjacent. """
+        if blocks:
+            last_i, last_j, last_size = blocks[-1]
+            if last_i + last_size == i and last_j + last_size == j:
+                blocks[-1] = (last_i, last_j, last_size + size)
+                return
+        blocks.append((i, j, size))
+
+    @staticmethod
+    def middle_snake(a, b, a_lo, a_hi, b_lo, b_hi):
+        """ Finds the middle snake of an optimal edit script.
+
+        Searches forward from the beginning and backward from the end until both paths overlap. When
+        the cost is too high it splits at the furthest reaching forward path instead.
+
+        Returns:
+            A tuple (x, y, u, v) where the snake goes from a[x], b[y] to a[u], b[v].
+        """
+        n = a_hi - a_lo
+        m = b_hi - b_lo
+        delta = n - m
+        odd = delta & 1
+        max_d = (n + m + 1) // 2
+        max_cost = max(MyersEngine.MIN_COST, int(math.sqrt(n + m)))
+        offset = max_d + 1
+        forward = [0] * (2 * offset + 1)
+        backward = [0] * (2 * offset + 1)
+
+        for d in range(max_d + 1):
+            # Forward paths
+            for k in range(-d, d + 1, 2):
+                if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                    x = forward[offset + k + 1]
+                else:
+                    x = forward[offset + k - 1] + 1
+                y = x - k
+                start_x, start_y = x, y
+                while x < n and y < m and a[a_lo + x] == b[b_lo + y]:
+                    x += 1
+                    y += 1
+                forward[offset + k] = x
+                if odd and delta - d < k < delta + d and x + backward[offset + delta - k] >= n:
+                    return a_lo + start_x, b_lo + start_y, a_lo + x, b_lo + y
+
+            # Backward paths, on the reversed sequences
+            for k in range(-d, d + 1, 2):
+                if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+                    x = backward[offset + k + 1]
+                else:
+                    x = backward[offset + k - 1] + 1
+                y = x - k
+                start_x, start_y = x, y
+                while x < n and y < m and a[a_hi - x - 1] == b[b_hi - y - 1]:
+                    x += 1
+                    y += 1
+                backward[offset + k] = x
+                if not odd and -d <= delta - k <= d and x + forward[offset + delta - k] >= n:
+                    return a_hi - x, b_hi - y, a_hi - start_x, b_hi - start_y
+
+            if d >= max_cost:
+                reachable = [k for k in range(-d, d + 1, 2)
+                             if forward[offset + k] <= n and 0 <= forward[offset + k] - k <= m]
+                best = max(reachable, key=lambda k: 2 * forward[offset + k] - k)
+                x = forward[offset + best]
+                y = x - best
+                return a_lo + x, b_lo + y, a_lo + x, b_lo + y
+
+        raise AssertionError("Middle snake not found")  # pragma: no cover
+
+    @staticmethod
+    def blocks_to_opcodes(blocks):
+        """ Converts matching blocks into opcodes, like difflib.SequenceMatcher.get_opcodes(). """
+        opcodes = []
+        i = j = 0
+        for block_i, block_j, size in blocks:
+            if i < block_i and j < block_j:
+                opcodes.append(("replace", i, block_i, j, block_j))
+            elif i < block_i:
+                opcodes.append(("delete", i, block_i, j, block_j))
+            elif j < block_j:
+                opcodes.append(("insert", i, block_i, j, block_j))
+            i, j = block_i + size, block_j + size
+            if size:
+                opcodes.append(("equal", block_i, i, block_j, j))
+        return opcodes
+
+
+DIFF_ENGINES = {
+    "myers": MyersEngine,
+    "ndiff": NdiffEngine
+}
+
+DEFAULT_DIFF_ENGINE = "myers"
+
+
+def get_diff_engine(name=None):
+    """ Gets a Diff Engine by name.
+
+    Args:
+        name: An optional string with the engine name. The default engine is used when it is None.
+
+    Returns:
+        A subclass of AbstractDiffEngine.
+
+    Raises:
+        ValueError: When the engine doesn't exist.
+    """
+    try:
+        return DIFF_ENGINES[name or DEFAULT_DIFF_ENGINE]
+    except KeyError:
+        raise ValueError("Unknown diff engine %s, choose one of: %s" % (name, ", ".join(sorted(DIFF_ENGINES))))
@@ -20,15 +20,18 @@
 
 """ Module for the Java Parser """
 
-import difflib
-import re
+import bisect
+import threading
 import plyj.parser as plyj
 from plyj.model import *
 from plyj.parser import *
 from .abstract_parser import AbstractParser
+from .diff_engine import get_diff_engine
 from schwa.repository import *
 
-parser = None
+parsers = threading.local()  # Plyj parsers of each thread, since lexer and parser state is mutated when parsing
+parsers_lock = threading.Lock()
+MEMBER_WRAPPER = "class $ {"  # Wraps class members, in the first line, to parse them without shifting lines
 
 
 class JavaParser(AbstractParser):
@@ -37,6 +40,22 @@ class JavaParser(AbstractParser):
     It parses Java Code using Plyj.
     """
 
+    @staticmethod
+    def get_parser():
+        """ Gets the Plyj parser of the current thread.
+
+        Each thread has its own parser, with isolated lexer and parser state, so Java can be parsed
+        by many threads at the same time.
+
+        Returns:
+            A plyj.Parser instance.
+        """
+        parser = getattr(parsers, "parser", None)
+        if not parser:
+            with parsers_lock:  # The first parser builds the PLY tables
+                parser = parsers.parser = plyj.Parser()
+        return parser
+
     @staticmethod
     def parse(code):
         """ Parses Java code.
@@ -52,11 +71,7 @@ class JavaParser(AbstractParser):
         Raises:
             ParsingError: When the source code is not valid Java.
         """
-        global parser
-        if not parser:
-            parser = plyj.Parser()
-        tree = parser.parse_string(code)
-        tree.body = tree.type_declarations
+        tree = JavaParser.get_parser().parse_string(code)
         classes = JavaParser.parse_tree(tree)
         _file = File()
         _file.classes = classes
@@ -74,10 +89,11 @@ class JavaParser(AbstractParser):
         Returns:
             A list of Components, that can be nested Classes and Methods.
         """
+        body = tree.type_declarations if isinstance(tree, CompilationUnit) else tree.body
 
         # Child classes
         child_classes = []
-        for declaration in tree.body:
+        for declaration in body:
             if isinstance(declaration, ClassDeclaration):
                 components = JavaParser.parse_tree(declaration)
                 child_classes.append(components)
@@ -85,7 +101,7 @@ class JavaParser(AbstractParser):
         # Is a class
         if isinstance(tree, ClassDeclaration):
             class_component = Class(name=tree.name, start_line=tree.start_line, end_line=tree.end_line)
-            for declaration in tree.body:
+            for declaration in body:
                 if isinstance(declaration, (MethodDeclaration, ConstructorDeclaration)):
                     method = declaration
                     method_component = Method(name=method.name, start_line=method.start_line, end_line=method.end_line)
@@ -95,132 +111,133 @@ class JavaParser(AbstractParser):
         else:
             return child_classes
 
-
     @staticmethod
-    def extract_changed_sequences(source_a, source_b):
-        """ Extracts sequences of changes.
+    def parse_incremental(parsed_file_a, source_a, source_b, diff_engine=None):
+        """ Parses version B of a Java file, given the parsed version A.
 
-        It returns a list of sequences changed between source A and source B.
-        For example: [["-", 1, 10], ["+", 15, 35], ["-", 100, 110]]
+        Every change is mapped to the innermost class or method that strictly contains it, i.e. whose
+        first and last lines didn't change. Only those declarations are parsed again, as top level types
+        or as class members, and the line numbers of untouched components are shifted. Changes outside
+        of any declaration, or regions that can't be parsed alone, fall back to a full parse. Version A is
+        never mutated, since it can be cached.
 
         Args:
-            source_a: A string representing Java source of version A.
-            source_b: A string representing Java source of version B.
+            parsed_file_a: A File instance of version A.
+            source_a: A string with the source of version A.
+            source_b: A string with the source of version B.
+            diff_engine: An optional string with the name of the diff engine (see DIFF_ENGINES).
 
         Returns:
-            A list of lists with changed sequences.
+            A File instance of version B.
+
+        Raises:
+            ParsingError: When the source code of version B is not valid Java.
         """
+        lines_b = source_b.split("\n")
+        opcodes = get_diff_engine(diff_engine).get_opcodes(source_a.split("\n"), lines_b)
+        equal_blocks = [(i1, i2, j1) for tag, i1, i2, j1, j2 in opcodes if tag == "equal"]
+        starts = [i1 for i1, i2, j1 in equal_blocks]
+
+        def map_line(line):
+            """ Maps an unchanged line of version A to version B, both one based. """
+            index = bisect.bisect_left(starts, line) - 1
+            if index < 0 or line > equal_blocks[index][1]:
+                raise KeyError(line)
+            i1, i2, j1 = equal_blocks[index]
+            return line - i1 + j1
+
+        # Declarations to parse again, by their path of components
+        paths = set()
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag != "equal":
+                path = JavaParser.get_enclosing_path(parsed_file_a, i1, i2)
+                if not path:
+                    return JavaParser.parse(source_b)
+                paths.add(path)
+        paths = [path for path in paths if not any(path[:i] in paths for i in range(1, len(path)))]
 
-        changed_lines = difflib.ndiff(source_a.split("\n"), source_b.split("\n"))
-        line_number_a = 0
-        line_number_b = 0
-        added_re = re.compile("^\+")
-        removed_re = re.compile("^-")
-        incremental_re = re.compile("^\?")
-        changed_sequence = None
-        changed_sequences = []
-
-        for line in changed_lines:
-            # Added line
-            if added_re.search(line):
-                if changed_sequence and changed_sequence[0] == "-":
-                    changed_sequence[2] = line_number_a
-                    changed_sequences.append(changed_sequence)
-                    changed_sequence = None
-
-                line_number_b += 1
-                if not changed_sequence:
-                    changed_sequence = ["+", line_number_b, 0]
-
-            # Removed line
-            elif removed_re.search(line):
-                if changed_sequence and changed_sequence[0] == "+":
-                    changed_sequence[2] = line_number_b
-                    changed_sequences.append(changed_sequence)
-                    changed_sequence = None
-
-                line_number_a += 1
-                if not changed_sequence:
-                    changed_sequence = ["-", line_number_a, 0]
-
-            # Incremental or same
-            else:
-                if changed_sequence and changed_sequence[0] == "+":
-                    changed_sequence[2] = line_number_b
-                    changed_sequences.append(changed_sequence)
-                    changed_sequence = None
-                elif changed_sequence and changed_sequence[0] == "-":
-                    changed_sequence[2] = line_number_a
-                    changed_sequences.append(changed_sequence)
-                    changed_sequence = None
-                # Same
-                if not incremental_re.search(line):
-                    line_number_a += 1
-                    line_number_b += 1
-
-        return changed_sequences
+        try:
+            replacements = {}
+            for path in paths:
+                component = path[-1]
+                start_line, end_line = map_line(component.start_line), map_line(component.end_line)
+                region = "\n".join(lines_b[start_line - 1:end_line])
+                if len(path) == 1:  # Top level type
+                    replacements[component] = JavaParser.parse_tree(
+                        JavaParser.get_parser().parse_string(region, lineno=start_line))
+                else:  # Class member
+                    tree = JavaParser.get_parser().parse_string(MEMBER_WRAPPER + region + "\n}", lineno=start_line)
+                    types = JavaParser.parse_tree(tree)
+                    if len(types) != 1:  # The region closes its class, so members moved to other types
+                        return JavaParser.parse(source_b)
+                    replacements[component] = types[0].methods + types[0].classes
+            _file = File()
+            _file.classes = JavaParser.shift_components(parsed_file_a.classes, replacements, map_line)
+        except (KeyError, IndexError, ParsingError):
+            # A region may not be valid alone, e.g. when a comment or brace of its context affects it
+            return JavaParser.parse(source_b)
+        return _file
 
     @staticmethod
-    def diff(file_a, file_b):
-        """ Computes diffs between 2 version of a file.
+    def get_enclosing_path(parsed_file, i1, i2):
+        """ Gets the path of components to the innermost declaration that strictly contains a change.
 
-        By giving files paths and source code, outputs Diffs instances.
+        A declaration can only be parsed alone if it doesn't share lines with its parent or siblings.
 
         Args:
-            file_a: A tuple with (File Path, Source Code) of version A.
-            file_b: A tuple with (File Path, Source Code) of version B.
+            parsed_file: A File instance.
+            i1: A number with the zero based start (inclusive) of the changed lines.
+            i2: A number with the zero based end (exclusive) of the changed lines.
 
         Returns:
-            A list of Diff instances.
+            A tuple of Components, from the top level class to the innermost declaration.
         """
-        diffs = []
-        path_a, source_a = file_a
-        path_b, source_b = file_b
-        try:
-            parsed_file_a = JavaParser.parse(source_a)
-            parsed_file_b = JavaParser.parse(source_b)
-        except ParsingError:
-            return diffs
-        changed_a = set()
-        changed_b = set()
-        changed_sequences = JavaParser.extract_changed_sequences(source_a, source_b)
-
-        # Obtain changed components of each version
-        for operation, start_line, end_line in changed_sequences:
-            if operation == "-":
-                changed_a = changed_a | parsed_file_a.get_components_hit(start_line, end_line)
-            if operation == "+":
-                changed_b = changed_b | parsed_file_b.get_components_hit(start_line, end_line)
-
-
-        # Method granularity differences
-        methods_changed_a = set(c for c in changed_a if isinstance(c, tuple))
-        methods_changed_b = set(c for c in changed_b if isinstance(c, tuple))
-        methods_a = parsed_file_a.get_functions_set()
-        methods_b = parsed_file_b.get_functions_set()
-        methods_added = methods_b - methods_a
-        methods_removed = methods_a - methods_b
-        methods_modified = (methods_changed_a | methods_changed_b) - (methods_added | methods_removed)
-        for c, m in methods_added:
-            diffs.append(DiffMethod(file_name=path_b, class_name=c, method_b=m, added=True))
-        for c, m in methods_removed:
-            diffs.append(DiffMethod(file_name=path_b, class_name=c, method_a=m, removed=True))
-        for c, m in methods_modified:
-            diffs.append(DiffMethod(file_name=path_b, class_name=c, method_a=m, method_b=m, modified=True))
-
-        # Class granularity differences
-        classes_changed_a = set(c for c in changed_a if isinstance(c, str))
-        classes_changed_b = set(c for c in changed_b if isinstance(c, str))
-        classes_a = parsed_file_a.get_classes_set()
-        classes_b = parsed_file_b.get_classes_set()
-        classes_added = classes_b - classes_a
-        classes_removed = classes_a - classes_b
-        classes_modified = (classes_changed_a | classes_changed_b) - (classes_added | classes_removed)
-        for c in classes_added:
-            diffs.append(DiffClass(file_name=path_b, class_b=c, added=True))
-        for c in classes_removed:
-            diffs.append(DiffClass(file_name=path_b, class_a=c, removed=True))
-        for c in classes_modified:
-            diffs.append(DiffClass(file_name=path_b, class_a=c, class_b=c, modified=True))
-
-        return diffs
\ No newline at end of file
+        path = ()
+        parent = None
+        children = parsed_file.classes
+        while True:
+            child = next((c for c in children if c.start_line <= i1 and i2 < c.end_line), None)
+            if not child:
+                return path
+            isolated = (not parent or parent.start_line < child.start_line and child.end_line < parent.end_line) \
+                and not any(sibling is not child and sibling.start_line <= child.end_line and
+                            child.start_line <= sibling.end_line for sibling in children)
+            if not isolated:
+                return path
+            path += (child,)
+            parent = path[-1]
+            if not isinstance(parent, Class):
+                return path
+            children = parent.methods + parent.classes
+
+    @staticmethod
+    def shift_components(components, replacements, map_line):
+        """ Copies components to version B.
+
+        Args:
+            components: A list of Components of version A.
+            replacements: A dict that maps Components of version A to lists of Components parsed again.
+            map_line: A function that maps unchanged lines of version A to version B.
+
+        Returns:
+            A list of Components of version B, sorted by line.
+        """
+        shifted = []
+        for component in components:
+            if component in replacements:
+                shifted.extend(replacements[component])
+            elif isinstance(component, Class):
+                class_component = Class(name=component.name, start_line=map_line(component.start_line),
+                                        end_line=map_line(component.end_line))
+                for member in JavaParser.shift_components(component.methods + component.classes, replacements,
+                                                          map_line):
+                    if isinstance(member, Class):
+                        class_component.classes.append(member)
+                    else:
+                        class_component.methods.append(member)
+                shifted.append(class_component)
+            else:
+                shifted.append(Method(name=component.name, start_line=map_line(component.start_line),
+                                      end_line=map_line(component.end_line)))
+        shifted.sort(key=lambda c: c.start_line)
+        return shifted
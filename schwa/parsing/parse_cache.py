@@ -0,0 +1,78 @@
+# Copyright (c) 2015 Faculty of Engineering of the University of Porto
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+""" Module for the Parse Cache. """
+
+import collections
+import threading
+
+
+class ParseCache:
+    """ A thread safe LRU cache of parsed files.
+
+    The version B of a file in a commit is the version A of the next commit that changes it, so
+    caching parsed files by content id (e.g. the GIT blob hexsha) avoids parsing each version twice.
+
+    Attributes:
+        MAX_SIZE: An int with the default maximum number of parsed files.
+        max_size: An int with the maximum number of parsed files.
+        hits: An int with the number of lookups that found a parsed file.
+        misses: An int with the number of lookups that didn't find a parsed file.
+    """
+
+    MAX_SIZE = 1024
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size if max_size else ParseCache.MAX_SIZE
+        self.hits = 0
+        self.misses = 0
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """ Gets a parsed file.
+
+        Args:
+            key: A string with the content id.
+
+        Returns:
+            The cached value or None when the key isn't cached.
+        """
+        with self.lock:
+            try:
+                value = self.entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """ Caches a parsed file, evicting the least recently used if the cache is full. """
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,85 @@
+# Copyright (c) 2015 Faculty of Engineering of the University of Porto
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+""" Module for the Python Parser """
+
+import ast
+from plyj.parser import ParsingError
+from .abstract_parser import AbstractParser
+from schwa.repository import *
+
+
+class PythonParser(AbstractParser):
+    """ A Python Parser.
+
+    It parses Python code using the ast module of the standard library. Top level functions are Functions,
+    functions of a class are Methods and nested functions belong to the enclosing component.
+    """
+
+    @staticmethod
+    def parse(code):
+        """ Parses Python code.
+
+        Args:
+            code: A string of Python code.
+
+        Returns:
+            A File instance.
+
+        Raises:
+            ParsingError: When the source code is not valid Python.
+        """
+        try:
+            tree = ast.parse(code)
+        except (SyntaxError, ValueError) as e:
+            raise ParsingError(str(e))
+        _file = File()
+        for node in tree.body:
+            if isinstance(node, ast.ClassDef):
+                _file.classes.append(PythonParser.parse_class(node))
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                _file.functions.append(Function(name=node.name, start_line=PythonParser.start_line(node),
+                                                end_line=node.end_lineno))
+        return _file
+
+    @staticmethod
+    def parse_class(node):
+        """ Parses a class definition recursively.
+
+        Args:
+            node: An ast.ClassDef instance.
+
+        Returns:
+            A Class instance with its methods and nested classes.
+        """
+        class_component = Class(name=node.name, start_line=PythonParser.start_line(node), end_line=node.end_lineno)
+        for child in node.body:
+            if isinstance(child, ast.ClassDef):
+                class_component.classes.append(PythonParser.parse_class(child))
+            elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                class_component.methods.append(Method(name=child.name, start_line=PythonParser.start_line(child),
+                                                      end_line=child.end_lineno))
+        return class_component
+
+    @staticmethod
+    def start_line(node):
+        """ Gets the first line of a definition, including its decorators. """
+        return min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
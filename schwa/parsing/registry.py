@@ -0,0 +1,54 @@
+# Copyright (c) 2015 Faculty of Engineering of the University of Porto
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+""" Module for the registry of Parsers by file extension. """
+
+import os
+from .java_parser import JavaParser
+from .python_parser import PythonParser
+
+
+PARSERS = {
+    ".java": JavaParser,
+    ".py": PythonParser
+}
+
+
+def register_parser(extension, parser):
+    """ Registers a parser for a file extension.
+
+    Args:
+        extension: A string with the file extension, including the dot, e.g. ".java".
+        parser: A subclass of AbstractParser.
+    """
+    PARSERS[extension] = parser
+
+
+def get_file_parser(path):
+    """ Gets the parser of a file by its extension.
+
+    Args:
+        path: A string with the file path.
+
+    Returns:
+        A subclass of AbstractParser or None when there isn't a parser for the file.
+    """
+    return PARSERS.get(os.path.splitext(path)[1])
@@ -24,13 +24,17 @@
 class File:
     """A class for representing a file structure.
 
-    A file can contain classes or functions.
+    A file can contain classes or functions. Components use __slots__ since a tree is built for every
+    parsed version of a file.
 
     Attributes:
         path: An optional string that is the file path.
         classes: An optional list of Class instances.
         functions: An optional list of Function instances.
     """
+
+    __slots__ = ("path", "classes", "functions")
+
     def __init__(self, path=None):
         self.path = path
         self.classes = []
@@ -97,6 +101,9 @@ class Component:
         start_line: A number with the line number of the beginning of the component.
         end_line: A number with the line number of the end of the component.
     """
+
+    __slots__ = ("name", "start_line", "end_line")
+
     def __init__(self, name, start_line, end_line):
         self.name = name
         self.start_line = start_line
@@ -118,6 +125,9 @@ class Class(Component):
         methods: A list of Methods instances.
         classes: A list of Classes instances.
     """
+
+    __slots__ = ("methods", "classes")
+
     def __init__(self, name, start_line, end_line):
         super().__init__(name, start_line, end_line)
         self.methods = []
@@ -196,6 +206,8 @@ class Method(Component):
     a subclass of Component.
     """
 
+    __slots__ = ()
+
 
 class Function(Component):
     """A Function component representation.
@@ -203,4 +215,6 @@ class Function(Component):
     It isn't a member of a class but a top level function of a file.
     It is a subclass of Component.
 
-    """
\ No newline at end of file
+    """
+
+    __slots__ = ()
\ No newline at end of file
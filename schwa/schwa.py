@@ -22,10 +22,9 @@
 
 import os
 import yaml
-from decimal import Decimal
 
 from schwa.extraction import GitExtractor
-from schwa.analysis import SchwaAnalysis, Metrics
+from schwa.analysis import SchwaAnalysis, AnalysisContext
 from schwa.learning import FeatureWeightLearner
 
 
@@ -46,7 +45,9 @@ class Schwa:
         """ Inits Schwa with the repository local path. """
         self.repo_path = repo_path
 
-    def analyze(self,  ignore_regex="^$", max_commits=None, method_granularity=True, parallel=True):
+    def analyze(self,  ignore_regex="^$", max_commits=None, method_granularity=True, parallel=True,
+                diff_engine=None, threads=False, start_method=None, numeric_backend=None, lean=False,
+                analysis_processes=1, store=None):
         """ Analyze commits.
 
         Extracts commits and call an analyzer to output analytics.
@@ -55,25 +56,54 @@ class Schwa:
             ignore_regex: An optional string that is a regex pattern to ignore unnecessary files.
             max_commits: An optional int that is the maximum number of commits to extract since the last one.
             method_granularity: An optional boolean that enables extraction until the method granularity.
+            diff_engine: An optional string with the name of the diff engine, e.g. "myers" or "ndiff".
+            threads: An optional boolean that enables parallel extraction with threads instead of processes.
+            start_method: An optional string with the multiprocessing start method, e.g. "spawn".
+            numeric_backend: An optional string with the name of the numeric backend, e.g. "float" or "decimal".
+            lean: An optional boolean that enables lean analytics, that use less memory.
+            analysis_processes: An optional int with the number of processes of the analysis, partitioned by
+                file, or None for all the CPUs.
+            store: An optional string with the path of a SQLite database where the analytics are stored,
+                instead of memory.
 
         Returns:
             A RepositoryAnalytics instance.
+
+        Raises:
+            SchwaConfigurationException: Many analysis processes are used with a store, checked before extracting.
         """
+        if store and analysis_processes != 1:
+            raise SchwaConfigurationException("The analysis to a store runs in a single process!")
+        context = AnalysisContext(numeric_backend)
         configs = self.get_yaml_configs()
-        max_commits = self.configure_yaml(configs, max_commits)
+        max_commits = self.configure_yaml(configs, max_commits, context)
         extractor = GitExtractor(self.repo_path)
-        repo = extractor.extract(ignore_regex, max_commits, method_granularity, parallel)
-        analysis = SchwaAnalysis(repo)
-        analytics = analysis.analyze()
+        repo = extractor.extract(ignore_regex, max_commits, method_granularity, parallel, diff_engine, threads,
+                                 start_method)
+        analysis = SchwaAnalysis(repo, lean, context, store)
+        analytics = analysis.analyze(analysis_processes, start_method)
         return analytics
 
-    def configure_yaml(self, configs, max_commits):
+    def configure_yaml(self, configs, max_commits, context):
+        """ Configures the analysis context with the .schwa.yml configs.
+
+        Args:
+            configs: A dict with the configs.
+            max_commits: An int with the maximum number of commits or None.
+            context: The AnalysisContext to configure.
+
+        Returns:
+            An int with the maximum number of commits, from the configs if it wasn't given.
+
+        Raises:
+            SchwaConfigurationException: The features weights sum isn't 1.
+        """
         if not max_commits:
             max_commits = configs.get("commits", max_commits)
 
         time_range = configs.get("time_range")
         if time_range:
-            Metrics.TIME_RANGE = Decimal(time_range)
+            context.time_range = context.number(time_range)
 
         revisions_config = configs.get("features_weights", {}).get("revisions", False)
         fixes_config = configs.get("features_weights", {}).get("fixes", False)
@@ -81,9 +111,9 @@ class Schwa:
 
         if revisions_config and fixes_config and authors_config:
             if round((revisions_config + fixes_config + authors_config), 5) == 1:
-                Metrics.REVISIONS_WEIGHT = Decimal(revisions_config)
-                Metrics.FIXES_WEIGHT = Decimal(fixes_config)
-                Metrics.AUTHORS_WEIGHT = Decimal(authors_config)
+                context.revisions_weight = context.number(revisions_config)
+                context.fixes_weight = context.number(fixes_config)
+                context.authors_weight = context.number(authors_config)
             else:
                 raise SchwaConfigurationException("Errors in .schwa.yml: features weights sum must be 1!")
         return max_commits
@@ -98,12 +128,14 @@ class Schwa:
         return configs
 
     def learn(self,  ignore_regex="^$", max_commits=None, method_granularity=False, parallel=True,
-              bits=None, generations=None):
+              bits=None, generations=None, diff_engine=None, threads=False, start_method=None, numeric_backend=None):
+        context = AnalysisContext(numeric_backend)
         configs = self.get_yaml_configs()
-        max_commits = self.configure_yaml(configs, max_commits)
+        max_commits = self.configure_yaml(configs, max_commits, context)
         extractor = GitExtractor(self.repo_path)
-        repo = extractor.extract(ignore_regex, max_commits, method_granularity, parallel)
-        solution = FeatureWeightLearner(repo, bits, generations).learn()
+        repo = extractor.extract(ignore_regex, max_commits, method_granularity, parallel, diff_engine, threads,
+                                 start_method)
+        solution = FeatureWeightLearner(repo, bits, generations, context).learn()
         return solution
 
 class SchwaConfigurationException(Exception):
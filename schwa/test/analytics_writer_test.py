@@ -0,0 +1,112 @@
+# Copyright (c) 2015 Faculty of Engineering of the University of Porto
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+""" Module with the Unit tests for the Analytics Writer. """
+
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+from schwa.analysis import SchwaAnalysis, FLAT_COLUMNS, open_output, write_json, write_flat
+from schwa.repository import *
+
+
+class TestAnalyticsWriter(unittest.TestCase):
+    def setUp(self):
+        current_ts = time.time()
+        diffs = [DiffFile(file_b="src/API.java", added=True),
+                 DiffClass(file_name="src/API.java", class_b="API", added=True),
+                 DiffMethod(file_name="src/API.java", class_name="API", method_b="login", added=True),
+                 DiffFile(file_b="scripts/deploy.py", added=True),
+                 DiffMethod(file_name="scripts/deploy.py", class_name="", method_b="main", added=True)]
+        commits = [Commit("7g37ghegewwuygwe8g", "First commit", "petergriffin@familyguy.com", current_ts - 100, diffs)]
+        diffs = [DiffFile(file_a="src/API.java", file_b="src/API.java", modified=True),
+                 DiffClass(file_name="src/API.java", class_a="API", class_b="API", modified=True),
+                 DiffMethod(file_name="src/API.java", class_name="API", method_a="login", method_b="login",
+                            modified=True)]
+        commits.append(Commit("j398ygfg98h3", "Fix login", "stewie@familyguy.com", current_ts - 50, diffs))
+        self.analytics = SchwaAnalysis(Repository(commits, current_ts - 100, current_ts - 50)).analyze()
+
+    def test_write_json(self):
+        stream = io.StringIO()
+        write_json(self.analytics, stream)
+        self.assertEqual(json.loads(stream.getvalue()), self.analytics.to_dict())
+        self.assertEqual(stream.getvalue(), json.dumps(self.analytics.to_dict()) + "\n")
+
+    def test_precision(self):
+        stream = io.StringIO()
+        write_json(self.analytics, stream, precision=3)
+        file_dict = json.loads(stream.getvalue())["children"][0]
+        self.assertEqual(file_dict["prob"], float("%.3g" % self.analytics.files_analytics["src/API.java"].defect_prob))
+        self.assertIsInstance(file_dict["children"][0]["children"][0]["size"], float)
+
+    def test_write_json_directories(self):
+        stream = io.StringIO()
+        write_json(self.analytics, stream, directories=True)
+        analytics_dict = json.loads(stream.getvalue())
+        self.assertEqual(analytics_dict, self.analytics.to_dict(directories=True))
+        self.assertEqual([(c["type"], c["path"], c["name"]) for c in analytics_dict["children"]],
+                         [("directory", "src/", "src"), ("directory", "scripts/", "scripts")])
+        self.assertEqual(analytics_dict["children"][0]["children"][0]["path"], "src/API.java")
+
+    def test_write_flat(self):
+        stream = io.StringIO()
+        write_flat(self.analytics, stream, "csv")
+        rows = list(csv.DictReader(io.StringIO(stream.getvalue())))
+        self.assertEqual([(r["path"], r["class"], r["method"], r["granularity"]) for r in rows],
+                         [("src/", "", "", "directory"), ("scripts/", "", "", "directory"),
+                          ("src/API.java", "", "", "file"), ("src/API.java", "API", "", "class"),
+                          ("src/API.java", "API", "login", "method"), ("scripts/deploy.py", "", "", "file"),
+                          ("scripts/deploy.py", "", "main", "function")])
+        login = self.analytics.files_analytics["src/API.java"].classes_analytics["API"].methods_analytics["login"]
+        self.assertEqual((rows[4]["revisions"], rows[4]["fixes"], rows[4]["authors"]), ("2", "1", "2"))
+        self.assertEqual(float(rows[4]["defect_prob"]), login.defect_prob)
+
+        stream = io.StringIO()
+        write_flat(self.analytics, stream, "tsv", granularity="method")
+        self.assertEqual(stream.getvalue().splitlines()[0].split("\t"), list(FLAT_COLUMNS))
+        self.assertEqual(len(stream.getvalue().splitlines()), 2)
+
+        stream = io.StringIO()
+        write_flat(self.analytics, stream, "ndjson", precision=3, path_prefix="scripts/")
+        rows = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([row["granularity"] for row in rows], ["directory", "file", "function"])
+        self.assertEqual(rows[2]["defect_prob"], float("%.3g" % self.analytics.files_analytics[
+            "scripts/deploy.py"].functions_analytics["main"].defect_prob))
+
+        with self.assertRaises(ValueError):
+            write_flat(self.analytics, stream, "xml")
+
+    def test_gzip_output(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "analytics.json.gz")
+            with open_output(path, compress=True) as stream:
+                write_json(self.analytics, stream)
+            with gzip.open(path, "rt") as stream:
+                self.assertEqual(json.load(stream), self.analytics.to_dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
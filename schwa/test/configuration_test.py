@@ -23,18 +23,13 @@
 import unittest
 
 from schwa import Schwa, SchwaConfigurationException
-from schwa.analysis import Metrics
+from schwa.analysis import AnalysisContext
 
 class TestFeatureWeightLearner(unittest.TestCase):
     def setUp(self):
-        self.r_w = Metrics.REVISIONS_WEIGHT
-        self.f_w = Metrics.FIXES_WEIGHT
-        self.a_w = Metrics.AUTHORS_WEIGHT
-
-    def reset_weights(self):
-        Metrics.REVISIONS_WEIGHT = self.r_w
-        Metrics.FIXES_WEIGHT = self.f_w
-        Metrics.AUTHORS_WEIGHT = self.a_w
+        self.r_w = AnalysisContext.REVISIONS_WEIGHT
+        self.f_w = AnalysisContext.FIXES_WEIGHT
+        self.a_w = AnalysisContext.AUTHORS_WEIGHT
 
     def test_valid_configuration(self):
         s = Schwa(".")
@@ -47,22 +42,23 @@ class TestFeatureWeightLearner(unittest.TestCase):
             }
         }
         max_commits = None
-        max_commits = s.configure_yaml(configs, max_commits)
+        context = AnalysisContext()
+        max_commits = s.configure_yaml(configs, max_commits, context)
         self.assertEqual(max_commits, 100)
-        self.assertEqual(Metrics.REVISIONS_WEIGHT, 0.2)
-        self.assertEqual(Metrics.FIXES_WEIGHT, 0.3)
-        self.assertEqual(Metrics.AUTHORS_WEIGHT, 0.5)
+        self.assertEqual(context.revisions_weight, 0.2)
+        self.assertEqual(context.fixes_weight, 0.3)
+        self.assertEqual(context.authors_weight, 0.5)
 
         max_commits = 2
-        max_commits = s.configure_yaml(configs, max_commits)
+        max_commits = s.configure_yaml(configs, max_commits, context)
         self.assertEqual(max_commits, 2)
 
         del configs["features_weights"]
-        self.reset_weights()
-        s.configure_yaml(configs, max_commits)
-        self.assertEqual(Metrics.REVISIONS_WEIGHT, self.r_w)
-        self.assertEqual(Metrics.FIXES_WEIGHT, self.f_w)
-        self.assertEqual(Metrics.AUTHORS_WEIGHT, self.a_w)
+        context = AnalysisContext()
+        s.configure_yaml(configs, max_commits, context)
+        self.assertEqual(context.revisions_weight, self.r_w)
+        self.assertEqual(context.fixes_weight, self.f_w)
+        self.assertEqual(context.authors_weight, self.a_w)
 
     def test_wrong_weights(self):
         s = Schwa(".")
@@ -74,12 +70,12 @@ class TestFeatureWeightLearner(unittest.TestCase):
                 "authors": 0.5
             }
         }
-        self.reset_weights()
         max_commits = None
 
         with self.assertRaises(SchwaConfigurationException):
-            max_commits = s.configure_yaml(configs, max_commits)
-
-    def tearDown(self):
-        self.reset_weights()
+            max_commits = s.configure_yaml(configs, max_commits, AnalysisContext())
 
+    def test_store_processes(self):
+        s = Schwa("/nonexistent")
+        with self.assertRaises(SchwaConfigurationException):
+            s.analyze(analysis_processes=2, store="analytics.db")
@@ -0,0 +1,92 @@
+# Copyright (c) 2015 Faculty of Engineering of the University of Porto
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+""" Module with the Unit tests for the Diff Engines. """
+
+import unittest
+from schwa.parsing import MyersEngine, NdiffEngine, get_diff_engine
+
+
+class TestDiffEngine(unittest.TestCase):
+    def setUp(self):
+        self.accessors = "\n".join("    public int get%i() {\n        return x;\n    }\n" % i for i in range(30))
+
+    def apply_opcodes(self, lines_a, lines_b, opcodes):
+        """ Rebuilds version B from version A and checks the ranges of the opcodes. """
+        lines = []
+        i = j = 0
+        for tag, i1, i2, j1, j2 in opcodes:
+            self.assertEqual((i, j), (i1, j1))
+            if tag == "equal":
+                self.assertEqual(lines_a[i1:i2], lines_b[j1:j2])
+            lines.extend(lines_b[j1:j2])
+            i, j = i2, j2
+        self.assertEqual((i, j), (len(lines_a), len(lines_b)))
+        return lines
+
+    def test_opcodes(self):
+        lines_a = ["a", "b", "c", "a", "b", "b", "a"]
+        lines_b = ["c", "b", "a", "b", "a", "c"]
+        for engine in (MyersEngine, NdiffEngine):
+            opcodes = engine.get_opcodes(lines_a, lines_b)
+            self.assertEqual(self.apply_opcodes(lines_a, lines_b, opcodes), lines_b)
+
+        # Shortest edit script has 5 operations
+        opcodes = MyersEngine.get_opcodes(lines_a, lines_b)
+        equal = sum(i2 - i1 for tag, i1, i2, j1, j2 in opcodes if tag == "equal")
+        self.assertEqual(equal, 4)
+
+    def test_empty_sources(self):
+        self.assertEqual(MyersEngine.get_opcodes([], []), [])
+        self.assertEqual(MyersEngine.get_opcodes([], ["a"]), [("insert", 0, 0, 0, 1)])
+        self.assertEqual(MyersEngine.get_opcodes(["a"], []), [("delete", 0, 1, 0, 0)])
+
+    def test_changed_sequences(self):
+        source_a = "class A {\n" + self.accessors + "}"
+        source_b = "class A {\n" + self.accessors.replace("get7", "fetch7").replace("get20()", "get20(int y)") \
+            + "    public int size() {\n        return 0;\n    }\n}"
+        expected = [["-", 30, 30], ["+", 30, 30], ["-", 82, 82], ["+", 82, 82], ["+", 120, 122]]
+        self.assertEqual(MyersEngine.changed_sequences(source_a, source_b), expected)
+        # Ndiff aligns the trailing blank line differently
+        changed_sequences = NdiffEngine.changed_sequences(source_a, source_b)
+        self.assertEqual(changed_sequences[:4], expected[:4])
+        self.assertEqual(changed_sequences[4], ["+", 121, 123])
+
+    def test_cost_heuristic(self):
+        lines_a = self.accessors.split("\n")
+        lines_b = list(reversed(lines_a))
+        min_cost = MyersEngine.MIN_COST
+        MyersEngine.MIN_COST = 1
+        try:
+            opcodes = MyersEngine.get_opcodes(lines_a, lines_b)
+        finally:
+            MyersEngine.MIN_COST = min_cost
+        self.assertEqual(self.apply_opcodes(lines_a, lines_b, opcodes), lines_b)
+
+    def test_get_diff_engine(self):
+        self.assertEqual(get_diff_engine(), MyersEngine)
+        self.assertEqual(get_diff_engine("ndiff"), NdiffEngine)
+        with self.assertRaises(ValueError):
+            get_diff_engine("patience")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -23,6 +23,8 @@
 import unittest
 import time
 import datetime
+from unittest import mock
+from schwa.analysis import AnalysisContext, NUMERIC_BACKENDS
 from schwa.learning import FeatureWeightLearner
 from schwa.repository import Repository, DiffMethod, DiffFile, DiffClass, Commit
 
@@ -70,3 +72,37 @@ class TestFeatureWeightLearner(unittest.TestCase):
         """
         solution = FeatureWeightLearner(self.repository, generations=70).learn()
         self.assertGreater(solution["revisions"], solution["fixes"])
+
+    def test_fitness_cache(self):
+        learner = FeatureWeightLearner(self.repository, generations=5)
+        individual = [0, 1, 0, 1, 0, 0, 0, 1, 0]
+        fitness, = learner.fitness_wrapper(individual)
+        self.assertEqual(fitness, learner.fitness(*learner.decode_individual(individual)))
+        self.assertEqual(learner.fitness_wrapper(list(individual)), (fitness,))
+        self.assertEqual((learner.cache_hits, learner.cache_misses), (1, 1))
+
+        solution = learner.learn()
+        self.assertGreater(solution["cache_hit_rate"], 0)
+        self.assertLessEqual(learner.cache_misses, 2 ** (FeatureWeightLearner.FEATURES * learner.bits))
+        self.assertEqual(len(learner.fitness_cache), learner.cache_misses + 1)
+
+    def test_fitnesses(self):
+        """ The expected fitnesses were computed by replaying the history for each individual. """
+        individuals = ([0, 1, 0, 1, 0, 0, 0, 0, 1], [0, 1, 1, 0, 1, 1, 0, 0, 1], [0, 0, 1, 1, 0, 0, 0, 1, 1])
+        expected = [1.0627719245345106, 1.1860735661087132, float("-Infinity")]
+        for numeric_backend in NUMERIC_BACKENDS:
+            learner = FeatureWeightLearner(self.repository, context=AnalysisContext(numeric_backend))
+            weights = [tuple(learner.decode_individual(individual)) for individual in individuals]
+            fitnesses = learner.fitnesses(weights)
+            self.assertEqual(len(learner.fixes), 2)
+            self.assertEqual(fitnesses[2], float("-Infinity"), "Weights must sum 1 and be non zero")
+            for fitness, expected_fitness in zip(fitnesses[:2], expected):
+                self.assertAlmostEqual(float(fitness), expected_fitness, places=12)
+
+            with mock.patch("schwa.learning.feature_weight_learner.numpy", None):
+                learner = FeatureWeightLearner(self.repository, context=AnalysisContext(numeric_backend))
+                backend_fitnesses = learner.fitnesses(weights)
+            self.assertIsNone(learner.arrays)
+            self.assertEqual(backend_fitnesses[2], float("-Infinity"))
+            for fitness, backend_fitness in zip(fitnesses[:2], backend_fitnesses):
+                self.assertAlmostEqual(fitness, backend_fitness, places=12)
@@ -21,6 +21,7 @@
 """ Module with the Unit tests for the Git Extractor. """
 
 import unittest
+import multiprocessing
 import tempfile
 import os
 import shutil
@@ -361,6 +362,59 @@ class TestGitExtractor(unittest.TestCase):
         self.assertTrue(DiffMethod(file_name="ShadowTest.java", class_name="ShadowTest",
                                    method_b="main", added=True) in diffs)
 
+    def commit_file(self, name, code, message):
+        file_path = os.path.join(self.temp_dir, name)
+        with open(file_path, "w") as f:
+            f.write(code)
+        self.repo.git.add(file_path)
+        self.repo.git.commit(m=message)
+
+    def testThreadedExtraction(self):
+        code = """public class Calculator {
+            public int add(int a, int b) {
+                return a + b;
+            }
+
+            public int sub(int a, int b) {
+                return a - b;
+            }
+        }"""
+        self.commit_file("Calculator.java", code, "First commit")
+        code = code.replace("return a + b;", "return b + a;")
+        self.commit_file("Calculator.java", code, "Second commit")
+        code = code.replace("return a - b;", "return -b + a;")
+        self.commit_file("Calculator.java", code, "Third commit")
+
+        extractor = GitExtractor(self.temp_dir)
+        repository = extractor.extract(method_granularity=True, parallel=False)
+        self.assertGreater(extractor.parse_cache.hits, 0, msg="It should parse each version once")
+        threaded_repository = GitExtractor(self.temp_dir).extract(method_granularity=True, threads=True)
+
+        self.assertEqual(len(threaded_repository.commits), 3)
+        for commit, threaded_commit in zip(repository.commits, threaded_repository.commits):
+            self.assertEqual(commit.message, threaded_commit.message)
+            self.assertCountEqual(commit.diffs, threaded_commit.diffs)
+        self.assertTrue(DiffMethod(file_name="Calculator.java", class_name="Calculator", method_a="sub",
+                                   method_b="sub", modified=True) in threaded_repository.commits[2].diffs)
+
+    def testStartMethods(self):
+        code = """public class Calculator {
+            public int add(int a, int b) {
+                return a + b;
+            }
+        }"""
+        self.commit_file("Calculator.java", code, "First commit")
+        self.commit_file("Calculator.java", code.replace("a + b", "b + a"), "Second commit")
+
+        expected = GitExtractor(self.temp_dir).extract(method_granularity=True, parallel=False)
+        for start_method in ("spawn", "forkserver"):
+            if start_method not in multiprocessing.get_all_start_methods():
+                continue  # pragma: no cover
+            repository = GitExtractor(self.temp_dir).extract(method_granularity=True, start_method=start_method)
+            self.assertEqual(len(repository.commits), 2)
+            for commit, expected_commit in zip(repository.commits, expected.commits):
+                self.assertCountEqual(commit.diffs, expected_commit.diffs)
+
     def tearDown(self):
         shutil.rmtree(self.temp_dir)
 
@@ -21,7 +21,8 @@
 """ Module with the Unit tests for the Java Parser. """
 
 import unittest
-from schwa.parsing import JavaParser
+import concurrent.futures
+from schwa.parsing import JavaParser, ParsingError
 from schwa.repository import *
 
 
@@ -230,6 +231,103 @@ class TestJavaParser(unittest.TestCase):
         self.assertTrue('login<2,5>' in methods_repr)
         self.assertTrue('login2<6,8>' in methods_repr)
 
+    def test_parse_in_threads(self):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            files = list(executor.map(JavaParser.parse, [self.code] * 8))
+        for _file in files:
+            self.assertEqual([repr(c) for c in _file.classes], ['API<8,53>', 'SOAPAPI<55,59>'])
+            self.assertTrue('register<37,47>' in [repr(m) for m in _file.classes[0].methods])
+
+    def test_labeled_statements(self):
+        code = """public class Search {
+            public boolean find(int[][] matrix, int value) {
+                outer:
+                for (int[] row : matrix) {
+                    for (int cell : row) {
+                        if (cell == value) break outer;
+                    }
+                }
+                return false;
+            }
+        }"""
+        components = JavaParser.parse(code).classes
+        self.assertEqual([repr(c) for c in components], ['Search<1,11>'])
+        self.assertEqual([repr(m) for m in components[0].methods], ['find<2,10>'])
+
+    def test_comments_and_literals(self):
+        code = """/**
+             * Javadoc with ** stars, a / slash and a {@code "string"}.
+             **/
+            class API {
+                // static void commented() {
+                String url = "http://neo.andrefreitas.pt/* not a comment */";
+                char quote = '\\'';
+
+                /* static void disabled() {
+                } */
+                static String escape(String text) {
+                    return text.replace("\\"", "\\\\\\"") + '/' + "//";
+                }
+            }"""
+        components = JavaParser.parse(code).classes
+        self.assertEqual(repr(components), "[API<4,14>]")
+        self.assertEqual(repr(components[0].methods), "[escape<11,13>]")
+
+    def test_parse_incremental(self):
+        def components_repr(components):
+            return [(repr(c), components_repr(c.methods), components_repr(c.classes)) if isinstance(c, Class)
+                    else repr(c) for c in components]
+
+        parsed_file_a = JavaParser.parse(self.code)
+        repr_a = components_repr(parsed_file_a.classes)
+        lines = self.code.split("\n")
+        edits = [
+            lines[:31] + ["int retries = 3;", "retries--;"] + lines[31:],  # Inside a method
+            lines[:36] + lines[47:],  # Removes a method
+            lines[:2] + ["import java.util.List;"] + lines[2:50] + ["}", "static void logout() {"] + lines[50:],
+            lines[:54] + ["class REST extends API {", "}"] + lines[54:],  # Outside classes
+        ]
+        for lines_b in edits:
+            code_b = "\n".join(lines_b)
+            parsed_file_b = JavaParser.parse_incremental(parsed_file_a, self.code, code_b)
+            self.assertEqual(components_repr(parsed_file_b.classes),
+                             components_repr(JavaParser.parse(code_b).classes))
+        self.assertEqual(components_repr(parsed_file_a.classes), repr_a, msg="It should not mutate version A")
+
+        with self.assertRaises(ParsingError):
+            JavaParser.parse_incremental(parsed_file_a, self.code, "\n".join(lines[:31] + ["}}}"] + lines[31:]))
+
+    def test_parse_incremental_fallback(self):
+        def assert_same_parse(code_a, code_b):
+            parsed_file_b = JavaParser.parse_incremental(JavaParser.parse(code_a), code_a, code_b)
+            self.assertEqual(repr(parsed_file_b.classes), repr(JavaParser.parse(code_b).classes))
+            self.assertEqual([repr(c.classes) + repr(c.methods) for c in parsed_file_b.classes],
+                             [repr(c.classes) + repr(c.methods) for c in JavaParser.parse(code_b).classes])
+
+        # The method region starts inside a block comment
+        code = """class API {
+            /* note
+            end */ void foo() {
+                int x = 1;
+            }
+            void bar() {
+            }
+        }"""
+        assert_same_parse(code, code.replace("x = 1", "x = 2"))
+
+        # The method region closes its classes, which only the rest of the file makes valid
+        code = """class API {
+            class Auth {
+                void foo() {
+                    login();
+                }
+                void bar() {
+                }
+            }
+        }"""
+        assert_same_parse(code, code.replace("login();", "}\n}\n}\nclass REST {\nclass Auth {\nvoid baz() {"))
+        assert_same_parse(code, code.replace("login();", "}\n}\nclass Session {\nvoid baz() {"))
+
     def test_diff_case_a(self):
         code_b = """
             package org.feup.meoarenacustomer.app;
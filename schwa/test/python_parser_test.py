@@ -0,0 +1,114 @@
+# Copyright (c) 2015 Faculty of Engineering of the University of Porto
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+""" Module with the Unit tests for the Python Parser. """
+
+import unittest
+from schwa.parsing import PythonParser, JavaParser, ParsingError, get_file_parser
+from schwa.extraction.abstract_extractor import can_parse_file
+from schwa.repository import *
+
+
+class TestPythonParser(unittest.TestCase):
+    def setUp(self):
+        self.code = """import os
+
+
+class API:
+    url = "http://neo.andrefreitas.pt:8081/api"
+
+    def get_url(self):
+        return self.url
+
+    @staticmethod
+    @deprecated
+    def login(email, password):
+        return email, password
+
+    class Core:
+        async def run(self):
+            pass
+
+
+def main():
+    def helper():
+        pass
+    return helper
+"""
+
+    def test_parse(self):
+        parsed_file = PythonParser.parse(self.code)
+        self.assertEqual(repr(parsed_file.classes), "[API<4,17>]")
+        self.assertEqual(repr(parsed_file.classes[0].methods), "[get_url<7,8>, login<10,13>]")
+        self.assertEqual(repr(parsed_file.classes[0].classes), "[Core<15,17>]")
+        self.assertEqual(repr(parsed_file.classes[0].classes[0].methods), "[run<16,17>]")
+        self.assertEqual(repr(parsed_file.functions), "[main<20,23>]")
+        self.assertEqual(parsed_file.get_classes_set(), {"API", "API.Core"})
+        self.assertEqual(parsed_file.get_functions_set(), {("API", "get_url"), ("API", "login"),
+                                                           ("API.Core", "run"), ("", "main")})
+
+    def test_parse_invalid_code(self):
+        with self.assertRaises(ParsingError):
+            PythonParser.parse("def main(:\n    pass")
+
+    def test_diff(self):
+        code_b = """import os
+
+
+class API:
+    url = "http://neo.andrefreitas.pt:8081/api"
+
+    def get_url(self):
+        return self.url
+
+    class Core:
+        async def run(self):
+            return True
+
+
+def main():
+    def helper():
+        pass
+    return helper
+
+
+def recover(name):
+    return name
+"""
+        diffs = PythonParser.diff(("api.py", self.code), ("api.py", code_b))
+        self.assertEqual(len(diffs), 5)
+        self.assertTrue(DiffMethod(file_name="api.py", class_name="API", method_a="login", removed=True) in diffs)
+        self.assertTrue(DiffMethod(file_name="api.py", class_name="API.Core", method_a="run", method_b="run",
+                                   modified=True) in diffs)
+        self.assertTrue(DiffMethod(file_name="api.py", class_name="", method_b="recover", added=True) in diffs)
+        self.assertTrue(DiffClass(file_name="api.py", class_a="API", class_b="API", modified=True) in diffs)
+        self.assertTrue(DiffClass(file_name="api.py", class_a="API.Core", class_b="API.Core", modified=True)
+                        in diffs)
+
+    def test_file_parsers(self):
+        self.assertIs(get_file_parser("src/API.java"), JavaParser)
+        self.assertIs(get_file_parser("schwa/api.py"), PythonParser)
+        self.assertIsNone(get_file_parser("javadoc/api.js"))
+        self.assertTrue(can_parse_file("javadoc/api.py"))
+        self.assertFalse(can_parse_file("README.md"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -21,11 +21,20 @@
 """ Module with the Unit tests for the Schwa Analysis. """
 
 import unittest
+import os
+import tempfile
 import time
 import datetime
-from schwa.analysis import SchwaAnalysis
+from schwa.analysis import SchwaAnalysis, TimeTravelAnalysis, TimeRangeSweep, Metrics, AnalysisContext, GRANULARITIES, \
+    SQLiteRepositoryAnalytics, ComponentRegistry, ComponentTree, RepositoryAnalytics, MethodAnalytics, \
+    FunctionAnalytics, FileAnalytics, NUMERIC_BACKENDS
 from schwa.repository import *
 
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
 
 class TestSchwaAnalysis(unittest.TestCase):
     def setUp(self):
@@ -197,4 +206,366 @@ class TestSchwaAnalysis(unittest.TestCase):
         self.assertTrue("recover" not in analytics.files_analytics["GUI.java"].classes_analytics["GUI"].methods_analytics,
                         msg="It should recognize removed methods")
 
+    def test_commits_twr(self):
+        commits_twr = self.analysis.commits_twr()
+        self.assertEqual(len(commits_twr), len(self.repository.commits))
+        for commit, twr in zip(self.repository.commits, commits_twr):
+            self.assertEqual(twr, self.analysis.context.twr(self.repository.begin_ts, commit.timestamp,
+                                                            self.repository.last_ts))
+
+    def test_last_twr(self):
+        for numeric_backend in NUMERIC_BACKENDS:
+            metrics = Metrics(AnalysisContext(numeric_backend))
+            other_metrics = Metrics(metrics.context)
+            begin_ts, current_ts = 1000, 2000
+            expected = None
+            for ts, author, is_bug_fixing in [(1100, "a", False), (1300, "b", True), (1500, "a", False),
+                                              (1800, "c", True), (1900, "a", False)]:
+                if is_bug_fixing:
+                    last_ts = metrics.revisions_timestamps[-1]
+                    context = metrics.context
+                    expected = (context.list_twr(list(metrics.revisions_timestamps), begin_ts, last_ts),
+                                context.list_twr(list(metrics.fixes_timestamps), begin_ts, last_ts),
+                                context.list_twr(list(metrics.authors_timestamps), begin_ts, last_ts))
+                metrics.update(begin_ts, ts, current_ts, author, is_bug_fixing)
+                other_metrics.update(begin_ts, ts, current_ts, author, is_bug_fixing)
+            self.assertIsInstance(metrics.last_twr, tuple)
+            for twr, expected_twr in zip(metrics.last_twr, expected):
+                self.assertAlmostEqual(twr, expected_twr, places=12)
+            self.assertEqual(len(metrics.revisions_timestamps), 5, msg="Snapshots shouldn't change the history")
+            self.assertEqual(len(metrics.context.fixes_dataset), 2, msg="Equal snapshots should be stored once")
+
+    def test_lean_analysis(self):
+        analytics = self.analysis.analyze()
+        lean_analytics = SchwaAnalysis(self.repository, lean=True).analyze()
+        for path, file_analytics in analytics.files_analytics.items():
+            lean_file_analytics = lean_analytics.files_analytics[path]
+            self.assertEqual(file_analytics.defect_prob, lean_file_analytics.defect_prob)
+            self.assertEqual(file_analytics.revisions, lean_file_analytics.revisions)
+            self.assertIsNone(lean_file_analytics.revisions_timestamps)
+            self.assertIsNone(lean_file_analytics.last_twr)
+            for name, class_analytics in file_analytics.classes_analytics.items():
+                self.assertEqual(class_analytics.defect_prob,
+                                 lean_file_analytics.classes_analytics[name].defect_prob)
+
+    def test_numeric_backends(self):
+        analytics = self.analysis.analyze()
+        decimal_analytics = SchwaAnalysis(self.repository, context=AnalysisContext("decimal")).analyze()
+        self.assertIsInstance(analytics.files_analytics["API.java"].defect_prob, float)
+        for path, file_analytics in analytics.files_analytics.items():
+            decimal_file_analytics = decimal_analytics.files_analytics[path]
+            self.assertAlmostEqual(file_analytics.defect_prob, float(decimal_file_analytics.defect_prob), places=12)
+            for name, class_analytics in file_analytics.classes_analytics.items():
+                self.assertAlmostEqual(class_analytics.defect_prob,
+                                       float(decimal_file_analytics.classes_analytics[name].defect_prob), places=12)
+
+    def test_analysis_contexts(self):
+        context = AnalysisContext(revisions_weight=1, fixes_weight=0, authors_weight=0)
+        analytics = self.analysis.analyze()
+        other_analytics = SchwaAnalysis(self.repository, context=context).analyze()
+        self.assertTrue(self.analysis.context.fixes_dataset)
+        self.assertEqual(len(self.analysis.context.fixes_dataset), len(context.fixes_dataset),
+                         msg="Contexts shouldn't share the fixes dataset")
+        self.assertIsNot(self.analysis.context.fixes_dataset, context.fixes_dataset)
+        self.assertEqual(self.analysis.context.fixes_dataset, context.fixes_dataset,
+                         msg="The TWR snapshots don't depend on the weights")
+        self.assertNotEqual(analytics.files_analytics["API.java"].defect_prob,
+                            other_analytics.files_analytics["API.java"].defect_prob)
+        self.assertIs(other_analytics.files_analytics["API.java"].context, context)
+
+    def test_partition(self):
+        shards = SchwaAnalysis.partition(self.repository, 3)
+        self.assertEqual(len(shards), 3)
+        files_by_shard = {}
+        for index, shard in enumerate(shards):
+            self.assertEqual((shard.begin_ts, shard.last_ts), (self.repository.begin_ts, self.repository.last_ts))
+            for commit in shard.commits:
+                for diff in commit.diffs:
+                    files_by_shard.setdefault(SchwaAnalysis.diff_path(diff), set()).add(index)
+        self.assertTrue(all(len(indexes) == 1 for indexes in files_by_shard.values()),
+                        msg="A file shouldn't span many partitions")
+        self.assertEqual(files_by_shard["CLI.java"], files_by_shard["LinuxCLI.java"],
+                         msg="Renamed files should be in the same partition")
+        diffs = sum(len(commit.diffs) for commit in self.repository.commits)
+        self.assertEqual(sum(len(commit.diffs) for shard in shards for commit in shard.commits), diffs)
+
+    def test_parallel_analysis(self):
+        analytics = self.analysis.analyze()
+        context = AnalysisContext()
+        parallel_analytics = SchwaAnalysis(self.repository, context=context).analyze(processes=2)
+        self.assertEqual(parallel_analytics.defect_prob, analytics.defect_prob)
+        self.assertEqual(parallel_analytics.to_dict(), analytics.to_dict())
+        self.assertEqual(len(context.fixes_dataset), len(self.analysis.context.fixes_dataset))
+        self.assertIs(parallel_analytics.files_analytics["API.java"].context, context)
+
+        # B.java has the biggest partition, so it is merged first, but it is the second file
+        current_ts = time.time()
+        diffs = [DiffFile(file_b="A.java", added=True), DiffFile(file_b="B.java", added=True),
+                 DiffFile(file_b="C.java", added=True)]
+        commits = [Commit("1", "First commit", "petergriffin@familyguy.com", current_ts - 100, diffs)]
+        diffs = [DiffFile(file_a="B.java", file_b="B.java", modified=True),
+                 DiffClass("B.java", class_b="B", added=True), DiffMethod("B.java", "B", method_b="run", added=True)]
+        commits.append(Commit("2", "Fix run", "stewiegriffin@familyguy.com", current_ts - 50, diffs))
+        repository = Repository(commits, current_ts - 100, current_ts - 50)
+        parallel_analytics = SchwaAnalysis(repository).analyze(processes=2)
+        self.assertEqual(list(parallel_analytics.files_analytics), ["A.java", "B.java", "C.java"])
+        self.assertEqual(parallel_analytics.to_dict(), SchwaAnalysis(repository).analyze().to_dict())
+
+    def test_time_travel(self):
+        analysis = TimeTravelAnalysis(self.repository, checkpoint_interval=2)
+        analytics = analysis.analyze()
+        self.assertEqual(analytics.to_dict(), self.analysis.analyze().to_dict())
+        commits_ids = [commit._id for commit in self.repository.commits]
+        history = analysis.history(list(reversed(commits_ids)))
+        for index, past_analytics in enumerate(reversed(history)):
+            commits = self.repository.commits[:index + 1]
+            repository = Repository(commits, self.repository.begin_ts, commits[-1].timestamp)
+            self.assertEqual(past_analytics.to_dict(), SchwaAnalysis(repository).analyze().to_dict())
+        self.assertEqual(analysis.analytics_at(commits_ids[-1]).to_dict(), history[0].to_dict())
+        self.assertEqual(len(analysis.context.fixes_dataset), len(self.analysis.context.fixes_dataset),
+                         msg="Replays shouldn't change the dataset of the analysis")
+        with self.assertRaises(KeyError):
+            analysis.analytics_at("unknown")
+
+    def test_copy(self):
+        analytics = self.analysis.analyze()
+        copy = analytics.copy()
+        self.assertEqual(copy.to_dict(), analytics.to_dict())
+        file_analytics = copy.files_analytics["API.java"]
+        self.assertIsNot(file_analytics, analytics.files_analytics["API.java"])
+        self.assertIsNot(file_analytics.revisions_timestamps,
+                         analytics.files_analytics["API.java"].revisions_timestamps)
+        self.assertIs(file_analytics.context, analytics.context)
+
+    def test_top(self):
+        analytics = self.analysis.analyze()
+        methods = [(component, metrics) for component, metrics in analytics.components("method")]
+        expected = sorted(methods, key=lambda c: c[1].defect_prob, reverse=True)[:3]
+        self.assertEqual([m.defect_prob for _, m in analytics.top(3)], [m.defect_prob for _, m in expected])
+        self.assertTrue(all(len(component) == 3 for component, _ in methods))
+        files = analytics.top(10, "file", path_prefix="API")
+        self.assertEqual([component for component, _ in files], [("API.java",)])
+        self.assertIs(files[0][1], analytics.files_analytics["API.java"])
+        min_revisions = max(metrics.revisions for _, metrics in methods)
+        self.assertTrue(all(m.revisions == min_revisions for _, m in analytics.top(10, min_revisions=min_revisions)))
+        components = list(analytics.components())
+        self.assertEqual(len(components), sum(len(list(analytics.components(g))) for g in GRANULARITIES))
+        with self.assertRaises(ValueError):
+            analytics.top(3, "package")
+
+    def test_rescore(self):
+        analytics = self.analysis.analyze()
+        weights = {"revisions": 0.6, "fixes": 0.3, "authors": 0.1}
+        expected = SchwaAnalysis(self.repository, context=AnalysisContext(
+            revisions_weight=0.6, fixes_weight=0.3, authors_weight=0.1)).analyze()
+        original = analytics.to_dict()
+        view = analytics.rescore(weights)
+        self.assertEqual(len(view), len(list(analytics.components())) + 1)
+        self.assertEqual(analytics.to_dict(), original, msg="Rescoring shouldn't change the analytics")
+        for component, metrics in expected.components():
+            self.assertAlmostEqual(view[component], metrics.defect_prob, places=12)
+        self.assertAlmostEqual(view[()], expected.defect_prob, places=12)
+        self.assertEqual(view.top(1)[0][1], max(probability for _, probability in view.items()))
+        self.assertEqual(len(analytics.rescore(weights, "file")), len(analytics.files_analytics))
+        view.apply()
+        self.assertAlmostEqual(analytics.files_analytics["API.java"].defect_prob,
+                               expected.files_analytics["API.java"].defect_prob, places=12)
+        with self.assertRaises(ValueError):
+            analytics.rescore({"revisions": 1})
+
+    def test_rescore_decimal(self):
+        analytics = SchwaAnalysis(self.repository, context=AnalysisContext("decimal")).analyze()
+        view = analytics.rescore({"revisions": 0.25, "fixes": 0.5, "authors": 0.25})
+        self.assertEqual(view.to_dict(), analytics.to_dict())
+
+    @unittest.skipUnless(numpy, "The time range sweep needs numpy")
+    def test_time_range_sweep(self):
+        analytics = self.analysis.analyze()
+        sweep = TimeRangeSweep(analytics, "method")
+        time_ranges = [0.2, 0.4, 0.9]
+        weights_sets = [(0.25, 0.5, 0.25), (0.6, 0.3, 0.1)]
+        probabilities = sweep.probabilities(time_ranges, weights_sets)
+        self.assertEqual(probabilities.shape, (3, 2, len(sweep.components)))
+        for t, time_range in enumerate(time_ranges):
+            for w, (r_weight, f_weight, a_weight) in enumerate(weights_sets):
+                context = AnalysisContext(revisions_weight=r_weight, fixes_weight=f_weight, authors_weight=a_weight,
+                                          time_range=time_range)
+                expected = SchwaAnalysis(self.repository, context=context).analyze()
+                for component, probability in zip(sweep.components, probabilities[t, w]):
+                    self.assertAlmostEqual(probability, expected.rescore(
+                        {"revisions": r_weight, "fixes": f_weight, "authors": a_weight})[component], places=10)
+        report = sweep.report(time_ranges, k=3)
+        self.assertEqual(len(report), 3)
+        self.assertAlmostEqual(report[1]["spearman"], 1.0)
+        self.assertEqual(report[1]["top_overlap"], 1.0)
+        with self.assertRaises(ValueError):
+            TimeRangeSweep(SchwaAnalysis(self.repository, lean=True).analyze())
+
+    def test_sqlite_store(self):
+        analytics = self.analysis.analyze()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "analytics.db")
+            stored_analytics = SchwaAnalysis(self.repository, store=path).analyze()
+            self.assertEqual(stored_analytics.to_dict(), analytics.to_dict())
+            self.assertEqual([c for c, _ in stored_analytics.top(3)], [c for c, _ in analytics.top(3)])
+            self.assertIn("API.java", stored_analytics.files_analytics)
+            self.assertNotIn("Unknown.java", stored_analytics.files_analytics)
+            stored_analytics.close()
+
+            # Writes back every commit, like a history that doesn't fit in memory
+            context = AnalysisContext("decimal")
+            analysis = SchwaAnalysis(self.repository, context=context)
+            stored_analytics = SQLiteRepositoryAnalytics(path, context, cache_size=0, batch_size=1)
+            for commit in self.repository.commits:
+                analysis.update_analytics(stored_analytics, commit)
+            analysis.analyze_components(stored_analytics)
+            stored_analytics.compute_defect_probability()
+            decimal_analytics = SchwaAnalysis(self.repository, context=AnalysisContext("decimal")).analyze()
+            self.assertEqual(stored_analytics.to_dict(), decimal_analytics.to_dict())
+            stored_analytics.close()
+
+            opened_analytics = SQLiteRepositoryAnalytics.open(path, AnalysisContext("decimal"))
+            self.assertEqual(opened_analytics.to_dict(), decimal_analytics.to_dict())
+            self.assertEqual(len(list(opened_analytics.components())), len(list(decimal_analytics.components())))
+            opened_analytics.store.connection.close()
+
+            with self.assertRaises(ValueError):
+                SchwaAnalysis(self.repository, store=path).analyze(processes=2)
+
+            # Like a dict, a replaced name keeps its position
+            stored_analytics = SchwaAnalysis(self.repository, store=path).analyze()
+            names = list(stored_analytics.files_analytics)
+            stored_analytics.files_analytics[names[0]] = FileAnalytics(stored_analytics.context)
+            self.assertEqual(list(stored_analytics.files_analytics), names)
+            self.assertEqual(stored_analytics.files_analytics[names[0]].revisions, 0)
+            with self.assertRaises(ValueError):
+                stored_analytics.copy()
+            with self.assertRaises(ValueError):
+                TimeTravelAnalysis(self.repository).rebase(stored_analytics, 0)
+            self.assertEqual(stored_analytics.revisions, analytics.revisions, msg="It shouldn't be rebased")
+            stored_analytics.close()
+
+    def test_component_registry(self):
+        registry = ComponentRegistry()
+        registry.resolve((), DiffFile(file_b="API.java", added=True))
+        registry.resolve(("API.java",), DiffClass("API.java", class_b="API", added=True))
+        method_analytics = registry.resolve(("API.java", "API"), DiffMethod("API.java", "API", method_b="login",
+                                                                           added=True))
+        self.assertIsInstance(method_analytics, MethodAnalytics)
+        self.assertIsInstance(registry.resolve(("API.java", ""), DiffMethod("API.java", "", method_b="main",
+                                                                            added=True)), FunctionAnalytics)
+        method_id = registry.ids[("API.java", "API", "login")]
+
+        # Adding a registered component replaces its analytics and children, keeping its id
+        file_analytics = registry.get(("API.java",))
+        registry.resolve((), DiffFile(file_b="API.java", added=True))
+        self.assertEqual(registry.ids[("API.java",)], 0)
+        self.assertEqual(registry.keys, [("API.java",), None, None, None])
+        self.assertIsNot(registry.analytics[0], file_analytics)
+        self.assertEqual(registry.analytics[1:], [None, None, None])
+        registry.resolve(("API.java",), DiffClass("API.java", class_b="API", added=True))
+        method_analytics = registry.resolve(("API.java", "API"), DiffMethod("API.java", "API", method_b="login",
+                                                                           added=True))
+        registry.resolve(("API.java", ""), DiffMethod("API.java", "", method_b="main", added=True))
+        method_id = registry.ids[("API.java", "API", "login")]
+
+        # Renames re-key the children and keep the ids
+        registry.resolve((), DiffFile(file_a="API.java", file_b="Api.java", renamed=True))
+        self.assertNotIn(("API.java", "API", "login"), registry)
+        self.assertEqual(registry.ids[("Api.java", "API", "login")], method_id)
+        self.assertEqual(registry.keys[method_id], ("Api.java", "API", "login"))
+        self.assertIs(registry.get(("Api.java", "API", "login")), method_analytics)
+        self.assertIn(("Api.java", "", "main"), registry)
+
+        registry.resolve((), DiffFile(file_a="Api.java", removed=True))
+        self.assertEqual(len(registry), 0)
+        self.assertIsNone(registry.analytics[method_id])
+
+    def test_registry_analysis(self):
+        current_ts = time.time()
+        diffs = [DiffFile(file_b="A.java", added=True), DiffFile(file_b="B.java", added=True),
+                 DiffClass("A.java", class_b="A", added=True), DiffClass("B.java", class_b="B", added=True),
+                 DiffMethod("B.java", "B", method_b="run", added=True)]
+        commits = [Commit("1", "First commit", "petergriffin@familyguy.com", current_ts - 100, diffs)]
+        # B.java is renamed to A.java, taking its position, and a method of a removed class is ignored
+        diffs = [DiffFile(file_a="B.java", file_b="A.java", renamed=True),
+                 DiffClass("A.java", class_a="B", class_b="C", renamed=True),
+                 DiffMethod("A.java", "A", method_b="run", modified=True)]
+        commits.append(Commit("2", "Fix run", "stewiegriffin@familyguy.com", current_ts - 50, diffs))
+        repository = Repository(commits, current_ts - 100, current_ts - 50)
+        analytics = SchwaAnalysis(repository).analyze()
+        self.assertIsNotNone(analytics.registry, msg="The nested dicts are built on demand")
+        self.assertGreater(analytics.registry.get(("A.java", "C", "run")).defect_prob, 0)
+        analysis = SchwaAnalysis(repository)
+        tree_analytics = RepositoryAnalytics(analysis.context)
+        components = ComponentTree(tree_analytics, analysis.context)
+        for commit, twr in zip(repository.commits, analysis.commits_twr()):
+            analysis.analyze_commit_components(components, commit, twr, bool(commit.is_bug_fixing()))
+        tree_analytics.compute_defect_probability()
+        self.assertEqual(analytics.to_dict(), tree_analytics.to_dict())
+        self.assertIsNone(analytics.registry)
+        self.assertEqual([c for c, _ in analytics.components()], [("A.java",), ("A.java", "C"), ("A.java", "C", "run")])
+        method_analytics = analytics.files_analytics["A.java"].classes_analytics["C"].methods_analytics["run"]
+        self.assertEqual(method_analytics.revisions, 1)
+
+    def test_directories_analysis(self):
+        current_ts = time.time()
+        diffs = [DiffFile(file_b="src/api/API.java", added=True), DiffFile(file_b="src/api/User.java", added=True),
+                 DiffFile(file_b="README.md", added=True)]
+        commits = [Commit("1", "First commit", "petergriffin@familyguy.com", current_ts - 100, diffs)]
+        diffs = [DiffFile(file_a="src/api/User.java", file_b="src/model/User.java", renamed=True),
+                 DiffFile(file_a="src/api/API.java", removed=True)]
+        commits.append(Commit("2", "Fix user", "stewiegriffin@familyguy.com", current_ts - 50, diffs))
+        repository = Repository(commits, current_ts - 100, current_ts - 50)
+        context = AnalysisContext()
+        analytics = SchwaAnalysis(repository, context=context).analyze()
+        directories = analytics.directories_analytics
+        self.assertEqual(list(directories), ["src/", "src/api/", "src/model/"])
+        self.assertEqual((directories["src/"].revisions, directories["src/"].fixes), (2, 1),
+                         msg="A commit updates a directory once")
+        self.assertEqual(directories["src/api/"].revisions, 1)
+        self.assertEqual((directories["src/model/"].revisions, analytics.files_analytics["src/model/User.java"]
+                          .revisions), (1, 2), msg="A directory has the history of its path")
+        self.assertEqual([c for c, _ in analytics.components("directory")], [("src/",), ("src/model/",)],
+                         msg="Directories without files aren't components")
+
+        analytics_dict = analytics.to_dict(directories=True)
+        self.assertEqual([c["path"] for c in analytics_dict["children"]], ["README.md", "src/"])
+        self.assertEqual(analytics_dict["children"][1]["children"][0]["children"][0]["path"], "src/model/User.java")
+        self.assertEqual(len(analytics.to_dict()["children"]), 2)
+
+        # The same history without directories has the same bug cases
+        diffs = [DiffFile(file_b="API.java", added=True), DiffFile(file_b="User.java", added=True),
+                 DiffFile(file_b="README.md", added=True)]
+        flat_commits = [Commit("1", "First commit", "petergriffin@familyguy.com", current_ts - 100, diffs)]
+        diffs = [DiffFile(file_a="User.java", file_b="Model.java", renamed=True),
+                 DiffFile(file_a="API.java", removed=True)]
+        flat_commits.append(Commit("2", "Fix user", "stewiegriffin@familyguy.com", current_ts - 50, diffs))
+        flat_context = AnalysisContext()
+        SchwaAnalysis(Repository(flat_commits, current_ts - 100, current_ts - 50), context=flat_context).analyze()
+        self.assertEqual(context.fixes_dataset, flat_context.fixes_dataset)
+        self.assertIsNone(directories["src/"].last_twr)
+
+        analysis = TimeTravelAnalysis(repository, checkpoint_interval=1)
+        analysis.analyze()
+        past_analytics = analysis.analytics_at("1")
+        self.assertEqual(past_analytics.directories_analytics["src/api/"].defect_prob,
+                         SchwaAnalysis(Repository(commits[:1], current_ts - 100, current_ts - 100)).analyze()
+                         .directories_analytics["src/api/"].defect_prob)
+
+    def test_functions_analysis(self):
+        current_ts = time.time()
+        diffs = [DiffFile(file_b="api.py", added=True),
+                 DiffMethod(file_name="api.py", class_name="", method_b="main", added=True)]
+        commits = [Commit("7g37ghegewwuygwe8g", "First commit", "petergriffin@familyguy.com", current_ts - 100, diffs)]
+        diffs = [DiffFile(file_a="api.py", file_b="api.py", modified=True),
+                 DiffMethod(file_name="api.py", class_name="", method_a="main", method_b="main", modified=True)]
+        commits.append(Commit("j398ygfg98h3", "Fix main", "petergriffin@familyguy.com", current_ts - 50, diffs))
+        analytics = SchwaAnalysis(Repository(commits, current_ts - 100, current_ts - 50)).analyze()
+        function_analytics = analytics.files_analytics["api.py"].functions_analytics["main"]
+        self.assertEqual(function_analytics.revisions, 2)
+        self.assertEqual(function_analytics.fixes, 1)
+        file_dict = analytics.to_dict()["children"][0]
+        self.assertEqual(file_dict["children"][0]["type"], "function")
+
 
@@ -0,0 +1,111 @@
+# Copyright (c) 2015 Faculty of Engineering of the University of Porto
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+""" Module with the Unit tests for the Snapshot Comparison. """
+
+import os
+import tempfile
+import time
+import unittest
+from schwa.analysis import SchwaAnalysis, SnapshotComparison
+from schwa.repository import *
+
+
+class TestSnapshotComparison(unittest.TestCase):
+    def setUp(self):
+        current_ts = time.time()
+        diffs = [DiffFile(file_b="src/API.java", added=True),
+                 DiffClass(file_name="src/API.java", class_b="API", added=True),
+                 DiffMethod(file_name="src/API.java", class_name="API", method_b="login", added=True),
+                 DiffMethod(file_name="src/API.java", class_name="API", method_b="logout", added=True),
+                 DiffFile(file_b="scripts/deploy.py", added=True)]
+        commits = [Commit("7g37ghegewwuygwe8g", "First commit", "petergriffin@familyguy.com", current_ts - 100, diffs)]
+        diffs = [DiffFile(file_a="src/API.java", file_b="src/API.java", modified=True),
+                 DiffClass(file_name="src/API.java", class_a="API", class_b="API", modified=True),
+                 DiffMethod(file_name="src/API.java", class_name="API", method_a="login", method_b="login",
+                            modified=True),
+                 DiffMethod(file_name="src/API.java", class_name="API", method_a="logout", removed=True),
+                 DiffMethod(file_name="src/API.java", class_name="API", method_b="register", added=True),
+                 DiffFile(file_a="scripts/deploy.py", removed=True)]
+        commits.append(Commit("j398ygfg98h3", "Fix login", "stewie@familyguy.com", current_ts - 50, diffs))
+        self.commits = commits
+        self.directory = tempfile.TemporaryDirectory()
+        self.old_path = os.path.join(self.directory.name, "old.db")
+        self.new_path = os.path.join(self.directory.name, "new.db")
+        old_repository = Repository(commits[:1], current_ts - 100, current_ts - 100)
+        new_repository = Repository(commits, current_ts - 100, current_ts - 50)
+        SchwaAnalysis(old_repository, store=self.old_path).analyze().close()
+        SchwaAnalysis(new_repository, store=self.new_path).analyze().close()
+        self.old_analytics = SchwaAnalysis(old_repository).analyze()
+        self.new_analytics = SchwaAnalysis(new_repository).analyze()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_deltas(self):
+        deltas = list(SnapshotComparison(self.old_path, self.new_path).deltas())
+        self.assertEqual([delta.key for delta in deltas], sorted(delta.key for delta in deltas))
+        statuses = {delta.component: delta.status for delta in deltas}
+        self.assertEqual(statuses[("src/API.java", "API", "login")], "changed")
+        self.assertEqual(statuses[("src/API.java", "API", "logout")], "removed")
+        self.assertEqual(statuses[("src/API.java", "API", "register")], "new")
+        self.assertEqual(statuses[("scripts/deploy.py",)], "removed")
+        self.assertEqual(statuses[("scripts/",)], "removed", msg="Directories without files aren't components")
+
+        old_probs = {component: metrics.defect_prob for component, metrics in self.old_analytics.components()}
+        new_probs = {component: metrics.defect_prob for component, metrics in self.new_analytics.components()}
+        self.assertEqual({d.component: d.old_prob for d in deltas if d.old_prob is not None}, old_probs)
+        self.assertEqual({d.component: d.new_prob for d in deltas if d.new_prob is not None}, new_probs)
+
+    def test_ranks(self):
+        comparison = SnapshotComparison(self.old_path, self.new_path, "method")
+        deltas = {delta.component: delta for delta in comparison.deltas()}
+        self.assertEqual(set(deltas), {("src/API.java", "API", name) for name in ("login", "logout", "register")})
+        self.assertEqual(deltas[("src/API.java", "API", "login")].new_rank, 1)
+        self.assertIsNone(deltas[("src/API.java", "API", "register")].rank_change)
+        self.assertEqual(comparison.summary(), {"new": 1, "removed": 1, "changed": 1, "unchanged": 0})
+
+        riskier = comparison.riskier(1)
+        self.assertEqual(len(riskier), 1)
+        self.assertEqual(riskier[0].delta, max(delta.delta for delta in deltas.values()))
+
+    def test_path_prefix(self):
+        deltas = list(SnapshotComparison(self.old_path, self.new_path, path_prefix="scripts/").deltas())
+        self.assertEqual([delta.component for delta in deltas], [("scripts/",), ("scripts/deploy.py",)])
+
+        # Ranks are among every component of the granularity, not only the filtered ones
+        current_ts = self.commits[-1].timestamp
+        commit = Commit("k49hd8hf2", "Add run script", "petergriffin@familyguy.com", current_ts + 10,
+                        [DiffFile(file_b="scripts/run.py", added=True)])
+        later_path = os.path.join(self.directory.name, "later.db")
+        SchwaAnalysis(Repository(self.commits + [commit], current_ts - 100, current_ts + 10),
+                      store=later_path).analyze().close()
+        ranks = {delta.component: delta.new_rank for delta in SnapshotComparison(self.new_path, later_path,
+                                                                                   "file").deltas()}
+        deltas = list(SnapshotComparison(self.new_path, later_path, "file", "scripts/").deltas())
+        self.assertEqual([(delta.component, delta.new_rank) for delta in deltas], [(("scripts/run.py",), 2)])
+        self.assertEqual(deltas[0].new_rank, ranks[("scripts/run.py",)])
+
+    def test_invalid_store(self):
+        with self.assertRaises(ValueError):
+            list(SnapshotComparison(self.old_path, os.path.join(self.directory.name, "unknown.db")).deltas())
+        with self.assertRaises(ValueError):
+            SnapshotComparison(self.old_path, self.new_path, "package")
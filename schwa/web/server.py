@@ -22,7 +22,7 @@
 import os
 import sys
 import socket
-from bottle import Bottle, run, static_file, template, response, TEMPLATE_PATH
+from bottle import Bottle, run, static_file, template, request, response, TEMPLATE_PATH
 import webbrowser
 
 
@@ -48,7 +48,14 @@ def server_static(filename):
 @app.route("/analytics")
 def analytics():
     response.content_type = 'application/json'
-    analytics_dict = Server.analytics.to_dict()
+    weights = {feature: request.query.get(feature) for feature in ("revisions", "fixes", "authors")}
+    if all(weights.values()):  # Rescores with the weights of the query, e.g. ?revisions=0.3&fixes=0.5&authors=0.2
+        try:
+            return Server.analytics.rescore({f: float(w) for f, w in weights.items()}).to_dict(directories=True)
+        except ValueError:
+            response.status = 400
+            return {"error": "Invalid features weights"}
+    analytics_dict = Server.analytics.to_dict(directories=True)
     return analytics_dict
 
 
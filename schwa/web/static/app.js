@@ -10,9 +10,11 @@ var b = {
 
 // Mapping of step names to colors.
 var colors = {
+    "directory": "#a173d1",
     "file": "#5687d1",
     "class": "#7b615c",
-    "method": "#de783b"
+    "method": "#de783b",
+    "function": "#6ab975"
 };
 
 d3.select(".path").style("visibility", "hidden");
@@ -120,7 +122,7 @@ function mouseover(d) {
 
 
     d3.select(".path").style("visibility", "");
-    if(d.type === "file"){
+    if(d.type === "directory" || d.type === "file"){
         d3.select("#path").text(d.path);
     }
 
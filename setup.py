@@ -46,6 +46,7 @@ setup(name='Schwa',
       packages=packages,
       package_data={'schwa': ['web/static/*.js', 'web/static/*.css', 'web/views/*.tpl']},
       install_requires=requirements,
+      extras_require={"numpy": ["numpy>=1.8"]},
       keywords=['testing', 'bugs', 'software'],
       classifiers=[
         'Development Status :: 3 - Alpha',